@@ -0,0 +1,221 @@
+import json
+import logging
+import os
+import platform
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from generative_databases.generators import data_importer, writers
+from generative_databases.generators.dates import split_dates
+from generative_databases.generators.generator import DEFAULT_PARAMS, GENDERS, NAME_DATA_COLUMNS, Generator
+from generative_databases.generators.instrumentation import PeakMemory
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+DEFAULT_FORMATS = ("csv", "json", "xml", "excel", "html", "parquet", "feather", "hdf5", "stata", "sql", "pickle")
+OUTPUT_NAMES = {"sql": "people.db", "excel": "people.xlsx"}
+
+
+class Benchmark:
+    """
+    Times and memory-profiles every stage of data generation at several sample sizes.
+
+    Every stage is recorded with its wall time, rows per second and the RSS at its start and peak, see
+    :meth:`report` for the JSON layout. Reference data is loaded once without the cache ('load.cold.<dataset>'
+    stages) and, if the cache is used, once more through it ('load.<dataset>').
+    """
+
+    def __init__(self, sizes=DEFAULT_SIZES, seed: int = 0, formats=DEFAULT_FORMATS, cache: bool = True):
+        """
+        :param sizes: Sample sizes to benchmark.
+        :type sizes: Iterable[int]
+        :param seed: Seed of every generator, so runs on different branches generate the same data.
+        :type seed: int
+        :param formats: Output formats to benchmark in ``generate_and_save``.
+        :type formats: Iterable[str]
+        :param cache: Whether the reference data is loaded through the on-disk cache.
+        :type cache: bool
+        """
+        self.sizes = [int(size) for size in sizes]
+        self.seed = seed
+        self.formats = list(formats)
+        self.params_dict = dict(DEFAULT_PARAMS, cache=cache)
+        self.results = []
+
+    def measure(self, stage: str, rows, func, *args):
+        """
+        Run one stage and record its time and memory use.
+
+        :param stage: Stage name.
+        :type stage: str
+        :param rows: Number of rows the stage produces, for the rows per second figure, or None for the length of
+            the result (0 if there is none).
+        :type rows: int
+        :param func: Function running the stage.
+        :param args: Arguments of ``func``.
+        :return: Result of ``func``.
+        """
+        with PeakMemory() as memory:
+            start = time.perf_counter()
+            result = func(*args)
+            seconds = time.perf_counter() - start
+        if rows is None:
+            rows = len(result) if result is not None else 0
+        self.results.append(
+            {
+                "stage": stage,
+                "rows": rows,
+                "seconds": seconds,
+                "rows_per_sec": rows / seconds if seconds else None,
+                "rss_start": memory.start,
+                "rss_peak": memory.peak,
+                "rss_peak_delta": memory.delta,
+            }
+        )
+        logger.info("%s (%d rows): %.3f s", stage, rows, seconds)
+        return result
+
+    def load(self, stage: str, params_dict: dict) -> data_importer.DataBank:
+        """
+        Benchmark loading every reference dataset, with the columns generation loads, as '<stage>.<dataset>'.
+
+        :param stage: Prefix of the stage names.
+        :type stage: str
+        :param params_dict: Parameters with the data sources and whether the cache is used.
+        :type params_dict: dict
+        :return: DataBank with all datasets loaded.
+        :rtype: data_importer.DataBank
+        """
+        data_storage = data_importer.DataBank(params_dict, columns=NAME_DATA_COLUMNS)
+        for dataset in data_storage.datasets:
+            self.measure(f"{stage}.{dataset}", None, getattr, data_storage, dataset)
+        return data_storage
+
+    def run_loading(self) -> data_importer.DataBank:
+        """
+        Benchmark loading (and normalising) every reference dataset from its source, then through the cache if it
+        is used.
+
+        :return: DataBank with all datasets loaded.
+        :rtype: data_importer.DataBank
+        """
+        data_storage = self.load("load.cold", dict(self.params_dict, cache=False))
+        if self.params_dict["cache"]:
+            data_storage = self.load("load", self.params_dict)
+        raw_last_names = pd.read_csv(
+            data_importer.BUILT_IN_SOURCES["last_name"][0], header=None, names=["last_names"]
+        )
+        self.measure("normalize.last_name", len(raw_last_names), data_importer.normalize_frame, raw_last_names)
+        return data_storage
+
+    def generator(self, data_storage: data_importer.DataBank, size: int) -> Generator:
+        """
+        Seeded generator of ``size`` rows sharing the benchmark DataBank.
+        """
+        return Generator(dict(self.params_dict, sample_size=size, seed=self.seed), data_storage=data_storage)
+
+    def run_persons(self, data_storage: data_importer.DataBank, size: int):
+        """
+        Benchmark the steps of ``generate_persons`` one by one, then the whole method.
+        """
+        generator = self.generator(data_storage, size)
+        self.measure("persons.name_sampler", 0, lambda: generator.name_sampler)
+        birth_dates = self.measure("persons.dates", size, generator.generate_birth_dates, size)
+        gender = self.measure("persons.genders", size, generator.generate_genders, size)
+        self.measure("persons.last_names", size, generator.generate_last_names, size)
+        years, _, _ = split_dates(birth_dates)
+        genders = GENDERS.to_numpy()[gender.codes]
+        self.measure("persons.names", size, generator.generate_names, years, genders)
+        self.measure("persons.second_names", size, generator.generate_second_names, years, genders)
+        self.measure("persons.pesel", size, generator.generate_pesels, birth_dates, genders)
+        self.measure("persons", size, self.generator(data_storage, size).generate_persons, size)
+
+    def run_localisations(self, data_storage: data_importer.DataBank, size: int):
+        """
+        Benchmark ``generate_localisations``.
+        """
+        self.measure("localisations", size, self.generator(data_storage, size).generate_localisations, size)
+
+    def run_outputs(self, data_storage: data_importer.DataBank, size: int):
+        """
+        Benchmark generating the combined data and writing it to every output format on its own.
+        """
+        chunk = self.measure("chunk", size, lambda: next(self.generator(data_storage, size).generate_chunks()))
+        with tempfile.TemporaryDirectory(prefix="generative_databases_benchmark_") as directory:
+            for output_type in self.formats:
+                path = os.path.join(directory, OUTPUT_NAMES.get(output_type, f"people.{output_type}"))
+                reports = self.measure(
+                    f"output.{output_type}", size, writers.write_chunks, [chunk], {output_type: path}, True
+                )
+                report = reports.get(output_type, {})
+                self.results[-1]["bytes"] = report.get("bytes")
+                if report.get("error") is not None:
+                    self.results[-1]["error"] = str(report["error"])
+
+    def run(self) -> dict:
+        """
+        Run the whole benchmark.
+
+        :return: Report, see :meth:`report`.
+        :rtype: dict
+        """
+        data_storage = self.run_loading()
+        for size in self.sizes:
+            self.run_persons(data_storage, size)
+            self.run_localisations(data_storage, size)
+            self.run_outputs(data_storage, size)
+        return self.report()
+
+    def report(self) -> dict:
+        """
+        Machine-readable benchmark report.
+
+        :return: Dictionary with an 'environment' entry (versions, platform, seed, sizes) and a 'results'
+            list with one entry per stage and size: 'stage', 'rows', 'seconds', 'rows_per_sec', 'rss_start',
+            'rss_peak', 'rss_peak_delta' (bytes, None if unknown) and for outputs 'bytes' written.
+        :rtype: dict
+        """
+        return {
+            "environment": {
+                "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "seed": self.seed,
+                "sizes": self.sizes,
+                "formats": self.formats,
+                "cache": self.params_dict["cache"],
+            },
+            "results": self.results,
+        }
+
+
+def run_benchmark(sizes=DEFAULT_SIZES, seed: int = 0, formats=DEFAULT_FORMATS, cache: bool = True, path: str = None):
+    """
+    Run the benchmark and optionally save the report as JSON.
+
+    :param sizes: Sample sizes to benchmark.
+    :type sizes: Iterable[int]
+    :param seed: Seed of every generator.
+    :type seed: int
+    :param formats: Output formats to benchmark.
+    :type formats: Iterable[str]
+    :param cache: Whether the reference data is loaded through the on-disk cache.
+    :type cache: bool
+    :param path: JSON file to write the report to.
+    :type path: str
+    :return: Report, see :meth:`Benchmark.report`.
+    :rtype: dict
+    """
+    report = Benchmark(sizes, seed, formats, cache).run()
+    if path is not None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
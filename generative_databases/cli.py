@@ -1,23 +1,320 @@
-from typing import Annotated, Optional
+from typing import Annotated, List, Optional
 import typer
 import click
 from pathlib import Path
-import os
+import asyncio
+import json
+import logging
+import threading
 
-from generative_databases.generators.generator import Generator
-from generative_databases.generators import data_importer
+from rich.console import Console
+from rich.progress import BarColumn, Progress, TextColumn
+
+from generative_databases.generators.generator import DEFAULT_PARAMS, Generator
+from generative_databases.generators.instrumentation import format_bytes
+from generative_databases.generators.pipeline import Cancelled
+from generative_databases.generators.parallel import ParallelGenerator
+from generative_databases.generators.relational import RelationalGenerator
+from generative_databases.generators import data_importer, writers
+from generative_databases import benchmark as benchmarks
+from generative_databases.jobs import job_params, load_job_file, run_jobs
+from generative_databases.server import GenerationServer
 
 params_dict = {}
 
 app = typer.Typer()
+cache_app = typer.Typer(help="Manage the cache of prepared reference data")
+app.add_typer(cache_app, name="cache")
 APP_NAME = "generative_databases"
+LOG_LEVELS = ["DEBUG", "INFO", "WARNING", "ERROR"]
+
+
+def setup_logging(level: str = "INFO", log_file: Optional[str] = "generator.log"):
+    """
+    Configure logging for a CLI run, to a file or to stderr if no file is given.
+    """
+    handler = logging.FileHandler(log_file) if log_file else logging.StreamHandler()
+    logging.basicConfig(
+        level=getattr(logging, level.upper()),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+        handlers=[handler],
+        force=True,
+    )
+
+
+@app.callback()
+def main(
+    log_level: Annotated[
+        str,
+        typer.Option(
+            click_type=click.Choice(LOG_LEVELS, case_sensitive=False),
+            help="Log level, DEBUG also logs every generated value",
+        ),
+    ] = "INFO",
+    log_file: Annotated[
+        str, typer.Option(help="Log file, empty to log to stderr")
+    ] = "generator.log",
+):
+    """
+    Database data generator
+    """
+    setup_logging(log_level, log_file or None)
+
+
+def parse_outputs(outputs: List[str]) -> dict:
+    """
+    Parse FORMAT=PATH output options into a dictionary.
+    """
+    result = {}
+    for output in outputs:
+        output_type, separator, path = output.partition("=")
+        if not separator or not path:
+            raise typer.BadParameter(f"Expected FORMAT=PATH, got {output}", param_hint="--output")
+        result[output_type.strip().lower()] = path
+    return result
+
+
+def format_seconds(seconds) -> str:
+    """
+    Format a duration as [h:]mm:ss, "-:--" if unknown.
+    """
+    if seconds is None:
+        return "-:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class ProgressDisplay:
+    """
+    Live progress bars on stderr, one per stage of every job, fed with the progress events of the generators.
+
+    Used as a context manager showing the bars and as the listener of the events, see
+    :meth:`Metrics.progress`, which may be called from several threads.
+    """
+
+    def __init__(self, console: Console = None, disable: bool = False):
+        """
+        :param console: Console the bars are drawn on, stderr by default.
+        :type console: Console
+        :param disable: Show nothing, e.g. when the progress was turned off.
+        :type disable: bool
+        """
+        self.progress = Progress(
+            TextColumn("{task.description}"),
+            BarColumn(bar_width=20),
+            TextColumn("{task.fields[rows]} rows"),
+            TextColumn("{task.fields[rate]} rows/s"),
+            TextColumn("ETA {task.fields[eta]}"),
+            TextColumn("{task.fields[rss]}"),
+            console=console or Console(stderr=True),
+            disable=disable,
+        )
+        self.tasks = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.progress.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.progress.stop()
+
+    def __call__(self, event: dict):
+        job = event.get("job")
+        description = event["stage"] if job is None else f"{job} {event['stage']}"
+        total = event["total"]
+        fields = {
+            "rows": f"{event['done']:,}" if total is None else f"{event['done']:,}/{total:,}",
+            "rate": f"{event['rows_per_second']:,.0f}",
+            "eta": format_seconds(event["eta"]),
+            "rss": format_bytes(event["rss"]),
+        }
+        with self._lock:
+            task = self.tasks.get((job, event["stage"]))
+            if task is None:
+                task = self.tasks[(job, event["stage"])] = self.progress.add_task(description, total=total, **fields)
+            self.progress.update(task, completed=event["done"], **fields)
+
+
+def run_batch(jobs: list, parallel_jobs: int, progress: bool = True):
+    """
+    Run jobs without prompting and report their results, exiting with code 1 if any of them failed and 130
+    if they were cancelled with Ctrl-C.
+    """
+    if progress:
+        with ProgressDisplay() as display:
+            results = run_jobs(jobs, parallel_jobs, listener=display)
+    else:
+        results = run_jobs(jobs, parallel_jobs)
+    failed = False
+    cancelled = False
+    for result in results:
+        if result["cancelled"]:
+            cancelled = True
+            written = ", ".join(
+                f"{report['rows']} rows as {output_type}" for output_type, report in result["outputs"].items()
+            )
+            typer.echo(
+                typer.style(
+                    f"{result['name']}: cancelled" + (f", kept {written}" if written else ""),
+                    fg=typer.colors.YELLOW,
+                )
+            )
+        elif result["error"] is None:
+            typer.echo(
+                typer.style(
+                    f"{result['name']}: {result['rows']} rows in {result['seconds']:.2f} s",
+                    fg=typer.colors.GREEN,
+                )
+            )
+        else:
+            failed = True
+            typer.echo(
+                typer.style(f"{result['name']}: {result['error']}", fg=typer.colors.RED)
+            )
+    if cancelled:
+        raise typer.Exit(code=130)
+    if failed:
+        raise typer.Exit(code=1)
 
 
 @app.command()
-def generate():
+def generate(
+    seed: Annotated[
+        Optional[int],
+        typer.Option(help="Seed for reproducible runs, same seed and answers give identical files"),
+    ] = None,
+    metrics: Annotated[
+        Optional[Path],
+        typer.Option(help="JSON file for the stage timings, counters and peak memory of the run"),
+    ] = None,
+    job_file: Annotated[
+        Optional[Path],
+        typer.Option(help="TOML or YAML file listing the jobs to run, other options are then ignored"),
+    ] = None,
+    parallel_jobs: Annotated[
+        int, typer.Option(help="Number of jobs of the job file running at the same time")
+    ] = 1,
+    sample_size: Annotated[
+        Optional[int], typer.Option(help="Sample size, generates without prompting")
+    ] = None,
+    output: Annotated[
+        Optional[List[str]],
+        typer.Option(help="Output as FORMAT=PATH (e.g. csv=people.csv), can be repeated"),
+    ] = None,
+    city_data: Annotated[str, typer.Option(help="Path to city data source")] = " ",
+    names_data: Annotated[str, typer.Option(help="Path to first names data source")] = " ",
+    last_names_data: Annotated[str, typer.Option(help="Path to last names data source")] = " ",
+    loc_weighted: Annotated[
+        bool, typer.Option(help="Weight localisations by population")
+    ] = DEFAULT_PARAMS["loc_w_prob"],
+    names_weighted: Annotated[
+        bool, typer.Option(help="Weight names by popularity")
+    ] = DEFAULT_PARAMS["names_w_prob"],
+    sex_prob: Annotated[
+        int, typer.Option(help="Chance for a person to be female (0-100%)")
+    ] = DEFAULT_PARAMS["sex_prob"],
+    sec_name_prob: Annotated[
+        int, typer.Option(help="Chance for a person to have a second name (0-100%)")
+    ] = DEFAULT_PARAMS["sec_name_prob"],
+    year_from: Annotated[
+        int, typer.Option(help="First birth year")
+    ] = DEFAULT_PARAMS["year_range"][0],
+    year_to: Annotated[
+        int, typer.Option(help="Last birth year")
+    ] = DEFAULT_PARAMS["year_range"][1],
+    birth_dist: Annotated[
+        str,
+        typer.Option(
+            click_type=click.Choice(["uniform", "names"]),
+            help="Birth year distribution, 'names' weights years by the births in the names data",
+        ),
+    ] = DEFAULT_PARAMS["birth_dist"],
+    chunk_size: Annotated[
+        int, typer.Option(help="Rows generated per chunk, 0 to generate all at once")
+    ] = 0,
+    columns: Annotated[
+        str, typer.Option(help="Output columns separated by commas, all if not given")
+    ] = "",
+    workers: Annotated[
+        int, typer.Option(help="Number of worker processes")
+    ] = 1,
+    relational: Annotated[
+        bool,
+        typer.Option(help="Write cities, postal codes, persons and vehicles tables linked by keys, one file per table"),
+    ] = False,
+    vehicles_per_person: Annotated[
+        float, typer.Option(help="Average number of vehicles per person of relational samples")
+    ] = DEFAULT_PARAMS["vehicles_per_person"],
+    append: Annotated[
+        bool,
+        typer.Option(help="Add the rows to existing csv, parquet or sql outputs, never repeating their PESEL numbers"),
+    ] = False,
+    queue_size: Annotated[
+        int, typer.Option(help="Chunks generated ahead of the slowest output before generation waits for it")
+    ] = DEFAULT_PARAMS["queue_size"],
+    compression: Annotated[
+        Optional[str],
+        typer.Option(
+            click_type=click.Choice(["gzip", "zstd", "lz4"]),
+            help="Compress csv, json and xml outputs, also chosen by a .gz, .zst or .lz4 output path",
+        ),
+    ] = None,
+    shard_rows: Annotated[
+        Optional[int], typer.Option(help="Split csv, json and xml outputs into numbered files of this many rows")
+    ] = None,
+    progress: Annotated[
+        bool, typer.Option(help="Show the rows/s, ETA and memory of every stage while generating")
+    ] = True,
+):
     """
-    Enter parameters to build a database
+    Build a database, from a job file, from options (--sample-size and --output) or by answering prompts
     """
+    if job_file is not None:
+        try:
+            jobs = load_job_file(str(job_file))
+        except (OSError, ValueError) as e:
+            raise typer.BadParameter(str(e), param_hint="--job-file")
+        run_batch(jobs, parallel_jobs, progress)
+        return
+    if sample_size is not None or output:
+        if sample_size is None or not output:
+            raise typer.BadParameter("Both --sample-size and --output are needed to generate without prompting")
+        outputs = parse_outputs(output)
+        job = {
+            "name": "generate",
+            "seed": seed,
+            "metrics_path": None if metrics is None else str(metrics),
+            "sample_size": sample_size,
+            "outputs": outputs,
+            "output_options": writers.text_options(outputs, compression=compression, shard_rows=shard_rows),
+            "city_data": city_data,
+            "names_data": names_data,
+            "last_names_data": last_names_data,
+            "loc_w_prob": loc_weighted,
+            "names_w_prob": names_weighted,
+            "sex_prob": min(100, sex_prob),
+            "sec_name_prob": min(100, sec_name_prob),
+            "year_range": [year_from, year_to],
+            "birth_dist": birth_dist,
+            "chunk_size": chunk_size,
+            "columns": [column.strip() for column in columns.split(",") if column.strip()] or None,
+            "workers": workers,
+            "relational": relational,
+            "vehicles_per_person": vehicles_per_person,
+            "append": append,
+            "queue_size": queue_size,
+        }
+        try:
+            jobs = [job_params(job)]
+        except ValueError as e:
+            raise typer.BadParameter(str(e))
+        run_batch(jobs, 1, progress)
+        return
+
+    params_dict.update({"seed": seed})
+    params_dict.update({"metrics_path": None if metrics is None else str(metrics)})
     params_dict.update(
         {"sample_size": typer.prompt("What sample size is required?", type=int)}
     )
@@ -86,8 +383,69 @@ def generate():
     year_range_t = typer.prompt("To: ", type=int)
 
     params_dict.update({"year_range": [year_range_f, year_range_t]})
+    params_dict.update(
+        {
+            "birth_dist": (
+                "names"
+                if typer.confirm(
+                    "Are birth years to be weighted by the number of births in the names data?"
+                )
+                else "uniform"
+            )
+        }
+    )
+
+    params_dict.update(
+        {
+            "chunk_size": typer.prompt(
+                "Enter a number of rows generated per chunk (0 to generate all at once)",
+                type=int,
+                default=0,
+            )
+        }
+    )
+
+    columns = typer.prompt(
+        "Enter the output columns separated by commas (blank for all)",
+        type=str,
+        default="",
+        show_default=False,
+    )
+    params_dict.update(
+        {
+            "columns": (
+                [column.strip() for column in columns.split(",") if column.strip()]
+                or None
+            )
+        }
+    )
+    params_dict.update(
+        {
+            "workers": typer.prompt(
+                "Enter a number of worker processes (1 to generate on a single core)",
+                type=int,
+                default=1,
+            )
+        }
+    )
+    params_dict.update(
+        {
+            "relational": typer.confirm(
+                "Do you want separate cities, postal codes, persons and vehicles tables (one file per table)?"
+            )
+        }
+    )
+    if params_dict["relational"]:
+        params_dict.update(
+            {
+                "vehicles_per_person": typer.prompt(
+                    "Enter the average number of vehicles per person",
+                    type=float,
+                    default=DEFAULT_PARAMS["vehicles_per_person"],
+                )
+            }
+        )
 
-    os.system("cls")
     typer.echo(typer.style("Your answers:", fg=typer.colors.GREEN))
     for k in params_dict.keys():
         typer.echo(f"{k}, {params_dict[k]}")
@@ -96,7 +454,12 @@ def generate():
 
     typer.echo(typer.style("Setting up generator", fg=typer.colors.RED))
     try:
-        G = Generator(params_dict=params_dict)
+        if params_dict["relational"]:
+            G = RelationalGenerator(params_dict)
+        elif params_dict["workers"] > 1:
+            G = ParallelGenerator(params_dict, workers=params_dict["workers"])
+        else:
+            G = Generator(params_dict=params_dict)
     except Exception as e:
         typer.echo(
             typer.style(
@@ -104,6 +467,7 @@ def generate():
             )
         )
         print(e)
+        raise typer.Exit(code=1)
     else:
         typer.echo(typer.style("Set up ended Succesfully!", fg=typer.colors.GREEN))
 
@@ -136,9 +500,38 @@ def generate():
                 ).lower(): typer.prompt("Enter a path for the save file", type=str)
             }
         )
-    typer.echo(typer.style("Saving Database!", fg=typer.colors.RED))
+    if not params_dict["relational"] and all(output_type in ("csv", "parquet", "sql") for output_type in save_dict):
+        params_dict.update(
+            {"append": typer.confirm("Do you want to append the rows to the existing outputs?")}
+        )
+    output_options = {}
+    if "sql" in save_dict:
+        indexes = typer.prompt(
+            "Enter the columns to index in the SQL output separated by commas (blank for none)",
+            type=str,
+            default="",
+            show_default=False,
+        )
+        output_options["sql"] = {
+            "batch_size": typer.prompt(
+                "Enter a number of rows per SQL insert batch", type=int, default=10000
+            ),
+            "indexes": [
+                column.strip() for column in indexes.split(",") if column.strip()
+            ],
+        }
+    typer.echo(typer.style("Saving Database! Press Ctrl-C to stop", fg=typer.colors.RED))
+    display = ProgressDisplay(disable=not progress)
+    if progress:
+        G.metrics.add_listener(display)
     try:
-        G.generate_and_save(save_dict)
+        with display:
+            reports = G.generate_and_save(save_dict, options=output_options)
+    except (Cancelled, KeyboardInterrupt) as e:
+        typer.echo(typer.style("Saving database cancelled!", fg=typer.colors.YELLOW))
+        for output_type, report in (getattr(e, "reports", None) or {}).items():
+            typer.echo(f"{output_type}: kept {report['rows']} rows")
+        raise typer.Exit(code=130)
     except Exception as e:
         typer.echo(
             typer.style(
@@ -147,7 +540,17 @@ def generate():
         )
         print(e)
     else:
-        typer.echo(typer.style("Database saved Succesfully!", fg=typer.colors.GREEN))
+        failed = [output_type for output_type, report in reports.items() if report["error"] is not None]
+        if failed:
+            typer.echo(
+                typer.style(
+                    f"There has been a problem saving database ({', '.join(failed)}), see the log!",
+                    fg=typer.colors.RED,
+                )
+            )
+        else:
+            typer.echo(typer.style("Database saved Succesfully!", fg=typer.colors.GREEN))
+        typer.echo(G.metrics.report())
 
 
 @app.command()
@@ -156,23 +559,119 @@ def about_sources():
     Show info about default databases
     """
 
-    pd = {
-        "sample_size": 1,
-        "city_data": " ",
-        "names_data": " ",
-        "last_names_data": " ",
-        "loc_w_prob": True,
-        "names_w_prob": True,
-        "sex_prob": 50,
-        "sec_name_prob": 50,
-        "year_range": [1950, 2016],
-    }
-
-    G2 = Generator(params_dict=pd)
+    data_storage = data_importer.DataBank(
+        {"city_data": " ", "names_data": " ", "last_names_data": " "}
+    )
 
     typer.echo(typer.style("Localisation info", fg=typer.colors.GREEN))
-    print(G2.data_storage.localisation.info())
+    print(data_storage.localisation.info())
     typer.echo(typer.style("First Names info", fg=typer.colors.RED))
-    print(G2.data_storage.first_name.info())
+    print(data_storage.first_name.info())
     typer.echo(typer.style("Last Names info", fg=typer.colors.BLUE))
-    print(G2.data_storage.last_name.info())
+    print(data_storage.last_name.info())
+
+
+@app.command()
+def benchmark(
+    sizes: Annotated[
+        str, typer.Option(help="Sample sizes separated by commas")
+    ] = ",".join(str(size) for size in benchmarks.DEFAULT_SIZES),
+    seed: Annotated[int, typer.Option(help="Seed of every generator")] = 0,
+    formats: Annotated[
+        str, typer.Option(help="Output formats separated by commas")
+    ] = ",".join(benchmarks.DEFAULT_FORMATS),
+    cache: Annotated[
+        bool, typer.Option(help="Load the reference data through the cache")
+    ] = True,
+    output: Annotated[
+        Optional[Path], typer.Option(help="JSON file for the results, printed if not given")
+    ] = None,
+):
+    """
+    Time and memory-profile every generation stage at several sample sizes
+    """
+    report = benchmarks.run_benchmark(
+        [int(size) for size in sizes.split(",") if size.strip()],
+        seed,
+        [output_type.strip().lower() for output_type in formats.split(",") if output_type.strip()],
+        cache,
+        None if output is None else str(output),
+    )
+    if output is None:
+        typer.echo(json.dumps(report, indent=2))
+        return
+    for result in report["results"]:
+        typer.echo(
+            f"{result['stage']:<24} {result['rows']:>9} rows {result['seconds']:>9.3f} s"
+            f" {result['rows_per_sec'] or 0:>14,.0f} rows/s"
+        )
+    typer.echo(typer.style(f"Results saved to {output}", fg=typer.colors.GREEN))
+
+
+@app.command()
+def serve(
+    host: Annotated[str, typer.Option(help="Address to listen on")] = "127.0.0.1",
+    port: Annotated[int, typer.Option(help="TCP port to listen on")] = 8765,
+    unix_socket: Annotated[
+        Optional[Path], typer.Option(help="Unix socket to listen on instead of the TCP port")
+    ] = None,
+    max_concurrent: Annotated[
+        int, typer.Option(help="Number of requests generating at the same time")
+    ] = 4,
+    max_queued: Annotated[
+        int, typer.Option(help="Number of waiting requests before new ones are rejected with 503")
+    ] = 16,
+    max_rows: Annotated[int, typer.Option(help="Largest sample size of one request")] = 10_000_000,
+    city_data: Annotated[str, typer.Option(help="Path to city data source")] = " ",
+    names_data: Annotated[str, typer.Option(help="Path to first names data source")] = " ",
+    last_names_data: Annotated[str, typer.Option(help="Path to last names data source")] = " ",
+):
+    """
+    Serve generated data over HTTP, keeping the reference data loaded between requests
+    """
+    server = GenerationServer(
+        {"city_data": city_data, "names_data": names_data, "last_names_data": last_names_data},
+        max_concurrent=max_concurrent,
+        max_queued=max_queued,
+        max_rows=max_rows,
+    )
+    typer.echo(typer.style("Loading reference data", fg=typer.colors.GREEN))
+    try:
+        asyncio.run(server.serve_forever(host, port, None if unix_socket is None else str(unix_socket)))
+    except KeyboardInterrupt:
+        typer.echo(typer.style("Server stopped", fg=typer.colors.GREEN))
+
+
+@cache_app.command("warm")
+def cache_warm(
+    city_data: Annotated[str, typer.Option(help="Path to city data source")] = " ",
+    names_data: Annotated[str, typer.Option(help="Path to first names data source")] = " ",
+    last_names_data: Annotated[str, typer.Option(help="Path to last names data source")] = " ",
+):
+    """
+    Prepare and cache the reference data (built-in data by default)
+    """
+    cache = data_importer.DataCache()
+    cache.warm(
+        {
+            "city_data": city_data,
+            "names_data": names_data,
+            "last_names_data": last_names_data,
+        }
+    )
+    typer.echo(typer.style(f"Cache ready in {cache.directory}", fg=typer.colors.GREEN))
+
+
+@cache_app.command("clear")
+def cache_clear():
+    """
+    Remove all cached reference data
+    """
+    cache = data_importer.DataCache()
+    removed = cache.clear()
+    typer.echo(
+        typer.style(
+            f"Removed {removed} cache entries from {cache.directory}",
+            fg=typer.colors.GREEN,
+        )
+    )
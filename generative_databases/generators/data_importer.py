@@ -1,18 +1,55 @@
 import pandas as pd
+import numpy as np
+import json
 import os
+import re
+import hashlib
+import shutil
+import tempfile
+import time
 import unidecode
 import logging
+from generative_databases.generators.instrumentation import current_rss, format_bytes
+from generative_databases.generators.packed_strings import PackedStrings
 
-# Setting the logger
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("generator.log")
-    ]
-)
 logger = logging.getLogger(__name__)
 
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data"))
+BUILT_IN_SOURCES = {
+    'localisation': [os.path.join(DATA_DIR, "Poland_cities", "pl.csv"),
+                     os.path.join(DATA_DIR, "Poland_postal_codes", "PL_POSTAL_CODE_CS.csv")],
+    'first_name': [os.path.join(DATA_DIR, "Poland_all_first_last_names", "Imiona_nadane_wPolsce_w_latach_2000-2019.csv")],
+    'last_name': [os.path.join(DATA_DIR, "Poland_all_first_last_names", "polish_surnames.txt")],
+    'car_plates': [os.path.join(DATA_DIR, "Poland_car_plate_number", "car_plates.csv")],
+}
+# bump whenever the loaders change what they produce, so that old cache entries are not reused
+CACHE_VERSION = 5
+# voivodeships (normalized names) of the states of the postal codes data
+STATE_VOIVODESHIPS = {
+    'greater poland': 'wielkopolskie',
+    'kujawsko-pomorskie': 'kujawsko-pomorskie',
+    'lesser poland': 'malopolskie',
+    'lodz voivodeship': 'lodzkie',
+    'lower silesia': 'dolnoslaskie',
+    'lublin': 'lubelskie',
+    'lubusz': 'lubuskie',
+    'mazovia': 'mazowieckie',
+    'opole voivodeship': 'opolskie',
+    'podlasie': 'podlaskie',
+    'pomerania': 'pomorskie',
+    'silesia': 'slaskie',
+    'subcarpathia': 'podkarpackie',
+    'swietokrzyskie': 'swietokrzyskie',
+    'warmia-masuria': 'warminsko-mazurskie',
+    'west pomerania': 'zachodniopomorskie',
+}
+# words around the county names of the postal codes data ('Powiat kaliski', 'Lubin County')
+COUNTY_AFFIXES = re.compile(r'^powiat | county$')
+# ending of the adjective a county is named with after its seat ('kaliski' of 'kalisz', 'tarnowski' of 'tarnow')
+COUNTY_ADJECTIVE = re.compile(r'[csz]ki$')
+# smallest share of the codes of a county its postal districts need, others are stray entries of the data
+DISTRICT_SHARE = 0.05
+
 
 def normalize_text(text: str):
     """
@@ -26,48 +63,500 @@ def normalize_text(text: str):
     return unidecode.unidecode(text).lower()
 
 
+def normalize_series(values: pd.Series):
+    """
+    Normalize a column of text with :func:`normalize_text`, calling it once per distinct non-ASCII value only.
+
+    ASCII values only need lowercasing, which is done with vectorized string operations. Missing values
+    are kept.
+
+    :param values: The input column.
+    :type values: pd.Series
+    :return: Normalized column.
+    :rtype: pd.Series
+    """
+    codes, uniques = pd.factorize(values)
+    uniques = pd.Series(uniques, dtype=object).astype(str)
+    ascii_mask = np.fromiter((text.isascii() for text in uniques), dtype=bool, count=len(uniques))
+    normalized = uniques.str.lower().to_numpy(dtype=object)
+    normalized[~ascii_mask] = [normalize_text(text) for text in uniques[~ascii_mask]]
+    result = np.where(codes >= 0, normalized[codes] if len(normalized) else None, None)
+    return pd.Series(result, index=values.index, name=values.name, dtype=object)
+
+
+def normalize_frame(data: pd.DataFrame):
+    """
+    Normalize all text columns of a DataFrame with :func:`normalize_series`.
+
+    :param data: The input data.
+    :type data: pd.DataFrame
+    :return: Data with normalized text columns.
+    :rtype: pd.DataFrame
+    """
+    data = data.copy()
+    for column in data.columns:
+        if data[column].dtype == object:
+            data[column] = normalize_series(data[column])
+    return data
+
+
+def repair_encoding(text: str):
+    """
+    Repair text that was UTF-8 encoded but decoded as Latin-1 (e.g. 'KrakÃ³w' -> 'Kraków').
+
+    :param text: The input text.
+    :type text: str
+    :return: Repaired text, or the input text if it is not mis-encoded.
+    :rtype: str
+    """
+    try:
+        return text.encode('latin-1').decode('utf-8')
+    except UnicodeError:
+        return text
+
+
+def match_postal_codes(cities: pd.DataFrame, postal_codes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Match the postal codes data to the cities.
+
+    The postal codes data lists the state, county and postal district (the first two digits) of every code, but
+    not the locality a code belongs to, so the match is an approximation:
+
+    - A city gets the codes of the county of its voivodeship named after it ('Wroclaw'), or else after its
+      adjective ('Powiat kaliski' for Kalisz, the longest matching adjective winning). A city matched by its
+      powiat gets the codes of the villages around it too. Districts with less than :data:`DISTRICT_SHARE` of
+      the codes of the county are dropped as stray entries (e.g. one '25-215' among the codes of Wroclaw).
+    - Cities without such a county, mostly towns and districts next to a larger city, share the codes of the
+      nearest matched city of their voivodeship in its main postal district, so a code can belong to several
+      cities.
+    - Cities still unmatched are logged and get no codes.
+
+    :param cities: Normalized cities data with the 'city', 'admin_name', 'lat' and 'lng' columns.
+    :type cities: pd.DataFrame
+    :param postal_codes: Postal codes data with the 'state', 'counties', 'district' and 'postal_code' columns.
+    :type postal_codes: pd.DataFrame
+    :return: DataFrame with the 'city_idx' (position in ``cities``) and formatted 'postal_code' of every match,
+        ordered by city.
+    :rtype: pd.DataFrame
+    """
+    def normalize_names(values: pd.Series) -> pd.Series:
+        uniques = pd.Series(values.fillna('').unique())
+        names = dict(zip(uniques, normalize_series(uniques.map(repair_encoding))))
+        return values.fillna('').map(names)
+
+    codes = pd.DataFrame({
+        'county': normalize_names(postal_codes['counties']).str.replace(COUNTY_AFFIXES, '', regex=True),
+        'voivodeship': normalize_names(postal_codes['state']).map(STATE_VOIVODESHIPS),
+        'district': postal_codes['district'],
+        'postal_code': postal_codes['postal_code'].str[:2] + '-' + postal_codes['postal_code'].str[2:],
+    })
+    cities = pd.DataFrame({
+        'city': cities['city'],
+        'voivodeship': cities['admin_name'],
+        'lat': cities['lat'],
+        'lng': cities['lng'],
+        'city_idx': np.arange(len(cities)),
+    })
+
+    candidates = codes[['county', 'voivodeship']].drop_duplicates().merge(cities, on='voivodeship')
+    stems = candidates['county'].str.replace(COUNTY_ADJECTIVE, '', regex=True)
+    adjective = (candidates['county'].str.contains(COUNTY_ADJECTIVE) & ~candidates['county'].str.contains(' ')
+                 & (stems.str.len() >= 4)
+                 & np.fromiter(map(str.startswith, candidates['city'], stems), dtype=bool, count=len(stems)))
+    candidates = candidates.assign(exact=candidates['county'] == candidates['city'], stem=stems.str.len())
+    candidates = candidates[candidates['exact'] | adjective]
+    candidates = candidates.sort_values(['city_idx', 'exact', 'stem'], ascending=[True, False, False])
+    counties = candidates.drop_duplicates('city_idx')[['city_idx', 'county', 'voivodeship']]
+    matches = codes.merge(counties, on=['county', 'voivodeship'])[['city_idx', 'district', 'postal_code']]
+    district_sizes = matches.groupby(['city_idx', 'district'])['postal_code'].transform('size')
+    matches = matches[district_sizes >= DISTRICT_SHARE * matches.groupby('city_idx')['postal_code'].transform('size')]
+
+    # cities without a county of their own share the codes of the main district of the nearest matched city
+    matched = cities['city_idx'].isin(matches['city_idx'])
+    pairs = cities[~matched].merge(cities[matched], on='voivodeship', suffixes=('', '_matched'))
+    pairs['distance'] = np.hypot(pairs['lat'] - pairs['lat_matched'], pairs['lng'] - pairs['lng_matched'])
+    nearest = pairs.sort_values(['city_idx', 'distance'], kind='stable').drop_duplicates('city_idx')
+    main_districts = (matches.groupby(['city_idx', 'district']).size().rename('size').reset_index()
+                      .sort_values(['city_idx', 'size'], ascending=[True, False], kind='stable')
+                      .drop_duplicates('city_idx'))
+    sources = main_districts.merge(matches, on=['city_idx', 'district'])[['city_idx', 'postal_code']]
+    fallback = nearest[['city_idx', 'city_idx_matched']].merge(
+        sources, left_on='city_idx_matched', right_on='city_idx', suffixes=('', '_source'),
+    )
+    logger.info('Matched postal codes of %d cities by county and %d by their nearest city.',
+                matched.sum(), fallback['city_idx'].nunique())
+
+    unmatched = cities.loc[~cities['city_idx'].isin(fallback['city_idx']) & ~matched, 'city']
+    if len(unmatched):
+        logger.warning('No postal codes for %d cities: %s', len(unmatched), ', '.join(unmatched))
+    matches = pd.concat([matches[['city_idx', 'postal_code']], fallback[['city_idx', 'postal_code']]])
+    return matches.sort_values('city_idx', kind='stable').reset_index(drop=True)
+
+
+class LazyDataset:
+    """
+    DataBank attribute descriptor that loads the dataset from its registered source on first access.
+    """
+
+    def __init__(self, dataset: str):
+        """
+        :param dataset: Name of the dataset the attribute belongs to.
+        :type dataset: str
+        """
+        self.dataset = dataset
+        self.name = dataset
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, bank, owner=None):
+        if bank is None:
+            return self
+        if bank._data.get(self.name) is None:
+            bank.load(self.dataset)
+        return bank._data.get(self.name)
+
+    def __set__(self, bank, value):
+        bank._data[self.name] = value
+        for key in [key for key in bank._vocabularies if key[0] == self.name]:
+            del bank._vocabularies[key]
+
+
 class DataBank:
     """
     A class to manage and load various datasets related to names and localizations (by default in Poland).
     """
 
-    def __init__(self):
+    localisation = LazyDataset('localisation')
+    postal_codes = LazyDataset('localisation')
+    postal_offsets = LazyDataset('localisation')
+    first_name = LazyDataset('first_name')
+    last_name = LazyDataset('last_name')
+    car_plates = LazyDataset('car_plates')
+
+    datasets = ('localisation', 'first_name', 'last_name', 'car_plates')
+
+    def __init__(self, params_dict: dict = None, cache: "DataCache" = None, columns: dict = None):
         """
         Initialize the DataBank class with attributes for first names, last names, and localizations.
+
+        When ``params_dict`` is given the datasets are loaded lazily from its sources, each one on first access
+        of the corresponding attribute.
+
+        :param params_dict: Generation parameters with the data source paths, see :meth:`set_sources`.
+        :type params_dict: dict
+        :param cache: Cache of the prepared datasets, see :meth:`set_sources`.
+        :type cache: DataCache
+        :param columns: Columns to load per dataset name, all columns of datasets not listed are loaded.
+        :type columns: dict[str, list[str]]
         """
+        self._data = {}
+        self._vocabularies = {}
+        self._loaders = {}
+        self.cache = None
+        self.columns = columns or {}
         self.first_name = None
         self.last_name = None
+        self.car_plates = None
         self.localisation = None
+        self.postal_codes = None
+        self.postal_offsets = None
+        if params_dict is not None:
+            self.set_sources(params_dict, cache)
         logger.info("DataBank instance created.")
 
+    def set_sources(self, params_dict: dict, cache: "DataCache" = None):
+        """
+        Register the data sources from the parameters, the datasets are loaded on first access.
+
+        :param params_dict: Generation parameters with 'city_data', 'names_data' and 'last_names_data' paths
+            (a space or an empty value selects the built-in data). Setting 'cache' to False skips the
+            on-disk cache.
+        :type params_dict: dict
+        :param cache: Cache of the prepared datasets, defaults to a cache in :func:`default_cache_dir`.
+        :type cache: DataCache
+        """
+        if cache is None and params_dict.get('cache', True):
+            cache = DataCache()
+        self.cache = cache
+        for dataset, sources, loader in self.dataset_loaders(params_dict):
+            self._data[dataset] = None
+            if dataset == 'localisation':
+                self._data['postal_codes'] = self._data['postal_offsets'] = None
+            self._loaders[dataset] = (sources, loader)
+
+    def load_from_params(self, params_dict: dict, cache: "DataCache" = None):
+        """
+        Load all datasets right away, using the user supplied CSV files from the parameters where given.
+
+        :param params_dict: Generation parameters, see :meth:`set_sources`.
+        :type params_dict: dict
+        :param cache: Cache of the prepared datasets, see :meth:`set_sources`.
+        :type cache: DataCache
+        """
+        self.set_sources(params_dict, cache)
+        for dataset in self.datasets:
+            self.load(dataset)
+
+    def is_loaded(self, dataset: str):
+        """
+        :param dataset: Dataset name.
+        :type dataset: str
+        :return: Whether the dataset has been loaded (or was never configured to be loaded).
+        :rtype: bool
+        """
+        return dataset not in self._loaders
+
+    def vocabulary(self, dataset: str, column: str):
+        """
+        Dictionary encoding of a text column of a dataset, computed once and shared by all generators using
+        this DataBank.
+
+        Datasets loaded with :meth:`load_directory` get the vocabularies of their text columns memory-mapped,
+        so they are available even for columns left out of the loaded DataFrame.
+
+        :param dataset: Dataset name.
+        :type dataset: str
+        :param column: Column name.
+        :type column: str
+        :return: Tuple of the category code of every row (-1 for missing values) and the sorted categories.
+        :rtype: tuple[np.ndarray, PackedStrings]
+        """
+        key = (dataset, column)
+        data = getattr(self, dataset)
+        if key not in self._vocabularies:
+            codes, categories = pd.factorize(data[column], sort=True)
+            self._vocabularies[key] = (codes, PackedStrings.from_values(categories))
+        return self._vocabularies[key]
+
+    def source_columns(self, dataset: str):
+        """
+        Columns of a dataset, read from the header of its source file if it is not loaded yet. The built-in
+        localisation data also lists 'postal_code', the postal code drawn for every localisation.
+
+        :param dataset: Dataset name.
+        :type dataset: str
+        :return: Column names, empty if the dataset has no data and no source.
+        :rtype: list[str]
+        """
+        data = self._data.get(dataset)
+        if data is not None:
+            columns = list(data.columns)
+            postal_codes = self._data.get('postal_offsets') is not None
+        elif dataset in self._loaders:
+            sources, _ = self._loaders[dataset]
+            columns = list(pd.read_csv(sources[0], nrows=0).columns)
+            postal_codes = sources == BUILT_IN_SOURCES[dataset]
+        else:
+            return []
+        if dataset == 'localisation' and postal_codes:
+            columns.append('postal_code')
+        return columns
+
+    def text_columns(self, dataset: str):
+        """
+        :param dataset: Dataset name.
+        :type dataset: str
+        :return: Names of the text columns of a loaded dataset, including the columns only kept as a
+            vocabulary.
+        :rtype: list[str]
+        """
+        data = self._data.get(dataset)
+        columns = [] if data is None else [column for column in data.columns if data[column].dtype == object]
+        return columns + [column for name, column in self._vocabularies if name == dataset and column not in columns]
+
+    def load(self, dataset: str):
+        """
+        Load a dataset from its registered source, unless it is already loaded.
+
+        The load time and the change of the process RSS are logged per dataset.
+
+        :param dataset: Dataset name.
+        :type dataset: str
+        """
+        if dataset not in self._loaders:
+            return
+        sources, loader = self._loaders.pop(dataset)
+        columns = self.columns.get(dataset)
+        start_time, start_rss = time.perf_counter(), current_rss()
+
+        if self.cache is not None:
+            self.cache.load(self, dataset, sources, loader, columns)
+        else:
+            loader()
+        data = self._data.get(dataset)
+        if columns is not None and data is not None and list(data.columns) != list(columns):
+            # text columns left out are kept as vocabularies, they hold no Python strings
+            for column in data.columns:
+                if column not in columns and data[column].dtype == object:
+                    self.vocabulary(dataset, column)
+            self._data[dataset] = data[[column for column in columns if column in data.columns]]
+
+        rss = current_rss()
+        logger.info('Loaded %s data from %s in %.3f s (RSS %s, %s change)', dataset, ', '.join(sources),
+                    time.perf_counter() - start_time, format_bytes(rss),
+                    format_bytes(rss - start_rss) if rss is not None and start_rss is not None else 'n/a')
+
+    def dataset_loaders(self, params_dict: dict):
+        """
+        List the source files and the loading function of every dataset for the given parameters.
+
+        :param params_dict: Generation parameters with 'city_data', 'names_data' and 'last_names_data' paths.
+        :type params_dict: dict
+        :return: List of (dataset, source files, loader) tuples.
+        :rtype: list[tuple[str, list[str], Callable]]
+        """
+        def csv_loader(dataset, path):
+            def load():
+                setattr(self, dataset, self.load_csv_data(path))
+            return load
+
+        loaders = []
+        for dataset, param, built_in_loader in (
+            ('localisation', 'city_data', self.load_built_in_localisation_data),
+            ('first_name', 'names_data', self.load_built_in_names_data),
+            ('last_name', 'last_names_data', self.load_built_in_last_name_data),
+        ):
+            path = params_dict.get(param)
+            if path and path != ' ':
+                loaders.append((dataset, [os.path.abspath(path)], csv_loader(dataset, path)))
+            else:
+                loaders.append((dataset, BUILT_IN_SOURCES[dataset], built_in_loader))
+        loaders.append(('car_plates', BUILT_IN_SOURCES['car_plates'], self.load_built_in_car_plates_data))
+        return loaders
+
+    def save(self, directory: str, datasets: tuple = None):
+        """
+        Save the loaded datasets as NumPy arrays, one '.npy' file per column.
+
+        Text columns are stored as their vocabulary (see :meth:`vocabulary`): the codes of the rows and the
+        packed UTF-8 categories, see :class:`PackedStrings`. Every file can be memory-mapped by
+        :meth:`from_directory`.
+
+        :param directory: Target directory, created if missing.
+        :type directory: str
+        :param datasets: Names of the datasets to save, defaults to all loaded datasets.
+        :type datasets: tuple[str]
+        """
+        for dataset in self.datasets if datasets is None else datasets:
+            data = getattr(self, dataset)
+            if data is None:
+                continue
+            dataset_dir = os.path.join(directory, dataset)
+            os.makedirs(dataset_dir, exist_ok=True)
+            columns = []
+            text_columns = self.text_columns(dataset)
+            for idx, column in enumerate(list(data.columns) + [c for c in text_columns if c not in data.columns]):
+                if column in text_columns:
+                    codes, categories = self.vocabulary(dataset, column)
+                    entry = {'name': str(column), 'codes': f'{idx}.codes.npy', 'strings': str(idx),
+                             'loaded': column in data.columns}
+                    np.save(os.path.join(dataset_dir, entry['codes']), np.asarray(codes, dtype=np.int32))
+                    categories.save(os.path.join(dataset_dir, entry['strings']))
+                else:
+                    entry = {'name': str(column), 'file': f'{idx}.npy'}
+                    np.save(os.path.join(dataset_dir, entry['file']), data[column].to_numpy())
+                columns.append(entry)
+            if dataset == 'localisation' and self.postal_offsets is not None:
+                np.save(os.path.join(dataset_dir, 'postal_codes.npy'), np.asarray(self.postal_codes, dtype=str))
+                np.save(os.path.join(dataset_dir, 'postal_offsets.npy'), self.postal_offsets)
+            with open(os.path.join(dataset_dir, 'columns.json'), 'w', encoding='utf-8') as f:
+                json.dump(columns, f)
+        logger.info('DataBank saved to %s', directory)
+
+    def load_directory(self, directory: str, datasets: tuple = None, mmap_mode: str = 'r', columns: list = None):
+        """
+        Load datasets saved with :meth:`save` into this DataBank.
+
+        The vocabularies of all text columns are memory-mapped, the strings of a text column are only
+        materialised if the column is loaded into the DataFrame.
+
+        :param directory: Directory written by :meth:`save`.
+        :type directory: str
+        :param datasets: Names of the datasets to load, defaults to all saved datasets.
+        :type datasets: tuple[str]
+        :param mmap_mode: Memory-map mode passed to ``np.load``, ``None`` reads the arrays into memory.
+        :type mmap_mode: str
+        :param columns: Columns to load, defaults to the columns the dataset had when it was saved. Only the
+            files of these columns are read.
+        :type columns: list[str]
+        """
+        for dataset in self.datasets if datasets is None else datasets:
+            dataset_dir = os.path.join(directory, dataset)
+            manifest = os.path.join(dataset_dir, 'columns.json')
+            if not os.path.exists(manifest):
+                continue
+            with open(manifest, encoding='utf-8') as f:
+                entries = json.load(f)
+            data = {}
+            vocabularies = {}
+            rows = None
+            for entry in entries:
+                loaded = entry.get('loaded', True) if columns is None else entry['name'] in columns
+                if 'codes' in entry:
+                    codes = np.load(os.path.join(dataset_dir, entry['codes']), mmap_mode=mmap_mode)
+                    categories = PackedStrings.load(os.path.join(dataset_dir, entry['strings']), mmap_mode)
+                    vocabularies[entry['name']] = (codes, categories)
+                    rows = len(codes)
+                    if loaded:
+                        data[entry['name']] = categories.take(codes)
+                elif loaded:
+                    data[entry['name']] = np.load(os.path.join(dataset_dir, entry['file']), mmap_mode=mmap_mode)
+                    rows = len(data[entry['name']])
+            # keep the number of rows of datasets loaded without any DataFrame column
+            setattr(self, dataset, pd.DataFrame(data, index=pd.RangeIndex(rows or 0), copy=False))
+            for column, vocabulary in vocabularies.items():
+                self._vocabularies[(dataset, column)] = vocabulary
+            if dataset == 'localisation':
+                if os.path.exists(os.path.join(dataset_dir, 'postal_offsets.npy')):
+                    self.postal_codes = np.load(os.path.join(dataset_dir, 'postal_codes.npy')).astype(object)
+                    self.postal_offsets = np.load(os.path.join(dataset_dir, 'postal_offsets.npy'), mmap_mode=mmap_mode)
+                else:
+                    self.postal_codes = self.postal_offsets = None
+        logger.info('DataBank loaded from %s', directory)
+
+    @classmethod
+    def from_directory(cls, directory: str, mmap_mode: str = 'r'):
+        """
+        Create a DataBank from datasets saved with :meth:`save`.
+
+        :param directory: Directory written by :meth:`save`.
+        :type directory: str
+        :param mmap_mode: Memory-map mode passed to ``np.load``, ``None`` reads the arrays into memory.
+        :type mmap_mode: str
+        :return: DataBank with the saved datasets.
+        :rtype: DataBank
+        """
+        bank = cls()
+        bank.load_directory(directory, mmap_mode=mmap_mode)
+        return bank
+
     def load_built_in_localisation_data(self):
         """
         Load built-in localization data for Polish cities and their postal codes.
 
         This method reads city and postal code data from predefined CSV files, normalizes the city names,
-        and associates each city with its respective postal codes.
+        and associates each city with its respective postal codes, see :func:`match_postal_codes`. The postal codes are
+        stored as one flat array in :attr:`postal_codes`, the codes of city ``i`` being
+        ``postal_codes[postal_offsets[i]:postal_offsets[i + 1]]``.
         """
-        data_dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
-        logger.info("Loading built-in localization data from %s", data_dir_path)
+        logger.info("Loading built-in localization data from %s", DATA_DIR)
 
         try:
-            city_list = pd.read_csv(os.path.join(data_dir_path, "Poland_cities", "pl.csv"))
-            regions_admin_info = pd.read_csv(os.path.join(data_dir_path, "Poland_postal_codes",
-                                                          "Poland_complete_postal_codes_admin_div.csv"))
-
-            city_list["city"] = city_list["city"].apply(normalize_text)
-            regions_admin_info["Administrative Division"] = \
-                regions_admin_info["Administrative Division"].apply(normalize_text)
-            city_list['postal_code'] = [[] for _ in range(len(city_list))]
-
-            for idx, row in city_list.iterrows():
-                city = row['city']
-                postal_codes = \
-                    regions_admin_info[regions_admin_info['Administrative Division'] == city]['Postal Code'].tolist()
-                city_list.at[idx, 'postal_code'] = postal_codes
-
-            self.localisation = city_list   # .apply(normalize_text)
-            logger.info("Localization data loaded successfully.")
+            city_path, postal_path = BUILT_IN_SOURCES['localisation']
+            city_list = normalize_frame(pd.read_csv(city_path))
+            regions_admin_info = pd.read_csv(postal_path, encoding="utf-8-sig", dtype=str)
+
+            matches = match_postal_codes(city_list, regions_admin_info)
+
+            self.postal_codes = matches["postal_code"].to_numpy(dtype=object)
+            self.postal_offsets = np.concatenate(
+                ([0], np.cumsum(np.bincount(matches["city_idx"], minlength=len(city_list))))
+            ).astype(np.int64)
+
+            self.localisation = city_list
+            logger.info("Localization data loaded successfully (%d postal codes for %d cities).",
+                        len(self.postal_codes), int((np.diff(self.postal_offsets) > 0).sum()))
         except Exception as e:
             logger.error("Error loading localization data: %s", str(e))
 
@@ -77,13 +566,10 @@ class DataBank:
 
         This method reads first names data from a predefined CSV file.
         """
-        data_dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
-        logger.info("Loading built-in names data from %s", data_dir_path)
+        logger.info("Loading built-in names data from %s", DATA_DIR)
 
         try:
-            self.first_name = pd.read_csv(os.path.join(data_dir_path, "Poland_all_first_last_names",
-                                                       "Imiona_nadane_wPolsce_w_latach_2000-2019.csv"))
-            self.first_name = self.first_name.apply(normalize_text)
+            self.first_name = normalize_frame(pd.read_csv(BUILT_IN_SOURCES['first_name'][0]))
             logger.info("First names data loaded successfully.")
         except Exception as e:
             logger.error("Error loading first names data: %s", str(e))
@@ -94,17 +580,38 @@ class DataBank:
 
         This method reads last names data from a predefined text file.
         """
-        data_dir_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
-        logger.info("Loading built-in last names data from %s", data_dir_path)
+        logger.info("Loading built-in last names data from %s", DATA_DIR)
 
         try:
-            self.last_name = pd.read_csv(os.path.join(data_dir_path, "Poland_all_first_last_names",
-                                                      "polish_surnames.txt"), header=None, names=['last_names'])
-            self.last_name = self.last_name.apply(normalize_text)
+            self.last_name = normalize_frame(pd.read_csv(BUILT_IN_SOURCES['last_name'][0], header=None,
+                                                         names=['last_names']))
             logger.info("Last names data loaded successfully.")
         except Exception as e:
             logger.error("Error loading last names data: %s", str(e))
 
+    def load_built_in_car_plates_data(self):
+        """
+        Load built-in licence plate prefixes of Polish cities and counties.
+
+        The source lists the prefixes of every city or county (admin name) in brackets, e.g. '[DJ VJ]'. They
+        are stored one prefix per row, with the position of the city or county in the source as 'area',
+        its normalized 'admin_name' and the upper case 'prefix'.
+        """
+        logger.info("Loading built-in car plates data from %s", DATA_DIR)
+
+        try:
+            plates = pd.read_csv(BUILT_IN_SOURCES['car_plates'][0])
+            prefixes = plates['plate shortcut'].str.strip('[] ').str.split()
+            counts = prefixes.str.len().to_numpy()
+            self.car_plates = pd.DataFrame({
+                'area': np.repeat(np.arange(len(plates)), counts),
+                'admin_name': np.repeat(normalize_series(plates['admin name']).to_numpy(), counts),
+                'prefix': np.concatenate(prefixes.to_numpy()).astype(object),
+            })
+            logger.info("Car plates data loaded successfully (%d prefixes of %d areas).", counts.sum(), len(plates))
+        except Exception as e:
+            logger.error("Error loading car plates data: %s", str(e))
+
     def load_csv_data(self, path: str):
         """
         Load data from a specified CSV file.
@@ -123,9 +630,165 @@ class DataBank:
 
         try:
             data = pd.read_csv(os.path.abspath(path))
-            data = data.apply(normalize_text)
+            data = normalize_frame(data)
             logger.info("CSV data loaded successfully from %s", path)
             return data
         except Exception as e:
             logger.error("Error loading CSV data from %s: %s", path, str(e))
             raise
+
+
+def default_cache_dir():
+    """
+    Directory of the reference data cache: $GENERATIVE_DATABASES_CACHE or ~/.cache/generative_databases.
+
+    :return: Cache directory path.
+    :rtype: str
+    """
+    return os.environ.get('GENERATIVE_DATABASES_CACHE',
+                          os.path.join(os.path.expanduser('~'), '.cache', 'generative_databases'))
+
+
+class DataCache:
+    """
+    On-disk cache of normalised and indexed datasets, stored in the :meth:`DataBank.save` format.
+
+    Every entry is keyed by the content hash of its source files. File hashes are remembered together with
+    the file size and modification time, so unchanged sources are not re-read, and an entry is rebuilt as
+    soon as any of its sources changes.
+    """
+
+    def __init__(self, directory: str = None):
+        """
+        :param directory: Cache directory, defaults to :func:`default_cache_dir`.
+        :type directory: str
+        """
+        self.directory = directory or default_cache_dir()
+        self.fingerprints_path = os.path.join(self.directory, 'fingerprints.json')
+        self._fingerprints = None
+
+    def _load_fingerprints(self):
+        if self._fingerprints is None:
+            try:
+                with open(self.fingerprints_path, encoding='utf-8') as f:
+                    self._fingerprints = json.load(f)
+            except (OSError, ValueError):
+                self._fingerprints = {}
+        return self._fingerprints
+
+    def file_hash(self, path: str):
+        """
+        SHA-256 of a source file, re-computed only when its size or modification time changed.
+
+        :param path: Source file path.
+        :type path: str
+        :return: Hex digest of the file content.
+        :rtype: str
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        fingerprints = self._load_fingerprints()
+        known = fingerprints.get(path)
+        if known and known['mtime'] == stat.st_mtime_ns and known['size'] == stat.st_size:
+            return known['sha256']
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        fingerprints[path] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest.hexdigest()}
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.fingerprints_path, 'w', encoding='utf-8') as f:
+            json.dump(fingerprints, f)
+        return digest.hexdigest()
+
+    def entry_path(self, dataset: str, sources: list):
+        """
+        Directory of the cache entry for a dataset built from the given sources.
+
+        :param dataset: Dataset name.
+        :type dataset: str
+        :param sources: Source file paths.
+        :type sources: list[str]
+        :return: Entry directory path.
+        :rtype: str
+        """
+        key = hashlib.sha256(json.dumps([CACHE_VERSION, dataset, [self.file_hash(s) for s in sources]]).encode())
+        return os.path.join(self.directory, f'{dataset}-{key.hexdigest()[:16]}')
+
+    def load(self, bank: DataBank, dataset: str, sources: list, loader, columns: list = None):
+        """
+        Load a dataset into the DataBank from the cache, building the cache entry with ``loader`` if needed.
+
+        :param bank: DataBank to fill.
+        :type bank: DataBank
+        :param dataset: Dataset name.
+        :type dataset: str
+        :param sources: Source file paths the dataset is built from.
+        :type sources: list[str]
+        :param loader: Function loading the dataset from its sources into ``bank``.
+        :type loader: Callable
+        :param columns: Columns to load from a cache entry, defaults to all columns.
+        :type columns: list[str]
+        """
+        try:
+            entry = self.entry_path(dataset, sources)
+        except OSError as e:
+            logger.warning('Cache unavailable for %s data: %s', dataset, str(e))
+            loader()
+            return
+
+        if os.path.exists(os.path.join(entry, dataset, 'columns.json')):
+            bank.load_directory(entry, (dataset,), columns=columns)
+            logger.info('Loaded %s data from cache %s', dataset, entry)
+            return
+
+        loader()
+        if getattr(bank, dataset) is None:
+            return
+        tmp_entry = None
+        try:
+            tmp_entry = tempfile.mkdtemp(prefix=f'.{dataset}-', dir=self.directory)
+            bank.save(tmp_entry, (dataset,))
+            os.replace(tmp_entry, entry)
+            logger.info('Cached %s data in %s', dataset, entry)
+        except OSError as e:
+            if tmp_entry is not None:
+                shutil.rmtree(tmp_entry, ignore_errors=True)
+            logger.warning('Could not cache %s data: %s', dataset, str(e))
+            return
+        # continue on the memory-mapped entry, so the first run holds no more strings than later ones
+        bank.load_directory(entry, (dataset,), columns=columns)
+
+    def warm(self, params_dict: dict):
+        """
+        Build the cache entries of all datasets used by the given parameters.
+
+        :param params_dict: Generation parameters with 'city_data', 'names_data' and 'last_names_data' paths.
+        :type params_dict: dict
+        :return: DataBank with the loaded datasets.
+        :rtype: DataBank
+        """
+        bank = DataBank()
+        bank.load_from_params(params_dict, cache=self)
+        return bank
+
+    def clear(self):
+        """
+        Remove all cache entries.
+
+        :return: Number of removed entries.
+        :rtype: int
+        """
+        if not os.path.isdir(self.directory):
+            return 0
+        removed = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+            else:
+                os.remove(path)
+        logger.info('Cleared %d cache entries from %s', removed, self.directory)
+        return removed
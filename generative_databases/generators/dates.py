@@ -0,0 +1,53 @@
+import numpy as np
+
+
+def split_dates(dates: np.ndarray):
+    """
+    Split an array of dates into integer year, month and day arrays.
+
+    :param dates: Array of dates (anything convertible to ``datetime64[D]``).
+    :type dates: np.ndarray
+    :return: Tuple of year, month and day arrays.
+    :rtype: tuple[np.ndarray, np.ndarray, np.ndarray]
+    """
+    dates = np.asarray(dates).astype("datetime64[D]")
+    months = dates.astype("datetime64[M]")
+    years = months.astype("datetime64[Y]").astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (dates - months).astype(np.int64) + 1
+    return years, month, day
+
+
+def random_dates(first_year: int, last_year: int, size: int, rng=None, year_weights: np.ndarray = None):
+    """
+    Draw random dates between the 1st of January of ``first_year`` and the 31st of December of ``last_year``.
+
+    :param first_year: First year of the range.
+    :type first_year: int
+    :param last_year: Last year of the range (inclusive).
+    :type last_year: int
+    :param size: Number of dates to draw.
+    :type size: int
+    :param rng: Random number generator, defaults to a fresh ``np.random.default_rng()``.
+    :type rng: np.random.Generator
+    :param year_weights: Optional weight for every year of the range. Without it every day is equally likely,
+        with it a year is drawn by weight first and then a uniform day within that year.
+    :type year_weights: np.ndarray
+    :return: Array of ``datetime64[D]`` dates.
+    :rtype: np.ndarray
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    if last_year < first_year:
+        raise ValueError(f"Invalid year range: {first_year}-{last_year}")
+    year_starts = np.arange(first_year - 1970, last_year - 1970 + 2).astype("datetime64[Y]").astype("datetime64[D]")
+
+    if year_weights is None:
+        offsets = rng.integers(0, (year_starts[-1] - year_starts[0]).astype(np.int64), size)
+        return year_starts[0] + offsets
+
+    year_weights = np.asarray(year_weights, dtype=np.float64)
+    year_idx = rng.choice(len(year_weights), size, p=year_weights / year_weights.sum())
+    year_lengths = np.diff(year_starts).astype(np.int64)
+    offsets = (rng.random(size) * year_lengths[year_idx]).astype(np.int64)
+    return year_starts[year_idx] + offsets
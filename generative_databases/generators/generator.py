@@ -1,59 +1,288 @@
-import random
+import threading
 import numpy as np
 from datetime import date
+from functools import cached_property
 import pandas as pd
 import logging
-from generative_databases.generators import data_importer
-from sqlalchemy import create_engine
-import radar
+from generative_databases.generators import data_importer, writers
+from generative_databases.generators.name_sampler import NameSampler
+from generative_databases.generators.pesel import PeselGenerator
+from generative_databases.generators.plates import PlateGenerator
+from generative_databases.generators.dates import random_dates, split_dates
+from generative_databases.generators.instrumentation import Metrics
+from generative_databases.generators.pipeline import QUEUE_SIZE, Cancelled
 
-
-# Konfiguracja loggera
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.FileHandler("generator.log")],
-)
 logger = logging.getLogger(__name__)
 
+PERSON_COLUMNS = [
+    "Birth Date",
+    "Gender",
+    "Last Name",
+    "Name",
+    "Second Name",
+    "Pesel Number",
+]
+
+# opt-in column, plates of the city or voivodeship of the localisation, generated only when listed in 'columns'
+PLATE_COLUMN = "Plate Number"
+# columns whose values are unique across the whole output, including the rows of outputs appended to
+UNIQUE_COLUMNS = ("Pesel Number", PLATE_COLUMN)
+
+GENDERS = pd.Index(["m", "k"], dtype=object)
+
+# columns of the name datasets read as DataFrame columns, the names themselves are only used through the packed
+# vocabularies of the DataBank (see data_importer.DataBank.vocabulary) and never materialised as a whole
+NAME_DATA_COLUMNS = {"first_name": ["Year", "Number", "Gender"], "last_name": []}
+
+# generation parameters used where a job or a caller leaves them out
+DEFAULT_PARAMS = {
+    "city_data": " ",
+    "names_data": " ",
+    "last_names_data": " ",
+    "loc_w_prob": True,
+    "names_w_prob": True,
+    "sex_prob": 50,
+    "sec_name_prob": 30,
+    "year_range": [1950, 2015],
+    "birth_dist": "uniform",
+    "chunk_size": 0,
+    "columns": None,
+    "workers": 1,
+    "seed": None,
+    "relational": False,
+    "vehicles_per_person": 0.5,
+    "append": False,
+    "queue_size": QUEUE_SIZE,
+}
+
+
+def required_datasets(params_dict: dict) -> tuple:
+    """
+    Names of the DataBank datasets needed to generate the columns requested in the parameters.
+
+    :param params_dict: Generation parameters, 'columns' lists the output columns (all if missing). Relational
+        samples (see :class:`relational.RelationalGenerator`) need every dataset.
+    :type params_dict: dict
+    :return: Tuple of dataset names.
+    :rtype: tuple[str]
+    """
+    if params_dict.get("relational"):
+        return data_importer.DataBank.datasets
+    columns = params_dict.get("columns")
+    if columns is None:
+        return "localisation", "first_name", "last_name"
+    datasets = []
+    if any(column not in PERSON_COLUMNS for column in columns):
+        datasets.append("localisation")
+    if (
+        "Name" in columns
+        or "Second Name" in columns
+        or params_dict.get("birth_dist", "uniform") == "names"
+    ):
+        datasets.append("first_name")
+    if "Last Name" in columns:
+        datasets.append("last_name")
+    if PLATE_COLUMN in columns:
+        datasets.append("car_plates")
+    return tuple(datasets)
+
+
+def required_columns(params_dict: dict) -> dict:
+    """
+    Columns of every DataBank dataset needed to generate the columns requested in the parameters.
+
+    :param params_dict: Generation parameters, 'columns' lists the output columns (all if missing).
+    :type params_dict: dict
+    :return: Dictionary mapping dataset names to column lists, datasets not listed are needed in full.
+    :rtype: dict[str, list[str]]
+    """
+    columns = params_dict.get("columns")
+    if columns is None or params_dict.get("relational"):
+        return dict(NAME_DATA_COLUMNS)
+    localisation_columns = [
+        column
+        for column in columns
+        if column not in PERSON_COLUMNS and column not in ("postal_code", PLATE_COLUMN)
+    ]
+    if PLATE_COLUMN in columns:
+        localisation_columns += ["city", "admin_name"]
+    if params_dict.get("loc_w_prob"):
+        localisation_columns.append("population")
+    return dict(NAME_DATA_COLUMNS, localisation=list(dict.fromkeys(localisation_columns)))
+
+
+def validate_columns(params_dict: dict, data_storage: data_importer.DataBank = None):
+    """
+    Check that every output column requested in the parameters can be generated.
+
+    :param params_dict: Generation parameters, 'columns' lists the output columns (all if missing).
+    :type params_dict: dict
+    :param data_storage: Reference data the sample is generated from, by default the sources in ``params_dict``
+        whose headers are read without loading them.
+    :type data_storage: data_importer.DataBank
+    :raises ValueError: If 'columns' is empty or lists unknown columns.
+    """
+    columns = params_dict.get("columns")
+    if columns is None or params_dict.get("relational"):
+        return
+    if not columns:
+        raise ValueError("columns must list at least one column")
+    if data_storage is None:
+        data_storage = data_importer.DataBank()
+        data_storage.set_sources(dict(params_dict, cache=False))
+    known = PERSON_COLUMNS + data_storage.source_columns("localisation") + [PLATE_COLUMN]
+    unknown = [column for column in columns if column not in known]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)} (available: {', '.join(known)})")
+
+
+def scan_unique_columns(params_dict: dict, outputs: dict, options: dict = None):
+    """
+    Read the values of the unique columns (see :data:`UNIQUE_COLUMNS`) requested in the parameters from
+    existing outputs, one column at a time.
+
+    :param params_dict: Generation parameters, 'columns' lists the output columns (all if missing).
+    :type params_dict: dict
+    :param outputs: Dictionary mapping output formats to file paths.
+    :type outputs: dict
+    :param options: Dictionary mapping output formats to extra sink options, SQL outputs are read from the
+        'table_name' table.
+    :type options: dict
+    :return: Generator yielding (column, values) pairs batch by batch, see :func:`writers.scan_column`.
+    :rtype: Iterator[tuple[str, np.ndarray]]
+    """
+    columns = params_dict.get("columns")
+    if columns is None:
+        columns = PERSON_COLUMNS
+    for output_type, path in outputs.items():
+        table_name = (options or {}).get(output_type, {}).get("table_name", "people")
+        for column in UNIQUE_COLUMNS:
+            if column in columns:
+                for values in writers.scan_column(output_type, path, column, table_name):
+                    yield column, values
+
+
+def record_outputs(metrics: Metrics, reports: dict):
+    """
+    Add the per-output timings, the time generation waited for every output, byte counts and failures reported
+    by ``writers.write_chunks`` to metrics.
+
+    :param metrics: Metrics of the run.
+    :type metrics: Metrics
+    :param reports: Reports returned by ``writers.write_chunks``.
+    :type reports: dict
+    """
+    for output_type, report in reports.items():
+        metrics.record(f"output.{output_type}", report["seconds"])
+        metrics.record(f"output.{output_type}.blocked", report.get("blocked", 0.0))
+        if report["bytes"] is not None:
+            metrics.count(f"bytes.{output_type}", report["bytes"])
+        if report["error"] is not None:
+            metrics.count(f"errors.{output_type}")
+
 
 class Generator:
     """
     Generator class for creating synthetic data.
     """
 
-    def __init__(self, params_dict: dict):
+    def __init__(
+        self,
+        params_dict: dict,
+        data_storage: data_importer.DataBank = None,
+        rng: np.random.Generator = None,
+        metrics: Metrics = None,
+        name_sampler: NameSampler = None,
+        cancel: threading.Event = None,
+    ):
+        """
+        :param params_dict: Generation parameters. The optional 'columns' entry limits the output to the
+            listed columns, reference data not needed for them is never loaded.
+        :type params_dict: dict
+        :raises ValueError: If 'columns' lists unknown columns, see :func:`validate_columns`.
+        :param data_storage: Reference data, lazily loaded from the sources in ``params_dict`` if not given.
+        :type data_storage: data_importer.DataBank
+        :param rng: Random number generator used for every draw, created from the 'seed' parameter if not given.
+        :type rng: np.random.Generator
+        :param metrics: Collector of stage timings and counters, by default a new one writing its summary to
+            the 'metrics_path' parameter (if set) after :meth:`generate_and_save`.
+        :type metrics: Metrics
+        :param name_sampler: Name sampler built from the same DataBank, shared between generators instead of
+            building one per generator.
+        :type name_sampler: NameSampler
+        :param cancel: Event cancelling the generation when set, checked before every chunk, e.g. shared by the
+            generators of several jobs. A new one is created if not given, see :meth:`cancel`.
+        :type cancel: threading.Event
+        """
         self.sample_size = params_dict["sample_size"]
         self.second_name_chance = params_dict["sec_name_prob"] * 0.01
-        self.data_storage = data_importer.DataBank()
-        self.used_pesel_base = []
+        self.pesel_generator = PeselGenerator()
         self.woman = params_dict["sex_prob"] * 0.01
-        city_data = params_dict["city_data"]
-        names_data = params_dict["names_data"]
-        last_names_data = params_dict["last_names_data"]
         self.params_dict = params_dict
-        if city_data and city_data != " ":
-            self.data_storage.localisation = self.data_storage.load_csv_data(city_data)
-            logger.info(f"Loaded city data from {city_data}")
-        else:
-            self.data_storage.load_built_in_localisation_data()
-            logger.info("Loaded built-in city data")
-
-        if names_data and names_data != " ":
-            self.data_storage.first_name = self.data_storage.load_csv_data(names_data)
-            logger.info(f"Loaded names data from {names_data}")
-        else:
-            self.data_storage.load_built_in_names_data()
-            logger.info("Loaded built-in names data")
-
-        if last_names_data and last_names_data != " ":
-            self.data_storage.last_name = self.data_storage.load_csv_data(
-                last_names_data
+        self.columns = params_dict.get("columns")
+        if data_storage is None:
+            data_storage = data_importer.DataBank(
+                params_dict, columns=required_columns(params_dict)
             )
-            logger.info(f"Loaded last names data from {last_names_data}")
-        else:
-            self.data_storage.load_built_in_last_name_data()
-            logger.info("Loaded built-in last names data")
+        self.data_storage = data_storage
+        validate_columns(params_dict, data_storage)
+
+        if rng is None:
+            rng = np.random.default_rng(params_dict.get("seed"))
+        self.rng = rng
+        if metrics is None:
+            metrics = Metrics(path=params_dict.get("metrics_path"))
+        self.metrics = metrics
+        if name_sampler is not None:
+            self.name_sampler = name_sampler
+        self.cancel_event = threading.Event() if cancel is None else cancel
+
+    def cancel(self):
+        """
+        Cancel a running :meth:`generate_chunks` or :meth:`generate_and_save` from another thread.
+
+        Generation stops before its next chunk and the outputs are closed with the chunks written so far.
+        """
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        """
+        :raises Cancelled: If the generation was cancelled.
+        """
+        if self.cancel_event.is_set():
+            raise Cancelled("Generation cancelled")
+
+    @cached_property
+    def name_sampler(self) -> NameSampler:
+        """
+        Name sampler built from the first names data on first use.
+        """
+        with self.metrics.stage("persons.name_sampler"):
+            return NameSampler(
+                self.data_storage.first_name,
+                self.data_storage.vocabulary("first_name", "Name"),
+            )
+
+    @cached_property
+    def plate_generator(self) -> PlateGenerator:
+        """
+        Plate generator built from the car plates data on first use, using the partition of the PESEL
+        generator so generators of parallel workers never issue the same plate.
+        """
+        return PlateGenerator(
+            self.data_storage.car_plates, partition=self.pesel_generator.partition
+        )
+
+    def wants(self, column: str) -> bool:
+        """
+        Check whether a column is part of the requested output.
+
+        :param column: Column name.
+        :type column: str
+        :return: True if the column is requested or no column selection was given.
+        :rtype: bool
+        """
+        return self.columns is None or column in self.columns
 
     def get_random_name(self, year: int, gender: str, p: bool = True):
         """
@@ -65,43 +294,17 @@ class Generator:
         :type gender: str
         :param p: Whether to use weighted probabilities.
         :type p: bool
-        :return: Randomly selected name.
+        :return: Randomly selected name, None if the names data has no name for the year and gender.
         :rtype: str
         """
-        try:
-            if p:
-                min_year = self.data_storage.first_name["Year"].min()
-                max_year = self.data_storage.first_name["Year"].max()
-
-                if year < min_year:
-                    year = min_year
-                elif year > max_year:
-                    year = max_year
-                names = self.data_storage.first_name[
-                    (self.data_storage.first_name["Year"] == year)
-                    & (self.data_storage.first_name["Gender"] == gender)
-                ]
-                if not names.empty:
-                    name = np.random.choice(
-                        names["Name"], p=names["Number"] / names["Number"].sum()
-                    )
-                    logger.info(
-                        f"Generated random name: {name} for year: {year} and gender: {gender}"
-                    )
-                    return name
-                return None
-            else:
-                names = self.data_storage.first_name[
-                    (self.data_storage.first_name["Gender"] == gender)
-                ]
-                if not names.empty:
-                    name = np.random.choice(names["Name"])
-                    logger.info(f"Generated random name: {name} for gender: {gender}")
-                    return name
-                return None
-        except Exception as e:
-            logger.error(f"Error in get_random_name: {e}")
-            return None
+        name = self.name_sampler.sample(
+            np.array([year]), np.array([gender]), p, self.rng
+        )[0]
+        if name is not None and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                f"Generated random name: {name} for year: {year} and gender: {gender}"
+            )
+        return name
 
     def get_random_pesel(self, birth_date: date, gender: str):
         """
@@ -111,254 +314,409 @@ class Generator:
         :type birth_date: date
         :param gender: Gender ('M' or 'K').
         :type gender: str
+        :raises ValueError: If no PESEL number can be generated for the birthdate and gender, see
+            :meth:`PeselGenerator.generate`.
         :return: Randomly generated PESEL number.
         :rtype: str
         """
-        try:
-            pesel_digits = []
-            month_pesel_start = 80
-            start_century = 18
-
-            if birth_date.year < start_century * 100:
-                raise ValueError(
-                    "Provided birth_date doesn't allow to generate PESEL number"
-                )
-
-            # add first two digits
-            pesel_digits.append(str(birth_date.year)[-2])
-            pesel_digits.append(str(birth_date.year)[-1])
-
-            # add third and fourth digits
-            pesel_month = (
-                month_pesel_start
-                + (((birth_date.year // 100) - start_century) * 20) % 100
-                + birth_date.month
+        final_pesel = self.pesel_generator.generate(
+            np.array([birth_date], dtype="datetime64[D]"),
+            np.array([gender]),
+            self.rng,
+        )[0]
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Generated PESEL number: {final_pesel}")
+        return final_pesel
+
+    def generate_birth_dates(self, size: int) -> np.ndarray:
+        """
+        Generate random birth dates within the configured year range.
+
+        With ``birth_dist`` set to "names" in the parameters, years are weighted by the number of
+        births recorded in the first names data, otherwise every day is equally likely.
+
+        :param size: Number of birth dates to generate.
+        :type size: int
+        :return: Array of ``datetime64[D]`` birth dates.
+        :rtype: np.ndarray
+        """
+        first_year, last_year = self.params_dict["year_range"]
+        year_weights = None
+        if self.params_dict.get("birth_dist", "uniform") == "names":
+            year_weights = self.name_sampler.births_per_year(
+                np.arange(first_year, last_year + 1)
             )
-            if pesel_month < 10:
-                pesel_digits.append(0)
-            else:
-                pesel_digits.append(str(pesel_month)[-2])
-            pesel_digits.append(pesel_month % 10)
-
-            # add fifth and sixth digits
-            if birth_date.day < 10:
-                pesel_digits.append(0)
-            else:
-                pesel_digits.append(str(birth_date.day)[-2])
-            pesel_digits.append(birth_date.day % 10)
-
-            # add rest of digits
-            while True:
-                # add seventh, eighth, ninth digits
-                pesel_digits.append(random.randint(0, 9))
-                pesel_digits.append(random.randint(0, 9))
-                pesel_digits.append(random.randint(0, 9))
-
-                # add tenth digit
-                if gender == "M":
-                    pesel_digits.append(random.choice([1, 3, 5, 7, 9]))
-                elif gender == "K":
-                    pesel_digits.append(random.choice([0, 2, 4, 6, 8]))
-                else:
-                    raise ValueError("Wrong Gender value provided to PESEL generator!")
+        with self.metrics.stage("persons.dates"):
+            return random_dates(first_year, last_year, size, self.rng, year_weights)
 
-                # calculate control number
-                control_digit_weights = [1, 3, 7, 9, 1, 3, 7, 9, 1, 3, 1]
-                control_sum = 0
+    def generate_genders(self, size: int) -> pd.Categorical:
+        """
+        Generate random genders with the configured share of women.
 
-                for number in range(10):
-                    control_sum += (
-                        int(pesel_digits[number]) * control_digit_weights[number]
-                    )
-                control_modulo = control_sum % 10
-                if control_modulo == 0:
-                    pesel_digits.append(0)
+        :param size: Number of genders to generate.
+        :type size: int
+        :return: Categorical over :data:`GENDERS`.
+        :rtype: pd.Categorical
+        """
+        with self.metrics.stage("persons.genders"):
+            codes = self.rng.choice(
+                len(GENDERS), size, p=[1 - self.woman, self.woman]
+            )
+            return pd.Categorical.from_codes(codes, GENDERS)
+
+    def generate_last_names(self, size: int) -> pd.Categorical:
+        """
+        Generate random last names, every name in the last names data being equally likely.
+
+        :param size: Number of last names to generate.
+        :type size: int
+        :return: Categorical over the drawn last names.
+        :rtype: pd.Categorical
+        """
+        codes, last_names = self.data_storage.vocabulary("last_name", "last_names")
+        with self.metrics.stage("persons.last_names"):
+            return last_names.categorical(codes[self.rng.choice(len(codes), size)])
+
+    def generate_names(self, years: np.ndarray, genders: np.ndarray) -> pd.Categorical:
+        """
+        Generate a first name for every person.
+
+        :param years: Birth years.
+        :type years: np.ndarray
+        :param genders: Gender labels.
+        :type genders: np.ndarray
+        :return: Categorical over the drawn names.
+        :rtype: pd.Categorical
+        """
+        name_sampler = self.name_sampler
+        with self.metrics.stage("persons.names"):
+            return name_sampler.sample_categorical(
+                years, genders, self.params_dict["names_w_prob"], self.rng
+            )
+
+    def generate_second_names(
+        self, years: np.ndarray, genders: np.ndarray
+    ) -> pd.Categorical:
+        """
+        Generate second names, each person gets one with the configured probability.
+
+        :param years: Birth years.
+        :type years: np.ndarray
+        :param genders: Gender labels.
+        :type genders: np.ndarray
+        :return: Categorical over the drawn names, missing for persons without a second name.
+        :rtype: pd.Categorical
+        """
+        name_sampler = self.name_sampler
+        with self.metrics.stage("persons.second_names"):
+            size = len(years)
+            has_second = self.rng.random(size) < self.second_name_chance
+            second_names = np.full(size, -1, dtype=np.int64)
+            second_names[has_second] = name_sampler.sample_codes(
+                years[has_second],
+                genders[has_second],
+                self.params_dict["names_w_prob"],
+                self.rng,
+            )
+            self.metrics.count("persons.second_names", int(has_second.sum()))
+            return name_sampler.categories.categorical(second_names)
+
+    def generate_pesels(
+        self, birth_dates: np.ndarray, genders: np.ndarray
+    ) -> np.ndarray:
+        """
+        Generate PESEL numbers, unique across all calls on this generator.
+
+        :param birth_dates: Array of ``datetime64[D]`` birth dates.
+        :type birth_dates: np.ndarray
+        :param genders: Gender labels.
+        :type genders: np.ndarray
+        :return: Array of PESEL strings.
+        :rtype: np.ndarray
+        """
+        collisions = self.pesel_generator.collisions
+        fallbacks = self.pesel_generator.fallbacks
+        with self.metrics.stage("persons.pesel"):
+            pesels = self.pesel_generator.generate(birth_dates, genders, self.rng)
+        self.metrics.count(
+            "pesel.collisions", self.pesel_generator.collisions - collisions
+        )
+        self.metrics.count("pesel.fallbacks", self.pesel_generator.fallbacks - fallbacks)
+        return pesels
+
+    def generate_plates(self, cities, voivodeships) -> np.ndarray:
+        """
+        Generate licence plate numbers, unique across all calls on this generator.
+
+        :param cities: Normalized city names of the owners.
+        :type cities: np.ndarray | pd.Categorical
+        :param voivodeships: Normalized voivodeship names of the owners.
+        :type voivodeships: np.ndarray | pd.Categorical
+        :return: Array of plate number strings.
+        :rtype: np.ndarray
+        """
+        collisions = self.plate_generator.collisions
+        fallbacks = self.plate_generator.fallbacks
+        with self.metrics.stage("plates"):
+            plates = self.plate_generator.generate(cities, voivodeships, self.rng)
+        self.metrics.count("plates.collisions", self.plate_generator.collisions - collisions)
+        self.metrics.count("plates.fallbacks", self.plate_generator.fallbacks - fallbacks)
+        return plates
+
+    def birth_range(self) -> tuple:
+        """
+        :return: First and last birth date that can be generated with the 'year_range' parameter.
+        :rtype: tuple[np.datetime64, np.datetime64]
+        """
+        first_year, last_year = self.params_dict["year_range"]
+        return np.datetime64(f"{first_year:04d}-01-01"), np.datetime64(f"{last_year:04d}-12-31")
+
+    def register_existing(self, batches):
+        """
+        Mark the PESEL and plate numbers of existing rows as used, so they are never generated.
+
+        :param batches: Iterable of (column, values) pairs, see :func:`scan_unique_columns`.
+        :type batches: Iterable[tuple[str, np.ndarray]]
+        """
+        with self.metrics.stage("append.register"):
+            for column, values in batches:
+                if column == PLATE_COLUMN:
+                    self.metrics.count("append.plates", self.plate_generator.register(values))
                 else:
-                    pesel_digits.append(10 - control_modulo)
-
-                if len(pesel_digits) != 11:
-                    raise ValueError("Generated PESEL is longer than 11 digits!")
-                final_pesel = "".join(map(str, pesel_digits))
-                if final_pesel not in self.used_pesel_base:
-                    self.used_pesel_base.append(final_pesel)
-                    logger.info(f"Generated PESEL number: {final_pesel}")
-                    return final_pesel
-        except Exception as e:
-            logger.error(f"Error in get_random_pesel: {e}")
-            return None
+                    self.metrics.count("append.pesels", self.pesel_generator.register(values, self.birth_range()))
 
-    def generate_persons(self) -> pd.DataFrame:
+    def generate_persons(self, size: int = None) -> pd.DataFrame:
         """
         Generate a DataFrame of synthetic persons' data.
 
+        Gender and name columns are ``pd.Categorical``, the names materialised from the packed vocabularies of
+        the DataBank only for the values drawn.
+
+        :param size: Number of persons to generate, defaults to the sample size.
+        :type size: int
         :return: DataFrame containing generated persons' data.
         :rtype: pd.DataFrame
         """
-        try:
-            logger.info(self.params_dict)
-            start_date = date(self.params_dict["year_range"][0], 1, 1)
-            end_date = date(self.params_dict["year_range"][1], 12, 31)
-
-            # generate gender, birth_date and last_name
-            basic_data = {
-                "Birth Date": np.array(
-                    [
-                        radar.random_datetime(start=start_date, stop=end_date)
-                        for _ in range(self.sample_size)
-                    ]
-                ),
-                "Gender": np.random.choice(
-                    ["M", "K"], self.sample_size, p=[1 - self.woman, self.woman]
-                ),
-                "Last Name": np.random.choice(
-                    self.data_storage.last_name["last_names"], self.sample_size
-                ),
-            }
-            df = pd.DataFrame(basic_data)
-            logger.info("Generated basic person data (Birth Date, Gender, Last Name)")
-
-            # generate Name
-            df["Name"] = df.apply(
-                lambda row: self.get_random_name(
-                    row["Birth Date"].year,
-                    row["Gender"],
-                    self.params_dict["names_w_prob"],
-                ),
-                axis=1,
-            )
+        if size is None:
+            size = self.sample_size
+        logger.debug(self.params_dict)
+        birth_dates = self.generate_birth_dates(size)
+
+        # generate gender, birth_date and last_name
+        gender = self.generate_genders(size)
+        basic_data = {"Birth Date": birth_dates, "Gender": gender}
+        if self.wants("Last Name"):
+            basic_data["Last Name"] = self.generate_last_names(size)
+        df = pd.DataFrame(basic_data)
+        logger.info("Generated basic person data (Birth Date, Gender, Last Name)")
+
+        years, _, _ = split_dates(birth_dates)
+        genders = GENDERS.to_numpy()[gender.codes]
+
+        # generate Name
+        if self.wants("Name"):
+            df["Name"] = self.generate_names(years, genders)
             logger.info("Generated Names")
 
-            # generate Second Name
-            df["Second Name"] = df.apply(
-                lambda row: (
-                    self.get_random_name(
-                        row["Birth Date"].year,
-                        row["Gender"],
-                        self.params_dict["names_w_prob"],
-                    )
-                    if np.random.rand() < self.second_name_chance
-                    else None
-                ),
-                axis=1,
-            )
+        # generate Second Name
+        if self.wants("Second Name"):
+            df["Second Name"] = self.generate_second_names(years, genders)
             logger.info("Generated Second Names")
 
-            # generate PESEL
-            df["Pesel Number"] = df.apply(
-                lambda row: self.get_random_pesel(row["Birth Date"], row["Gender"]),
-                axis=1,
-            )
+        # generate PESEL
+        if self.wants("Pesel Number"):
+            df["Pesel Number"] = self.generate_pesels(birth_dates, genders)
             logger.info("Generated PESEL numbers")
 
-            return df
-        except Exception as e:
-            logger.error(f"Error in generate_persons: {e}")
-            return pd.DataFrame()
+        return df
 
-    def generate_localisations(self) -> pd.DataFrame:
+    def generate_localisations(self, size: int = None) -> pd.DataFrame:
         """
         Generate a DataFrame of synthetic localisation data.
 
+        Text columns (city, admin_name, country, ...) are ``pd.Categorical`` over the values drawn from the
+        vocabularies of the DataBank.
+
+        :param size: Number of localisations to generate, defaults to the sample size.
+        :type size: int
         :return: DataFrame containing generated localisation data.
         :rtype: pd.DataFrame
         """
-        try:
-            if self.params_dict["loc_w_prob"]:
-                weights = (
-                    self.data_storage.localisation["population"]
-                    / self.data_storage.localisation["population"].sum()
-                )
-                result_df = self.data_storage.localisation.sample(
-                    n=self.sample_size, weights=weights, replace=True
-                )
-                result_df["postal_code"] = result_df["postal_code"].apply(
-                    lambda x: random.choice(x) if x else None
-                )
-                logger.info("Generated localisations with weighted probability")
-                return result_df
-            else:
-                result_df = self.data_storage.localisation.sample(
-                    n=self.sample_size, replace=True
-                )
-                result_df["postal_code"] = result_df["postal_code"].apply(
-                    lambda x: random.choice(x) if x else None
-                )
-                logger.info("Generated localisations without weighted probability")
-                return result_df
-        except Exception as e:
-            logger.error(f"Error in generate_localisations: {e}")
-            return pd.DataFrame()
+        if size is None:
+            size = self.sample_size
+        localisation = self.data_storage.localisation
+        with self.metrics.stage("localisations"):
+            rows = self.sample_localisation_rows(size)
+            result_df = pd.DataFrame(
+                {
+                    column: self._take_column(localisation, column, rows)
+                    for column in localisation.columns
+                }
+            )
+
+            if self.data_storage.postal_offsets is not None:
+                picks = self.sample_postal_codes(rows)
+                postal_codes = np.full(size, None, dtype=object)
+                postal_codes[picks >= 0] = self.data_storage.postal_codes[
+                    picks[picks >= 0]
+                ]
+                result_df = result_df.assign(postal_code=postal_codes)
+
+        logger.info(
+            "Generated localisations with weighted probability"
+            if self.params_dict["loc_w_prob"]
+            else "Generated localisations without weighted probability"
+        )
+        return result_df
 
-    def generate_and_save(self, kwargs: dict):
+    def sample_localisation_rows(self, size: int) -> np.ndarray:
         """
-        Generate synthetic data and save it to the specified formats.
+        Draw random rows of the localisation data, weighted by population if 'loc_w_prob' is set.
 
-        :param kwargs: Dictionary specifying output formats and file paths.
-        :type kwargs: dict
+        :param size: Number of rows to draw.
+        :type size: int
+        :return: Array of localisation row positions.
+        :rtype: np.ndarray
         """
-        try:
-            persons_df = self.generate_persons()
-            localisations_df = self.generate_localisations()
+        localisation = self.data_storage.localisation
+        if self.params_dict["loc_w_prob"]:
+            weights = localisation["population"].to_numpy(dtype=np.float64)
+            return self.rng.choice(len(localisation), size, p=weights / weights.sum())
+        return self.rng.integers(0, len(localisation), size)
 
-            localisations_df = localisations_df.reset_index(drop=True)
-            persons_df = persons_df.reset_index(drop=True)
+    def sample_postal_codes(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Pick a random postal code of every sampled city.
 
-            result_df = pd.concat([persons_df, localisations_df], axis=1)
-            result_df = result_df.applymap(
-                lambda x: x.lower() if isinstance(x, str) else x
-            )
+        :param rows: Localisation row positions, see :meth:`sample_localisation_rows`.
+        :type rows: np.ndarray
+        :return: Positions in the DataBank postal codes, -1 for cities without postal codes.
+        :rtype: np.ndarray
+        """
+        postal_offsets = self.data_storage.postal_offsets
+        start = postal_offsets[rows]
+        count = postal_offsets[rows + 1] - start
+        pick = start + (self.rng.random(len(rows)) * count).astype(np.int64)
+        return np.where(count > 0, pick, -1)
 
-            logger.info("Generated combined DataFrame of persons and localisations")
-
-            for output_type, file_path in kwargs.items():
-                if output_type == "csv":
-                    result_df.to_csv(file_path)
-                    logger.info(f"Saved data to CSV file at {file_path}")
-                elif output_type == "json":
-                    result_df.to_json(file_path, orient="records", lines=True)
-                    logger.info(f"Saved data to JSON file at {file_path}")
-                elif output_type == "xml":
-                    result_df.to_xml(file_path, index=False)
-                    logger.info(f"Saved data to XML file at {file_path}")
-                elif output_type == "excel":
-                    result_df.to_excel(file_path, index=False)
-                    logger.info(f"Saved data to Excel file at {file_path}")
-                elif output_type == "html":
-                    result_df.to_html(file_path, index=False)
-                    logger.info(f"Saved data to HTML file at {file_path}")
-                elif output_type == "hdf5":
-                    result_df.to_hdf(file_path, key="df", mode="w")
-                    logger.info(f"Saved data to HDF5 file at {file_path}")
-                elif output_type == "parquet":
-                    result_df.to_parquet(file_path)
-                    logger.info(f"Saved data to Parquet file at {file_path}")
-                elif output_type == "feather":
-                    result_df.to_feather(file_path)
-                    logger.info(f"Saved data to Feather file at {file_path}")
-                elif output_type == "stata":
-                    result_df.to_stata(file_path)
-                    logger.info(f"Saved data to Stata file at {file_path}")
-                elif output_type == "sql":
-                    engine = create_engine(file_path)
-                    result_df.to_sql(
-                        "people", con=engine, if_exists="replace", index=False
+    def _take_column(self, localisation: pd.DataFrame, column: str, rows: np.ndarray):
+        """
+        Select rows of a localisation column, text columns as a ``pd.Categorical``.
+        """
+        values = localisation[column]
+        if values.dtype != object:
+            return values.to_numpy()[rows]
+        codes, categories = self.data_storage.vocabulary("localisation", column)
+        return categories.categorical(codes[rows])
+
+    def generate_chunks(self, chunk_size: int = None):
+        """
+        Generate the combined persons and localisations data in chunks.
+
+        PESEL numbers stay unique across all chunks of a generator. The rows generated are reported to the
+        metrics as the progress of the 'generate' stage after every chunk.
+
+        :param chunk_size: Number of rows per chunk, defaults to the whole sample in one chunk.
+        :type chunk_size: int
+        :raises Cancelled: If the generation is cancelled, see :meth:`cancel`.
+        :return: Generator yielding DataFrames of at most ``chunk_size`` rows.
+        :rtype: Iterator[pd.DataFrame]
+        """
+        if not chunk_size or chunk_size <= 0:
+            chunk_size = self.sample_size
+        self.metrics.progress("generate", 0, self.sample_size)
+        for start in range(0, self.sample_size, chunk_size):
+            self.check_cancelled()
+            size = min(chunk_size, self.sample_size - start)
+            parts = []
+            if self.columns is None or any(c in PERSON_COLUMNS for c in self.columns):
+                parts.append(self.generate_persons(size).reset_index(drop=True))
+            if self.columns is None or any(
+                c not in PERSON_COLUMNS for c in self.columns
+            ):
+                localisations = self.generate_localisations(size).reset_index(drop=True)
+                if self.columns is not None and PLATE_COLUMN in self.columns and "city" in localisations:
+                    localisations[PLATE_COLUMN] = self.generate_plates(
+                        localisations["city"].array, localisations["admin_name"].array
                     )
-                    logger.info(f"Saved data to SQL database at {file_path}")
-                elif output_type == "pickle":
-                    result_df.to_pickle(file_path)
-                    logger.info(f"Saved data to Pickle file at {file_path}")
-                else:
-                    logger.warning(f"Unknown output type: {output_type}")
+                parts.append(localisations)
+
+            with self.metrics.stage("chunks.combine"):
+                result_df = pd.concat(parts, axis=1)
+                if self.columns is not None:
+                    result_df = result_df[self.columns]
+            self.metrics.count("rows", size)
+            logger.info(
+                f"Generated chunk of {size} rows ({start + size}/{self.sample_size})"
+            )
+            self.metrics.progress("generate", start + size, self.sample_size)
+            yield result_df
 
-        except Exception as e:
-            logger.error(f"Error in generate_and_save: {e}")
+    def write_progress(self, output_type: str, rows: int):
+        """
+        Report the rows written to an output as the progress of its 'write.<format>' stage.
+
+        :param output_type: Output format.
+        :type output_type: str
+        :param rows: Rows written so far.
+        :type rows: int
+        """
+        self.metrics.progress(f"write.{output_type}", rows, self.sample_size)
+
+    def generate_and_save(
+        self, kwargs: dict, chunk_size: int = None, options: dict = None
+    ):
+        """
+        Generate synthetic data and save it to the specified formats.
+
+        Data is generated and written chunk by chunk, so with a chunk size set memory usage stays flat
+        for the streaming formats (csv, json, parquet, hdf5, sql) regardless of the sample size. The outputs
+        are written on their own threads while the next chunks are generated, at most 'queue_size' chunks
+        ahead of the slowest output.
+
+        With the 'append' parameter set the rows are added to the existing outputs (csv, parquet or sql). Their
+        PESEL and plate numbers are read first, column by column, and never generated again.
 
+        The rows written to every output are reported to the metrics as the progress of its 'write.<format>'
+        stage. On Ctrl-C or :meth:`cancel` the outputs are closed with the chunks written so far and
+        :class:`Cancelled` is raised, other errors are logged and raised.
 
-if __name__ == "__main__":
-    order = {
-        "localisation": {"weighted_probability": True},
-        "person": {"year_range": [1950, 2015], "name_weighted_probability": True},
-    }
-    generator = Generator(1000, order)
-    persons = generator.generate_persons()
-    localisations = generator.generate_localisations()
+        :param kwargs: Dictionary specifying output formats and file paths.
+        :type kwargs: dict
+        :param chunk_size: Number of rows per chunk, defaults to the 'chunk_size' parameter or the whole sample.
+        :type chunk_size: int
+        :param options: Extra options per output format (e.g. ``{"sql": {"batch_size": 1000}}``),
+            defaults to the 'output_options' parameter.
+        :type options: dict
+        :raises Cancelled: If the generation was cancelled, with the reports of the outputs.
+        :raises ValueError: If the parameters or outputs are invalid, e.g. :class:`PeselSpaceExhausted` when the
+            sample needs more PESEL numbers than the birth dates allow.
+        :return: Report of every output, see :func:`writers.write_chunks`.
+        :rtype: dict
+        """
+        if chunk_size is None:
+            chunk_size = self.params_dict.get("chunk_size")
+        if options is None:
+            options = self.params_dict.get("output_options")
+        try:
+            if self.params_dict.get("append"):
+                options = writers.append_options(kwargs, options)
+                self.register_existing(scan_unique_columns(self.params_dict, kwargs, options))
+            reports = writers.write_chunks(
+                self.generate_chunks(chunk_size),
+                kwargs,
+                reproducible=self.params_dict.get("seed") is not None,
+                options=options,
+                queue_size=self.params_dict.get("queue_size", QUEUE_SIZE),
+                progress=self.write_progress,
+            )
+            record_outputs(self.metrics, reports)
+            return reports
+        except Cancelled as e:
+            record_outputs(self.metrics, e.reports or {})
+            raise
+        except Exception as e:
+            logger.error(f"Error in generate_and_save: {e}")
+            raise
+        finally:
+            self.metrics.emit()
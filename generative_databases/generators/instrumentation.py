@@ -0,0 +1,305 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss():
+    """
+    Resident set size of the current process.
+
+    Uses ``psutil`` when it is installed and ``/proc/self/statm`` otherwise.
+
+    :return: RSS in bytes, or None if it cannot be determined on this platform.
+    :rtype: int
+    """
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def peak_rss():
+    """
+    Peak resident set size of the current process so far.
+
+    :return: Peak RSS in bytes, or None if it cannot be determined on this platform.
+    :rtype: int
+    """
+    try:
+        import resource
+        import sys
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (ImportError, OSError):
+        return None
+    # reported in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_bytes(size):
+    """
+    Format a byte count in megabytes.
+
+    :param size: Number of bytes, or None.
+    :type size: int
+    :return: Formatted size, "n/a" if unknown.
+    :rtype: str
+    """
+    if size is None:
+        return "n/a"
+    return f"{size / 2 ** 20:.1f} MB"
+
+
+class PeakMemory:
+    """
+    Context manager recording the peak RSS of the process while its block runs.
+
+    :func:`current_rss` is sampled on a background thread, so short spikes between two samples can be
+    missed.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """
+        :param interval: Sampling interval in seconds.
+        :type interval: float
+        """
+        self.interval = interval
+        self.start = None
+        self.peak = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.start = self.peak = current_rss()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        return False
+
+    @property
+    def delta(self):
+        """
+        Peak RSS above the RSS at the start of the block, None if RSS is not available.
+        """
+        if self.start is None or self.peak is None:
+            return None
+        return self.peak - self.start
+
+
+class Metrics:
+    """
+    Counters, stage timings and peak memory of a generation run.
+
+    Generators record into it with :meth:`count` and :meth:`stage`; :meth:`summary` returns everything as
+    a JSON-serialisable dictionary and :meth:`emit` hands it to the callback and/or writes it to a JSON file.
+    While running they also report the rows done by every stage with :meth:`progress`, passed on to the
+    listeners as they happen. Recording is thread-safe.
+    """
+
+    def __init__(self, callback=None, path: str = None, listeners: list = None):
+        """
+        :param callback: Called with the summary dictionary on :meth:`emit`.
+        :type callback: Callable[[dict], None]
+        :param path: JSON file the summary is written to on :meth:`emit`.
+        :type path: str
+        :param listeners: Called with every progress event, see :meth:`progress`.
+        :type listeners: list[Callable[[dict], None]]
+        """
+        self.callback = callback
+        self.path = path
+        self.listeners = list(listeners or [])
+        self.progress_started = {}
+        self.counters = defaultdict(int)
+        self.timings = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.peak_rss = None
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: int = 1):
+        """
+        Add to a counter.
+
+        :param name: Counter name, e.g. 'rows.persons' or 'pesel.collisions'.
+        :type name: str
+        :param value: Amount to add.
+        :type value: int
+        """
+        with self._lock:
+            self.counters[name] += value
+
+    def record(self, name: str, seconds: float, calls: int = 1):
+        """
+        Add time spent in a stage.
+
+        :param name: Stage name.
+        :type name: str
+        :param seconds: Time spent.
+        :type seconds: float
+        :param calls: Number of times the stage ran.
+        :type calls: int
+        """
+        with self._lock:
+            self.timings[name] += seconds
+            self.calls[name] += calls
+        self.sample_memory()
+
+    def add_listener(self, listener):
+        """
+        Register a function called with every progress event, see :meth:`progress`.
+
+        :param listener: Function taking the event dictionary, called on the thread reporting the progress.
+            Its exceptions are logged and never interrupt the run.
+        :type listener: Callable[[dict], None]
+        """
+        self.listeners.append(listener)
+
+    def progress(self, stage: str, done: int, total: int = None):
+        """
+        Report the rows done by a running stage to the listeners.
+
+        Every listener gets an event dictionary with the 'stage' (e.g. 'generate' or 'write.csv'), the rows
+        'done' and the 'total' rows (None if unknown), the 'elapsed' seconds since the first event of the
+        stage, its 'rows_per_second', the estimated seconds left as 'eta' (None if unknown) and the current
+        'rss' in bytes (None if unknown).
+
+        :param stage: Stage name.
+        :type stage: str
+        :param done: Rows done so far, report 0 when the stage starts.
+        :type done: int
+        :param total: Rows the stage will do, if known.
+        :type total: int
+        """
+        if not self.listeners:
+            return
+        now = time.perf_counter()
+        with self._lock:
+            elapsed = now - self.progress_started.setdefault(stage, now)
+        rate = done / elapsed if elapsed > 0 else 0.0
+        event = {
+            "stage": stage,
+            "done": done,
+            "total": total,
+            "elapsed": elapsed,
+            "rows_per_second": rate,
+            "eta": (total - done) / rate if total is not None and rate > 0 else None,
+            "rss": current_rss(),
+        }
+        for listener in list(self.listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                logger.warning("Progress listener failed: %s", e)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Context manager timing a stage, see :meth:`record`.
+
+        :param name: Stage name, e.g. 'persons.pesel'.
+        :type name: str
+        """
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def sample_memory(self):
+        """
+        Update the peak memory with the current RSS.
+        """
+        rss = current_rss()
+        if rss is not None:
+            with self._lock:
+                self.peak_rss = rss if self.peak_rss is None else max(self.peak_rss, rss)
+
+    def merge(self, summary: dict):
+        """
+        Add the counters and timings of another run, e.g. the summary of a worker process.
+
+        :param summary: Dictionary returned by :meth:`summary`.
+        :type summary: dict
+        """
+        with self._lock:
+            for name, value in summary.get("counters", {}).items():
+                self.counters[name] += value
+            for name, stage in summary.get("stages", {}).items():
+                self.timings[name] += stage["seconds"]
+                self.calls[name] += stage["calls"]
+            if summary.get("peak_rss") is not None:
+                self.peak_rss = max(self.peak_rss or 0, summary["peak_rss"])
+
+    def summary(self) -> dict:
+        """
+        :return: Dictionary with the 'elapsed' seconds, 'stages' (seconds and calls per stage), 'counters'
+            and 'peak_rss' in bytes (None if unknown).
+        :rtype: dict
+        """
+        self.sample_memory()
+        with self._lock:
+            peak = [rss for rss in (self.peak_rss, peak_rss()) if rss is not None]
+            return {
+                "elapsed": time.perf_counter() - self.started,
+                "stages": {
+                    name: {"seconds": seconds, "calls": self.calls[name]} for name, seconds in self.timings.items()
+                },
+                "counters": dict(self.counters),
+                "peak_rss": max(peak) if peak else None,
+            }
+
+    def report(self) -> str:
+        """
+        :return: Human readable summary, one line per stage and counter.
+        :rtype: str
+        """
+        summary = self.summary()
+        lines = [f"Elapsed {summary['elapsed']:.2f} s, peak memory {format_bytes(summary['peak_rss'])}"]
+        for name, stage in sorted(summary["stages"].items()):
+            lines.append(f"  {name:<28} {stage['seconds']:>9.3f} s in {stage['calls']} calls")
+        for name, value in sorted(summary["counters"].items()):
+            lines.append(f"  {name:<28} {value:>12}")
+        return "\n".join(lines)
+
+    def emit(self) -> dict:
+        """
+        Pass the summary to the callback and write it to the JSON file, where configured.
+
+        :return: The summary.
+        :rtype: dict
+        """
+        summary = self.summary()
+        if self.callback is not None:
+            self.callback(summary)
+        if self.path is not None:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+        return summary
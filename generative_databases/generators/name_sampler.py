@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+import logging
+from generative_databases.generators.packed_strings import PackedStrings
+
+logger = logging.getLogger(__name__)
+
+
+class NameSampler:
+    """
+    Vectorized first name sampler built once from the first names dataset.
+
+    Rows are grouped by (gender, year) and every group stores its cumulative weights in one flat array,
+    so a whole batch of names is drawn with a single ``np.searchsorted`` call.
+    """
+
+    genders = ("M", "K")
+
+    def __init__(self, first_names: pd.DataFrame, vocabulary: tuple = None):
+        """
+        Build the cumulative weight tables.
+
+        :param first_names: First names data with 'Year', 'Number' and 'Gender' columns, and the 'Name'
+            column unless ``vocabulary`` is given.
+        :type first_names: pd.DataFrame
+        :param vocabulary: Category codes of the 'Name' column and the categories, as returned by
+            ``DataBank.vocabulary``. Computed from ``first_names`` if not given.
+        :type vocabulary: tuple[np.ndarray, PackedStrings]
+        """
+        if vocabulary is None:
+            codes, categories = pd.factorize(first_names["Name"], sort=True)
+            vocabulary = codes, PackedStrings.from_values(categories)
+        name_codes, self.categories = vocabulary
+        gender = first_names["Gender"].astype(str).str.upper()
+        gender_code = pd.Categorical(gender, categories=self.genders).codes.astype(np.int64)
+        known = gender_code >= 0
+
+        year = first_names["Year"].to_numpy(dtype=np.int64)[known]
+        number = first_names["Number"].to_numpy(dtype=np.float64)[known]
+        name_codes = np.asarray(name_codes)[known]
+        gender_code = gender_code[known]
+
+        self.min_year = int(year.min())
+        self.max_year = int(year.max())
+        n_years = self.max_year - self.min_year + 1
+
+        # sort rows by (gender, year) so that every group is a contiguous slice
+        group = gender_code * n_years + (year - self.min_year)
+        order = np.argsort(group, kind="stable")
+        group = group[order]
+        self.name_codes = name_codes[order]
+        number = number[order]
+
+        n_groups = len(self.genders) * n_years
+        self.group_start = np.searchsorted(group, np.arange(n_groups), side="left")
+        self.group_end = np.searchsorted(group, np.arange(n_groups), side="right")
+
+        # per-group normalised cumulative weights, shifted by the group id so that
+        # all groups can be searched in one sorted array
+        totals = np.bincount(group, weights=number, minlength=n_groups)
+        cumulative = np.cumsum(number)
+        group_offset = np.concatenate(([0.0], np.cumsum(totals)))[:-1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            within = (cumulative - group_offset[group]) / totals[group]
+        self.shifted_cdf = group + np.clip(within, 0.0, 1.0)
+
+        # gender-only slices for unweighted sampling
+        self.gender_start = self.group_start[::n_years].copy()
+        self.gender_end = self.group_end[n_years - 1 :: n_years].copy()
+        self.n_years = n_years
+        self.year_totals = totals.reshape(len(self.genders), n_years).sum(axis=0)
+        logger.info(
+            "Name sampler built for years %d-%d (%d names)", self.min_year, self.max_year, len(self.name_codes)
+        )
+
+    def births_per_year(self, years: np.ndarray) -> np.ndarray:
+        """
+        Total number of given names for every year, clamped to the years available in the dataset.
+
+        :param years: Array of years.
+        :type years: np.ndarray
+        :return: Array of name counts.
+        :rtype: np.ndarray
+        """
+        years = np.clip(np.asarray(years, dtype=np.int64), self.min_year, self.max_year)
+        return self.year_totals[years - self.min_year]
+
+    def gender_codes(self, genders: np.ndarray) -> np.ndarray:
+        """
+        Translate gender labels to internal codes (-1 for unknown labels).
+
+        :param genders: Array of gender labels ('M' or 'K').
+        :type genders: np.ndarray
+        :return: Array of gender codes.
+        :rtype: np.ndarray
+        """
+        labels = pd.Series(np.asarray(genders, dtype=object)).astype(str).str.upper()
+        return pd.Categorical(labels, categories=self.genders).codes.astype(np.int64)
+
+    def sample(self, years: np.ndarray, genders: np.ndarray, weighted: bool = True, rng=None) -> np.ndarray:
+        """
+        Draw one name for every (year, gender) pair.
+
+        Years outside the range of the dataset are clamped to its first or last year. Pairs without any
+        matching names get ``None``.
+
+        :param years: Array of birth years.
+        :type years: np.ndarray
+        :param genders: Array of gender labels ('M' or 'K').
+        :type genders: np.ndarray
+        :param weighted: Whether to use the name popularity as weights.
+        :type weighted: bool
+        :param rng: Random number generator, defaults to a fresh ``np.random.default_rng()``.
+        :type rng: np.random.Generator
+        :return: Array of names.
+        :rtype: np.ndarray
+        """
+        return self.categories.take(self.sample_codes(years, genders, weighted, rng))
+
+    def sample_categorical(
+        self, years: np.ndarray, genders: np.ndarray, weighted: bool = True, rng=None
+    ) -> pd.Categorical:
+        """
+        Same as :meth:`sample`, but returns the names as a ``pd.Categorical`` over the names drawn.
+        """
+        return self.categories.categorical(self.sample_codes(years, genders, weighted, rng))
+
+    def sample_codes(self, years: np.ndarray, genders: np.ndarray, weighted: bool = True, rng=None) -> np.ndarray:
+        """
+        Draw one name for every (year, gender) pair, as codes into :attr:`categories` (-1 where there
+        are no matching names).
+
+        :param years: Array of birth years.
+        :type years: np.ndarray
+        :param genders: Array of gender labels ('M' or 'K').
+        :type genders: np.ndarray
+        :param weighted: Whether to use the name popularity as weights.
+        :type weighted: bool
+        :param rng: Random number generator, defaults to a fresh ``np.random.default_rng()``.
+        :type rng: np.random.Generator
+        :return: Array of category codes.
+        :rtype: np.ndarray
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        years = np.asarray(years, dtype=np.int64)
+        codes = self.gender_codes(genders)
+        result = np.full(len(years), -1, dtype=np.int64)
+        known = codes >= 0
+        u = rng.random(len(years))
+
+        if weighted:
+            group = codes * self.n_years + (np.clip(years, self.min_year, self.max_year) - self.min_year)
+            group = np.where(known, group, 0)
+            valid = known & (self.group_end[group] > self.group_start[group])
+            idx = np.searchsorted(self.shifted_cdf, group + u, side="left")
+            idx = np.clip(idx, self.group_start[group], np.maximum(self.group_end[group] - 1, 0))
+        else:
+            code = np.where(known, codes, 0)
+            start = self.gender_start[code]
+            count = self.gender_end[code] - start
+            valid = known & (count > 0)
+            idx = start + np.minimum((u * count).astype(np.int64), np.maximum(count - 1, 0))
+
+        result[valid] = self.name_codes[idx[valid]]
+        return result
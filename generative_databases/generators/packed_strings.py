@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+# number of strings decoded at once by PackedStrings.take, bounding its temporary index arrays
+TAKE_BLOCK = 1 << 16
+
+
+class PackedStrings:
+    """
+    Immutable array of strings stored as one UTF-8 buffer and the offsets of every string in it.
+
+    String ``i`` is ``data[offsets[i]:offsets[i + 1]]``. Both arrays can be saved as '.npy' files and
+    memory-mapped, so a large vocabulary (e.g. the 314k last names) costs no Python objects until some of its
+    strings are taken, and processes mapping the same files share its pages.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray):
+        """
+        :param data: UTF-8 bytes of all strings, as a uint8 array.
+        :type data: np.ndarray
+        :param offsets: Start of every string in ``data`` followed by the end of the last one.
+        :type offsets: np.ndarray
+        """
+        self.data = data
+        self.offsets = offsets
+        self._ascii = None
+
+    @classmethod
+    def from_values(cls, values) -> "PackedStrings":
+        """
+        Pack a sequence of strings.
+
+        :param values: Strings to pack, missing values are not supported.
+        :type values: Iterable[str]
+        :return: Packed strings in the order of ``values``.
+        :rtype: PackedStrings
+        """
+        encoded = [str(value).encode("utf-8") for value in values]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        offsets = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: str = "r") -> "PackedStrings":
+        """
+        Load strings saved with :meth:`save`.
+
+        :param path: Path prefix the files were saved with.
+        :type path: str
+        :param mmap_mode: Memory-map mode passed to ``np.load``, ``None`` reads the arrays into memory.
+        :type mmap_mode: str
+        :return: Packed strings.
+        :rtype: PackedStrings
+        """
+        return cls(
+            np.load(f"{path}.strings.npy", mmap_mode=mmap_mode), np.load(f"{path}.offsets.npy", mmap_mode=mmap_mode)
+        )
+
+    def save(self, path: str):
+        """
+        Save the buffer and the offsets as '<path>.strings.npy' and '<path>.offsets.npy'.
+
+        :param path: Path prefix of the files.
+        :type path: str
+        """
+        np.save(f"{path}.strings.npy", np.asarray(self.data))
+        np.save(f"{path}.offsets.npy", np.asarray(self.offsets))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position: int) -> str:
+        return bytes(self.data[self.offsets[position] : self.offsets[position + 1]]).decode("utf-8")
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the buffer and the offsets in bytes.
+        """
+        return self.data.nbytes + self.offsets.nbytes
+
+    @property
+    def ascii(self) -> bool:
+        """
+        Whether all strings are ASCII, which lets :meth:`take` skip the UTF-8 decoding.
+        """
+        if self._ascii is None:
+            self._ascii = not len(self.data) or int(self.data.max()) < 0x80
+        return self._ascii
+
+    def take(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Materialise the strings at the given positions.
+
+        :param positions: Positions of the strings, -1 for a missing value.
+        :type positions: np.ndarray
+        :return: Object array of strings, ``None`` at the missing positions.
+        :rtype: np.ndarray
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        result = np.full(len(positions), None, dtype=object)
+        valid = np.flatnonzero(positions >= 0)
+        for block in range(0, len(valid), TAKE_BLOCK):
+            rows = valid[block : block + TAKE_BLOCK]
+            starts = self.offsets[positions[rows]]
+            lengths = self.offsets[positions[rows] + 1] - starts
+            width = max(int(lengths.max()), 1)
+            # gather the bytes of every string into a row of a zero padded matrix, read as fixed width bytes
+            row_starts = np.cumsum(lengths) - lengths
+            within = np.arange(lengths.sum()) - np.repeat(row_starts, lengths)
+            chars = np.zeros((len(rows), width), dtype=np.uint8)
+            chars[np.repeat(np.arange(len(rows)), lengths), within] = self.data[np.repeat(starts, lengths) + within]
+            strings = chars.view(f"S{width}").ravel()
+            strings = strings.astype(f"U{width}") if self.ascii else np.char.decode(strings, "utf-8")
+            result[rows] = strings.astype(object)
+        return result
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        :return: Object array of all strings.
+        :rtype: np.ndarray
+        """
+        return self.take(np.arange(len(self)))
+
+    def categorical(self, codes: np.ndarray) -> pd.Categorical:
+        """
+        Categorical of the strings at the given positions, with only the strings that occur as categories.
+
+        The categories keep the order of the packed strings, so for a sorted vocabulary they are the same
+        as the trimmed categories of a categorical over the whole vocabulary.
+
+        :param codes: Positions of the strings, -1 for a missing value.
+        :type codes: np.ndarray
+        :return: Categorical with the materialised strings that occur in ``codes`` as categories.
+        :rtype: pd.Categorical
+        """
+        codes = np.asarray(codes, dtype=np.int64)
+        valid = codes >= 0
+        used = np.flatnonzero(np.bincount(codes[valid], minlength=len(self)))
+        remap = np.zeros(max(len(self), 1), dtype=np.int64)
+        remap[used] = np.arange(len(used))
+        return pd.Categorical.from_codes(
+            np.where(valid, remap[np.where(valid, codes, 0)], -1), pd.Index(self.take(used), dtype=object)
+        )
@@ -0,0 +1,277 @@
+import os
+import contextlib
+import tempfile
+import logging
+import threading
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from generative_databases.generators import data_importer, writers
+from generative_databases.generators.generator import (
+    PLATE_COLUMN,
+    UNIQUE_COLUMNS,
+    Generator,
+    record_outputs,
+    required_columns,
+    required_datasets,
+    scan_unique_columns,
+    validate_columns,
+)
+from generative_databases.generators.instrumentation import Metrics
+from generative_databases.generators.pesel import PeselGenerator
+from generative_databases.generators.pipeline import QUEUE_SIZE, Cancelled
+
+logger = logging.getLogger(__name__)
+
+# seconds between checks of the cancel event while waiting for a worker
+CANCEL_POLL_INTERVAL = 0.2
+
+_worker_data_storage = None
+_worker_data_dir = None
+_worker_generator = None
+_worker_chunks = None
+
+
+def _existing_path(data_dir: str, column: str) -> str:
+    """
+    File of the existing values of a unique column handed to the workers in append mode.
+    """
+    return os.path.join(data_dir, f"existing-{UNIQUE_COLUMNS.index(column)}.npy")
+
+
+def _init_worker(data_dir: str):
+    """
+    Process pool initializer, memory-maps the reference data saved by the parent process.
+    """
+    global _worker_data_storage, _worker_data_dir
+    _worker_data_storage = data_importer.DataBank.from_directory(data_dir, mmap_mode="r")
+    _worker_data_dir = data_dir
+
+
+def _generate_chunk(params_dict: dict, seed: np.random.SeedSequence, part: int, parts: int) -> tuple:
+    """
+    Generate the next chunk of the worker's share of the sample, returned with the summary of the metrics of the
+    chunk. The worker's generator is created by its first task and kept for the next ones, so PESEL and plate
+    numbers stay unique across the chunks.
+    """
+    global _worker_generator, _worker_chunks
+    metrics = Metrics()
+    if _worker_chunks is None:
+        generator = Generator(
+            params_dict, data_storage=_worker_data_storage, rng=np.random.default_rng(seed), metrics=metrics
+        )
+        generator.pesel_generator = PeselGenerator(partition=(part, parts))
+        existing = [column for column in UNIQUE_COLUMNS if os.path.exists(_existing_path(_worker_data_dir, column))]
+        generator.register_existing(
+            (column, np.load(_existing_path(_worker_data_dir, column), mmap_mode="r")) for column in existing
+        )
+        _worker_generator = generator
+        _worker_chunks = generator.generate_chunks(params_dict.get("chunk_size"))
+    _worker_generator.metrics = metrics
+    return next(_worker_chunks), metrics.summary()
+
+
+class ParallelGenerator:
+    """
+    Generates a sample on a pool of worker processes.
+
+    Every worker gets an independent random generator spawned from one master seed and its own part of
+    the PESEL serial space, so for a given seed and number of workers the result is always the same and
+    PESEL numbers are globally unique. Workers generate their share chunk by chunk, one task per chunk on a
+    process of their own that keeps the generator between tasks, and at most 'queue_size' chunks (but at least
+    one per worker) are generated ahead of the one being consumed. Reference data is handed to the workers as
+    memory-mapped NumPy files instead of pickling the DataBank for every task, and so are the PESEL and plate
+    numbers of the outputs appended to, read once by the parent process.
+    """
+
+    def __init__(
+        self,
+        params_dict: dict,
+        workers: int = None,
+        seed: int = None,
+        data_storage=None,
+        metrics: Metrics = None,
+        cancel: threading.Event = None,
+    ):
+        """
+        :param params_dict: Generation parameters.
+        :type params_dict: dict
+        :param workers: Number of worker processes, defaults to the number of CPUs.
+        :type workers: int
+        :param seed: Master seed, defaults to the 'seed' parameter or a random (logged) seed.
+        :type seed: int
+        :param data_storage: Reference data, lazily loaded from the sources in ``params_dict`` if not given.
+        :type data_storage: data_importer.DataBank
+        :param metrics: Collector the metrics of all workers are merged into, by default a new one writing its
+            summary to the 'metrics_path' parameter (if set) after :meth:`generate_and_save`.
+        :type metrics: Metrics
+        :param cancel: Event cancelling the generation when set, see :meth:`cancel`.
+        :type cancel: threading.Event
+        :raises ValueError: If 'columns' lists unknown columns, see :func:`generator.validate_columns`.
+        """
+        self.params_dict = params_dict
+        self.sample_size = params_dict["sample_size"]
+        self.workers = max(1, min(workers or os.cpu_count() or 1, self.sample_size or 1))
+        if seed is None:
+            seed = params_dict.get("seed")
+        self.reproducible = seed is not None
+        self.seed_sequence = np.random.SeedSequence(seed)
+        logger.info(f"Parallel generator seed entropy: {self.seed_sequence.entropy}")
+        if data_storage is None:
+            data_storage = data_importer.DataBank(params_dict, columns=required_columns(params_dict))
+        self.data_storage = data_storage
+        validate_columns(params_dict, data_storage)
+        if metrics is None:
+            metrics = Metrics(path=params_dict.get("metrics_path"))
+        self.metrics = metrics
+        self.existing = {}
+        self.cancel_event = threading.Event() if cancel is None else cancel
+
+    def cancel(self):
+        """
+        Cancel a running :meth:`generate_parts` or :meth:`generate_and_save` from another thread.
+
+        The chunks not started yet are dropped, the ones being generated are waited for and discarded.
+        """
+        self.cancel_event.set()
+
+    def _result(self, future, executors) -> tuple:
+        """
+        Wait for a chunk of a worker, checking the cancel event in between.
+        """
+        while True:
+            if self.cancel_event.is_set():
+                for executor in executors:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                raise Cancelled("Generation cancelled")
+            try:
+                return future.result(timeout=CANCEL_POLL_INTERVAL)
+            except TimeoutError:
+                pass
+
+    def generate_parts(self):
+        """
+        Generate the sample on the worker pool.
+
+        The chunks of the workers are yielded in turn (the first chunk of every worker, then the second ones,
+        ...) and their rows reported to the metrics as the progress of the 'generate' stage.
+
+        :raises Cancelled: If the generation is cancelled, see :meth:`cancel`.
+        :return: Generator yielding DataFrames of at most 'chunk_size' rows, the whole share of every worker
+            if no chunk size is set.
+        :rtype: Iterator[pd.DataFrame]
+        """
+        sizes = [len(part) for part in np.array_split(np.arange(self.sample_size), self.workers)]
+        seeds = self.seed_sequence.spawn(self.workers)
+        chunk_size = self.params_dict.get("chunk_size")
+        counts = [-(-size // chunk_size) if chunk_size and chunk_size > 0 else int(size > 0) for size in sizes]
+        tasks = [part for index in range(max(counts)) for part in range(self.workers) if index < counts[part]]
+        ahead = max(self.workers, self.params_dict.get("queue_size") or QUEUE_SIZE)
+        with tempfile.TemporaryDirectory(prefix="generative_databases_") as data_dir:
+            self.data_storage.save(data_dir, required_datasets(self.params_dict))
+            for column, values in self.existing.items():
+                np.save(_existing_path(data_dir, column), values)
+            with contextlib.ExitStack() as stack:
+                # one process per worker, running the tasks of its part in order
+                executors = [
+                    stack.enter_context(
+                        ProcessPoolExecutor(max_workers=1, initializer=_init_worker, initargs=(data_dir,))
+                    )
+                    for _ in range(self.workers)
+                ]
+
+                def submit(part):
+                    return executors[part].submit(
+                        _generate_chunk,
+                        dict(self.params_dict, sample_size=sizes[part]),
+                        seeds[part],
+                        part,
+                        self.workers,
+                    )
+
+                futures = [submit(part) for part in tasks[:ahead]]
+                self.metrics.progress("generate", 0, self.sample_size)
+                done = 0
+                for index, part in enumerate(tasks):
+                    result_df, summary = self._result(futures[index], executors)
+                    futures[index] = None
+                    if index + ahead < len(tasks):
+                        futures.append(submit(tasks[index + ahead]))
+                    self.metrics.merge(summary)
+                    logger.info(f"Worker {part} generated a chunk of {len(result_df)} rows")
+                    done += len(result_df)
+                    self.metrics.progress("generate", done, self.sample_size)
+                    yield result_df
+
+    def scan_existing(self, outputs: dict, options: dict = None):
+        """
+        Read the PESEL and plate numbers of the outputs appended to, handed to every worker.
+
+        :param outputs: Dictionary mapping output formats to file paths.
+        :type outputs: dict
+        :param options: Dictionary mapping output formats to extra sink options.
+        :type options: dict
+        """
+        batches = {}
+        skipped = 0
+        with self.metrics.stage("append.scan"):
+            for column, values in scan_unique_columns(self.params_dict, outputs, options):
+                if column == PLATE_COLUMN:
+                    values = np.asarray(values, dtype=str)
+                else:
+                    values, dropped = PeselGenerator.parse(values)
+                    skipped += dropped
+                batches.setdefault(column, []).append(values)
+        if skipped:
+            logger.warning(f"Skipped {skipped} missing or malformed PESEL numbers of the existing outputs")
+        self.existing = {column: np.concatenate(values) for column, values in batches.items()}
+
+    def generate(self) -> pd.DataFrame:
+        """
+        Generate the whole sample.
+
+        :return: DataFrame with the combined persons and localisations data.
+        :rtype: pd.DataFrame
+        """
+        return writers.concat_chunks(list(self.generate_parts()), ignore_index=True)
+
+    def generate_and_save(self, kwargs: dict, options: dict = None):
+        """
+        Generate the sample in parallel and save it to the specified formats.
+
+        :param kwargs: Dictionary specifying output formats and file paths.
+        :type kwargs: dict
+        :param options: Extra options per output format, defaults to the 'output_options' parameter.
+        :type options: dict
+        :raises Cancelled: If the generation was cancelled, with the reports of the outputs.
+        :raises ValueError: If the parameters or outputs are invalid, e.g. :class:`PeselSpaceExhausted` when the
+            sample needs more PESEL numbers than the birth dates allow.
+        :return: Report of every output, see :func:`writers.write_chunks`.
+        :rtype: dict
+        """
+        if options is None:
+            options = self.params_dict.get("output_options")
+        try:
+            if self.params_dict.get("append"):
+                options = writers.append_options(kwargs, options)
+                self.scan_existing(kwargs, options)
+            reports = writers.write_chunks(
+                self.generate_parts(),
+                kwargs,
+                reproducible=self.reproducible,
+                options=options,
+                queue_size=self.params_dict.get("queue_size", QUEUE_SIZE),
+                progress=lambda output_type, rows: self.metrics.progress(
+                    f"write.{output_type}", rows, self.sample_size
+                ),
+            )
+            record_outputs(self.metrics, reports)
+            return reports
+        except Cancelled as e:
+            record_outputs(self.metrics, e.reports or {})
+            raise
+        except Exception as e:
+            logger.error(f"Error in parallel generate_and_save: {e}")
+            raise
+        finally:
+            self.metrics.emit()
@@ -0,0 +1,294 @@
+import numpy as np
+import pandas as pd
+import logging
+from generative_databases.generators.dates import split_dates
+
+logger = logging.getLogger(__name__)
+
+CONTROL_WEIGHTS = np.array([1, 3, 7, 9, 1, 3, 7, 9, 1, 3], dtype=np.int64)
+DIGIT_POWERS = 10 ** np.arange(10, -1, -1, dtype=np.int64)
+SERIAL_SPACE = 10000  # three serial digits followed by the gender digit
+FIRST_YEAR = 1800
+LAST_YEAR = 2299
+
+
+class PeselSpaceExhausted(ValueError):
+    """
+    Raised when there are no free PESEL serial numbers left for a birth date and gender.
+    """
+
+
+class PeselGenerator:
+    """
+    Batch PESEL number generator guaranteeing uniqueness across all generated numbers.
+
+    Used numbers are tracked in a bitmap with one row per birth date and one bit per
+    serial number (the 7th-10th digits), so membership checks are O(1) and vectorized.
+
+    Generators running in separate processes can split the serial space with ``partition``:
+    the generator ``(index, count)`` only uses three digit serials equal to ``index`` modulo ``count``,
+    so numbers from different partitions never collide.
+    """
+
+    def __init__(self, max_rounds: int = 32, partition: tuple = (0, 1)):
+        """
+        :param max_rounds: Number of random redraw rounds before the remaining collisions are
+            resolved by picking directly from the free serial numbers.
+        :type max_rounds: int
+        :param partition: Index of this generator's part of the serial space and the number of parts.
+        :type partition: tuple[int, int]
+        """
+        index, count = partition
+        if not 0 <= index < count <= 1000:
+            raise ValueError(f"Invalid PESEL serial partition: {partition}")
+        self.partition = (index, count)
+        self.partition_slots = len(range(index, 1000, count))
+        self.max_rounds = max_rounds
+        self.first_day = None
+        self.bits = np.zeros((0, SERIAL_SPACE // 8), dtype=np.uint8)
+        self.used = np.zeros((0, 2), dtype=np.int32)
+        self.collisions = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def encode_prefix(years: np.ndarray, months: np.ndarray, days: np.ndarray) -> np.ndarray:
+        """
+        Encode birth dates as the first six PESEL digits (YYMMDD with the century stored in the month).
+
+        :param years: Array of birth years.
+        :type years: np.ndarray
+        :param months: Array of birth months.
+        :type months: np.ndarray
+        :param days: Array of birth days.
+        :type days: np.ndarray
+        :raises ValueError: If any year is outside of the range supported by PESEL.
+        :return: Array of six digit prefixes.
+        :rtype: np.ndarray
+        """
+        if len(years) and (years.min() < FIRST_YEAR or years.max() > LAST_YEAR):
+            raise ValueError("Provided birth_date doesn't allow to generate PESEL number")
+        century_offset = ((years // 100 - FIRST_YEAR // 100) * 20 + 80) % 100
+        return (years % 100) * 10000 + (century_offset + months) * 100 + days
+
+    @staticmethod
+    def control_digits(base: np.ndarray) -> np.ndarray:
+        """
+        Calculate the control digits for the first ten PESEL digits.
+
+        :param base: Array of ten digit numbers.
+        :type base: np.ndarray
+        :return: Array of control digits.
+        :rtype: np.ndarray
+        """
+        digits = (base[:, None] // DIGIT_POWERS[1:]) % 10
+        return (10 - (digits @ CONTROL_WEIGHTS) % 10) % 10
+
+    @staticmethod
+    def to_strings(pesel: np.ndarray) -> np.ndarray:
+        """
+        Format PESEL numbers as zero padded eleven digit strings.
+
+        :param pesel: Array of PESEL numbers.
+        :type pesel: np.ndarray
+        :return: Array of PESEL strings.
+        :rtype: np.ndarray
+        """
+        digits = ((pesel[:, None] // DIGIT_POWERS) % 10 + ord("0")).astype(np.uint8)
+        return digits.view("S11").ravel().astype("U11").astype(object)
+
+    def capacity(self) -> int:
+        """
+        :return: Number of serial numbers available per birth date and gender.
+        :rtype: int
+        """
+        return self.partition_slots * 5
+
+    def _draw_serials(self, male: np.ndarray, rng) -> np.ndarray:
+        index, count = self.partition
+        size = len(male)
+        serial = index + rng.integers(0, self.partition_slots, size) * count
+        return serial * 10 + 2 * rng.integers(0, 5, size) + male
+
+    def _free_serials(self, row: int, male: int) -> np.ndarray:
+        index, count = self.partition
+        serials = np.arange(male, SERIAL_SPACE, 2)
+        serials = serials[(serials // 10) % count == index]
+        taken = self.bits[row, serials >> 3] & (1 << (serials & 7)).astype(np.uint8)
+        return serials[taken == 0]
+
+    def _rows(self, days: np.ndarray) -> np.ndarray:
+        """
+        Map day numbers to bitmap rows, growing the bitmap to cover new dates.
+        """
+        low, high = int(days.min()), int(days.max())
+        if self.first_day is None:
+            self.first_day = low
+        last_day = self.first_day + len(self.bits) - 1
+        if low < self.first_day or high > last_day:
+            new_first = min(low, self.first_day)
+            new_last = max(high, last_day)
+            bits = np.zeros((new_last - new_first + 1, SERIAL_SPACE // 8), dtype=np.uint8)
+            used = np.zeros((new_last - new_first + 1, 2), dtype=np.int32)
+            shift = self.first_day - new_first
+            bits[shift : shift + len(self.bits)] = self.bits
+            used[shift : shift + len(self.used)] = self.used
+            self.bits, self.used, self.first_day = bits, used, new_first
+        return days - self.first_day
+
+    def _check_capacity(self, rows: np.ndarray, male: np.ndarray):
+        keys, counts = np.unique(rows * 2 + male, return_counts=True)
+        free = self.capacity() - self.used[keys // 2, keys % 2]
+        exhausted = np.flatnonzero(counts > free)
+        if exhausted.size:
+            key = keys[exhausted[0]]
+            day = np.datetime64(int(key // 2) + self.first_day, "D")
+            gender = "M" if key % 2 else "K"
+            raise PeselSpaceExhausted(
+                f"PESEL serial space exhausted for birth date {day} and gender {gender}: "
+                f"requested {counts[exhausted[0]]}, {max(free[exhausted[0]], 0)} numbers left"
+            )
+
+    def _mark(self, rows: np.ndarray, serials: np.ndarray):
+        np.bitwise_or.at(self.bits, (rows, serials >> 3), (1 << (serials & 7)).astype(np.uint8))
+        np.add.at(self.used, (rows, serials & 1), 1)
+
+    @staticmethod
+    def decode_dates(pesel: np.ndarray) -> np.ndarray:
+        """
+        Decode the birth dates of PESEL numbers, the inverse of :meth:`encode_prefix`.
+
+        :param pesel: Array of PESEL numbers.
+        :type pesel: np.ndarray
+        :return: Array of ``datetime64[D]`` birth dates, ``NaT`` for numbers without a valid date.
+        :rtype: np.ndarray
+        """
+        prefix = pesel // (SERIAL_SPACE * 10)
+        coded_month = prefix // 100 % 100
+        years = ((coded_month // 20 + 1) % 5) * 100 + FIRST_YEAR + prefix // 10000
+        months, days = coded_month % 20, prefix % 100
+        dates = (
+            ((years - 1970) * 12 + months - 1).astype("datetime64[M]").astype("datetime64[D]")
+            + (days - 1).astype("timedelta64[D]")
+        )
+        # day 31 of a 30 day month and the like roll over into the next month
+        valid = (months >= 1) & (months <= 12) & (days >= 1) & (split_dates(dates)[2] == days)
+        return np.where(valid, dates, np.datetime64("NaT"))
+
+    @staticmethod
+    def parse(pesels: np.ndarray) -> tuple:
+        """
+        Convert PESEL numbers read from an existing output to integers, dropping missing values and values
+        that are not eleven digits.
+
+        :param pesels: Array of PESEL numbers, as integers or strings, possibly with missing values.
+        :type pesels: np.ndarray
+        :return: Tuple of the array of valid PESEL numbers and the number of values dropped.
+        :rtype: tuple[np.ndarray, int]
+        """
+        pesel = np.asarray(pesels)
+        if pesel.dtype.kind in "iu":
+            valid = (pesel >= 0) & (pesel < 10**11)
+            return pesel[valid].astype(np.int64), int((~valid).sum())
+        text = pd.Series(pesel, dtype=object).astype("string").str.strip()
+        valid = text.str.fullmatch(r"\d{11}").fillna(False).to_numpy(dtype=bool)
+        return text[valid].astype(np.int64).to_numpy(), int((~valid).sum())
+
+    def register(self, pesels: np.ndarray, birth_range: tuple = None) -> int:
+        """
+        Mark existing PESEL numbers as used, so they are never generated (e.g. the rows of an output that
+        new rows are appended to).
+
+        Numbers of every partition are marked, but only the numbers of this generator's partition count
+        against its capacity. Numbers without a valid birth date, or born outside ``birth_range``, can never
+        be generated and are ignored, so malformed values never grow the bitmap. Missing and malformed
+        values are skipped with a warning, see :meth:`parse`.
+
+        :param pesels: Array of PESEL numbers, as integers or eleven digit strings.
+        :type pesels: np.ndarray
+        :param birth_range: First and last birth date (``datetime64[D]``) that will be generated.
+        :type birth_range: tuple[np.datetime64, np.datetime64]
+        :return: Number of newly registered PESEL numbers.
+        :rtype: int
+        """
+        pesel, skipped = self.parse(pesels)
+        if skipped:
+            logger.warning("Skipped %d missing or malformed PESEL numbers", skipped)
+        dates = self.decode_dates(pesel)
+        known = ~np.isnat(dates)
+        if birth_range is not None:
+            first, last = (np.datetime64(day, "D") for day in birth_range)
+            known &= (dates >= first) & (dates <= last)
+        if not known.any():
+            return 0
+        rows = self._rows(dates[known].astype(np.int64))
+        serials = pesel[known] // 10 % SERIAL_SPACE
+        _, first = np.unique(rows * SERIAL_SPACE + serials, return_index=True)
+        rows, serials = rows[first], serials[first]
+        new = (self.bits[rows, serials >> 3] & (1 << (serials & 7)).astype(np.uint8)) == 0
+        rows, serials = rows[new], serials[new]
+
+        index, count = self.partition
+        np.bitwise_or.at(self.bits, (rows, serials >> 3), (1 << (serials & 7)).astype(np.uint8))
+        own = (serials // 10) % count == index
+        np.add.at(self.used, (rows[own], serials[own] & 1), 1)
+        return len(rows)
+
+    def generate(self, birth_dates: np.ndarray, genders: np.ndarray, rng=None) -> np.ndarray:
+        """
+        Generate unique PESEL numbers for a batch of birth dates and genders.
+
+        :param birth_dates: Array of birth dates.
+        :type birth_dates: np.ndarray
+        :param genders: Array of gender labels ('M' or 'K').
+        :type genders: np.ndarray
+        :param rng: Random number generator, defaults to a fresh ``np.random.default_rng()``.
+        :type rng: np.random.Generator
+        :raises ValueError: If a gender label or birth date is not supported.
+        :raises PeselSpaceExhausted: If there are not enough free numbers for a birth date.
+        :return: Array of eleven digit PESEL strings.
+        :rtype: np.ndarray
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        birth_dates = np.asarray(birth_dates).astype("datetime64[D]")
+        if len(birth_dates) == 0:
+            return np.array([], dtype=object)
+
+        genders = np.asarray(genders)
+        if not np.isin(genders, ["M", "K", "m", "k"]).all():
+            raise ValueError("Wrong Gender value provided to PESEL generator!")
+        male = np.isin(genders, ["M", "m"]).astype(np.int64)
+
+        prefix = self.encode_prefix(*split_dates(birth_dates))
+        rows = self._rows(birth_dates.astype(np.int64))
+        self._check_capacity(rows, male)
+
+        serials = np.empty(len(rows), dtype=np.int64)
+        pending = np.arange(len(rows))
+        for _ in range(self.max_rounds):
+            if not pending.size:
+                break
+            candidate = self._draw_serials(male[pending], rng)
+            row = rows[pending]
+            taken = self.bits[row, candidate >> 3] & (1 << (candidate & 7)).astype(np.uint8)
+            _, first = np.unique(row * SERIAL_SPACE + candidate, return_index=True)
+            accepted = np.zeros(len(pending), dtype=bool)
+            accepted[first] = True
+            accepted &= taken == 0
+
+            self._mark(row[accepted], candidate[accepted])
+            serials[pending[accepted]] = candidate[accepted]
+            self.collisions += int((~accepted).sum())
+            pending = pending[~accepted]
+
+        # the serial space of some dates is nearly full, pick from what is left
+        self.fallbacks += len(pending)
+        for idx in pending:
+            free = self._free_serials(rows[idx], male[idx])
+            serial = rng.choice(free)
+            self._mark(rows[idx : idx + 1], np.array([serial]))
+            serials[idx] = serial
+
+        base = prefix * SERIAL_SPACE + serials
+        pesel = base * 10 + self.control_digits(base)
+        return self.to_strings(pesel)
@@ -0,0 +1,162 @@
+import queue
+import threading
+import time
+
+# items waiting in the queue of every consumer before the producer blocks
+QUEUE_SIZE = 2
+
+# queued after the last item to make a consumer finish
+_STOP = object()
+
+
+class Cancelled(BaseException):
+    """
+    Raised when a run is cancelled, with Ctrl-C or by setting its cancel event.
+
+    Like ``KeyboardInterrupt`` it is not an ``Exception``, so handlers of generation errors let it through.
+    """
+
+    def __init__(self, message: str = "Cancelled", reports: dict = None):
+        """
+        :param message: Reason of the cancellation.
+        :type message: str
+        :param reports: Reports of the outputs closed with the rows written before the cancellation, see
+            ``writers.write_chunks``.
+        :type reports: dict
+        """
+        super().__init__(message)
+        self.reports = reports
+
+
+class Consumer:
+    """
+    Thread consuming the items of a producer through a bounded queue.
+
+    :meth:`put` blocks while the queue is full, so a consumer slower than the producer holds it back
+    (backpressure) instead of letting items pile up in memory. An exception raised while consuming is kept in
+    :attr:`error` and the remaining items are discarded, so the producer never waits on a failed consumer.
+    After :meth:`cancel` the queued items are discarded as well, but ``finish`` still runs.
+    """
+
+    def __init__(self, name: str, consume, finish=None, queue_size: int = QUEUE_SIZE):
+        """
+        :param name: Name of the consumer thread.
+        :type name: str
+        :param consume: Function called with every item, on the consumer thread.
+        :type consume: Callable
+        :param finish: Function called without arguments after the last item, on the consumer thread, even if
+            consuming failed.
+        :type finish: Callable
+        :param queue_size: Number of items waiting for the consumer before :meth:`put` blocks.
+        :type queue_size: int
+        """
+        self.name = name
+        self.consume = consume
+        self.finish = finish
+        self.queue = queue.Queue(maxsize=max(1, queue_size))
+        self.error = None
+        self.cancelled = False
+        self.blocked = 0.0
+        self.finished = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _STOP:
+                break
+            if self.error is None and not self.cancelled:
+                try:
+                    self.consume(item)
+                except BaseException as e:
+                    self.error = e
+        if self.finish is not None:
+            try:
+                self.finish()
+            except BaseException as e:
+                if self.error is None:
+                    self.error = e
+        self.finished.set()
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None
+
+    def put(self, item) -> bool:
+        """
+        Queue an item, waiting while the queue is full.
+
+        :param item: Item to consume.
+        :return: False if the consumer failed and the item was not queued.
+        :rtype: bool
+        """
+        if self.failed:
+            return False
+        start = time.perf_counter()
+        self.queue.put(item)
+        self.blocked += time.perf_counter() - start
+        return True
+
+    def cancel(self):
+        """
+        Discard the items not consumed yet and finish after the current one.
+        """
+        self.cancelled = True
+        self.stop()
+
+    def stop(self):
+        """
+        Let the consumer finish after the items already queued.
+        """
+        self.queue.put(_STOP)
+
+    def join(self):
+        """
+        Wait until the consumer finished.
+
+        Waits on :attr:`finished` rather than joining the thread, as an interrupted ``Thread.join`` marks a
+        thread still running as stopped, so the wait can be interrupted and resumed.
+        """
+        self.finished.wait()
+
+
+def run_pipeline(items, consumers: list):
+    """
+    Feed every item of a producer to all consumers, overlapping producing the next item with consuming the
+    previous ones.
+
+    Producing stops early once every consumer failed. The consumers are always stopped and joined. If the
+    producer raises, e.g. ``KeyboardInterrupt`` on Ctrl-C, the items still queued are discarded instead of
+    consumed and its exception is propagated after the consumers finished. The same goes for a
+    ``KeyboardInterrupt`` while waiting for the consumers, they still finish the item they are consuming.
+
+    :param items: Iterable producing the items, e.g. a generator of chunks.
+    :type items: Iterable
+    :param consumers: Consumers receiving every item.
+    :type consumers: list[Consumer]
+    """
+    try:
+        for item in items:
+            if not [consumer for consumer in consumers if consumer.put(item)]:
+                break
+    except BaseException:
+        for consumer in consumers:
+            consumer.cancel()
+        raise
+    else:
+        for consumer in consumers:
+            consumer.stop()
+    finally:
+        interrupted = None
+        for consumer in consumers:
+            while not consumer.finished.is_set():
+                try:
+                    consumer.join()
+                except KeyboardInterrupt as e:
+                    # the current items are still written and the outputs closed, so they stay valid
+                    interrupted = e
+                    for other in consumers:
+                        other.cancelled = True
+        if interrupted is not None:
+            raise interrupted
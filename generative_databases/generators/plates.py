@@ -0,0 +1,343 @@
+import numpy as np
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+# first letters of the licence plate prefixes of every voivodeship (normalized names), the second letter
+# being the reserve series used once the first one is exhausted
+VOIVODESHIP_LETTERS = {
+    "dolnoslaskie": "DV",
+    "kujawsko-pomorskie": "C",
+    "lubelskie": "L",
+    "lubuskie": "F",
+    "lodzkie": "E",
+    "malopolskie": "KJ",
+    "mazowieckie": "WA",
+    "opolskie": "O",
+    "podkarpackie": "RY",
+    "podlaskie": "B",
+    "pomorskie": "GX",
+    "slaskie": "SI",
+    "swietokrzyskie": "T",
+    "warminsko-mazurskie": "N",
+    "wielkopolskie": "PM",
+    "zachodniopomorskie": "Z",
+}
+# letters of the individual part of a plate, B, D, I, O and Z are left out as they look like digits
+PLATE_LETTERS = np.frombuffer(b"ACEFGHJKLMNPRSTUVWXY", dtype=np.uint8)
+# patterns of the individual part of regular plates by prefix length, '#' for a digit and 'L' for a letter
+PLATE_PATTERNS = {
+    2: ("#####", "####L", "###LL", "#L###", "#LL##"),
+    3: ("L###", "##LL", "#L##", "##L#", "#LL#", "LL##", "#####", "####L", "###LL"),
+}
+# cities whose prefixes are listed under the name of another area in the car plates data
+CITY_AREAS = {"warszawa": "warszawski"}
+PLATE_WIDTH = 9
+KEY_STRIDE = 1 << 21  # above the number of plates of any prefix
+
+
+def pattern_capacity(pattern: str) -> int:
+    """
+    :param pattern: Pattern of the individual part of a plate, see :data:`PLATE_PATTERNS`.
+    :type pattern: str
+    :return: Number of plates with the pattern.
+    :rtype: int
+    """
+    return int(np.prod([10 if char == "#" else len(PLATE_LETTERS) for char in pattern]))
+
+
+class PlateSpaceExhausted(ValueError):
+    """
+    Raised when there are no free plate numbers left for a prefix.
+    """
+
+
+class PlateGenerator:
+    """
+    Batch licence plate generator guaranteeing uniqueness across all generated plates.
+
+    The prefixes of the car plates data are parsed once into arrays ordered by voivodeship and area, so the
+    prefixes of a city are a contiguous range, and so are the prefixes of a voivodeship. Every plate is
+    encoded as an integer key (unique prefix index times :data:`KEY_STRIDE` plus the position of the plate
+    among all plates of the prefix), used keys are kept in a sorted array and checked with binary search.
+
+    Generators running in separate processes can split the plates of every prefix with ``partition``: the
+    generator ``(index, count)`` only uses plate positions equal to ``index`` modulo ``count``.
+    """
+
+    def __init__(self, car_plates: pd.DataFrame, max_rounds: int = 32, partition: tuple = (0, 1)):
+        """
+        :param car_plates: Car plates data with the 'area', 'admin_name' and 'prefix' of every prefix, see
+            :meth:`data_importer.DataBank.load_built_in_car_plates_data`.
+        :type car_plates: pd.DataFrame
+        :param max_rounds: Number of random redraw rounds before the remaining collisions are resolved by
+            picking directly from the free plates.
+        :type max_rounds: int
+        :param partition: Index of this generator's part of the plates and the number of parts.
+        :type partition: tuple[int, int]
+        """
+        index, count = partition
+        if not 0 <= index < count:
+            raise ValueError(f"Invalid plate partition: {partition}")
+        self.partition = (index, count)
+        self.max_rounds = max_rounds
+
+        self.voivodeships = pd.Index(sorted(VOIVODESHIP_LETTERS), dtype=object)
+        letters = {
+            letter: idx
+            for idx, voivodeship in enumerate(self.voivodeships)
+            for letter in VOIVODESHIP_LETTERS[voivodeship]
+        }
+        prefixes = car_plates["prefix"].to_numpy(dtype=object)
+        codes = np.array([letters.get(prefix[0], -1) for prefix in prefixes], dtype=np.int64)
+        known = np.flatnonzero((codes >= 0) & np.isin([len(prefix) for prefix in prefixes], list(PLATE_PATTERNS)))
+        order = known[np.lexsort((car_plates["area"].to_numpy()[known], codes[known]))]
+
+        # a city and its county can share a series (e.g. DW of 'wroclaw' and 'wroclawski'), so plates are keyed
+        # by the unique prefix, prefix_ids mapping the ordered prefix positions to it
+        self.prefix_ids, self.prefixes = pd.factorize(prefixes[order])
+        self.prefixes = np.asarray(self.prefixes, dtype=object)
+        self.prefix_lengths = np.array([len(prefix) for prefix in self.prefixes], dtype=np.int64)
+        self.prefix_bytes = np.zeros((len(self.prefixes), max(PLATE_PATTERNS)), dtype=np.uint8)
+        for idx, prefix in enumerate(self.prefixes):
+            self.prefix_bytes[idx, : len(prefix)] = np.frombuffer(prefix.encode("ascii"), dtype=np.uint8)
+        # plates of voivodeship i have a prefix in prefixes[offsets[i]:offsets[i + 1]]
+        self.offsets = np.concatenate(
+            ([0], np.cumsum(np.bincount(codes[order], minlength=len(self.voivodeships))))
+        ).astype(np.int64)
+        # prefix range of every city or county, with the voivodeship it belongs to
+        self.areas = {}
+        admin_names = car_plates["admin_name"].to_numpy(dtype=object)[order]
+        areas = car_plates["area"].to_numpy()[order]
+        starts = np.flatnonzero(np.diff(areas, prepend=-1) != 0)
+        for start, end in zip(starts, np.append(starts[1:], len(areas))):
+            self.areas[(admin_names[start], int(codes[order[start]]))] = (int(start), int(end - start))
+
+        self.pattern_starts = {
+            length: np.cumsum([0] + [pattern_capacity(pattern) for pattern in patterns])
+            for length, patterns in PLATE_PATTERNS.items()
+        }
+        capacities = np.array([self.pattern_starts[length][-1] for length in self.prefix_lengths], dtype=np.int64)
+        self.slots = np.maximum((capacities - index + count - 1) // count, 0)
+        self.used = np.zeros(0, dtype=np.int64)
+        self.used_per_prefix = np.zeros(len(self.prefixes), dtype=np.int64)
+        self.collisions = 0
+        self.fallbacks = 0
+
+    def prefix_ranges(self, cities: np.ndarray, voivodeships: np.ndarray) -> tuple:
+        """
+        Range of the prefixes every owner's plate can have.
+
+        A city with its own prefixes (e.g. 'wroclaw': DW, DX, VW, VX) uses them, other localities the
+        prefixes of their voivodeship and localities in an unknown voivodeship any prefix.
+
+        :param cities: Normalized city names.
+        :type cities: np.ndarray
+        :param voivodeships: Normalized voivodeship names.
+        :type voivodeships: np.ndarray
+        :return: Arrays with the first prefix position and the number of prefixes of every owner.
+        :rtype: tuple[np.ndarray, np.ndarray]
+        """
+        city_codes, city_names = pd.factorize(cities)
+        voivodeship_codes, voivodeship_names = pd.factorize(voivodeships)
+        voivodeship_codes = self.voivodeships.get_indexer(voivodeship_names)[voivodeship_codes]
+        pairs, localities = pd.factorize(city_codes * (len(self.voivodeships) + 1) + voivodeship_codes + 1)
+        starts = np.empty(len(localities), dtype=np.int64)
+        counts = np.empty(len(localities), dtype=np.int64)
+        for idx, locality in enumerate(localities):
+            city = city_names[locality // (len(self.voivodeships) + 1)]
+            city = CITY_AREAS.get(city, city)
+            code = locality % (len(self.voivodeships) + 1) - 1
+            if (city, code) in self.areas:
+                starts[idx], counts[idx] = self.areas[(city, code)]
+            elif code >= 0:
+                starts[idx], counts[idx] = self.offsets[code], self.offsets[code + 1] - self.offsets[code]
+            else:
+                starts[idx], counts[idx] = 0, len(self.prefix_ids)
+        return starts[pairs], counts[pairs]
+
+    def _check_capacity(self, positions: np.ndarray):
+        used, counts = np.unique(positions, return_counts=True)
+        free = self.slots[used] - self.used_per_prefix[used]
+        exhausted = np.flatnonzero(counts > free)
+        if exhausted.size:
+            idx = exhausted[0]
+            raise PlateSpaceExhausted(
+                f"Plate numbers exhausted for prefix {self.prefixes[used[idx]]}: "
+                f"requested {counts[idx]}, {max(free[idx], 0)} numbers left"
+            )
+
+    def _is_used(self, keys: np.ndarray) -> np.ndarray:
+        idx = np.minimum(np.searchsorted(self.used, keys), max(len(self.used) - 1, 0))
+        return (self.used[idx] == keys) if len(self.used) else np.zeros(len(keys), dtype=bool)
+
+    def _insert(self, keys: np.ndarray):
+        # merge new unused keys into the sorted used keys with one copy instead of sorting them all again
+        keys = np.sort(keys)
+        self.used = np.insert(self.used, np.searchsorted(self.used, keys), keys)
+
+    def _mark(self, keys: np.ndarray):
+        self._insert(keys)
+        np.add.at(self.used_per_prefix, keys // KEY_STRIDE, 1)
+
+    def _free_keys(self, position: int) -> np.ndarray:
+        index, count = self.partition
+        keys = position * KEY_STRIDE + index + np.arange(self.slots[position], dtype=np.int64) * count
+        return keys[~self._is_used(keys)]
+
+    def generate_keys(self, positions: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Draw unused plate keys of the given prefixes and mark them as used.
+
+        :param positions: Unique prefix index of every plate.
+        :type positions: np.ndarray
+        :param rng: Random number generator.
+        :type rng: np.random.Generator
+        :raises PlateSpaceExhausted: If there are not enough free plates for a prefix.
+        :return: Array of plate keys.
+        :rtype: np.ndarray
+        """
+        index, count = self.partition
+        self._check_capacity(positions)
+        keys = np.empty(len(positions), dtype=np.int64)
+        pending = np.arange(len(positions))
+        for _ in range(self.max_rounds):
+            if not pending.size:
+                break
+            position = positions[pending]
+            candidate = position * KEY_STRIDE + index + (rng.random(len(pending)) * self.slots[position]).astype(
+                np.int64
+            ) * count
+            _, first = np.unique(candidate, return_index=True)
+            accepted = np.zeros(len(pending), dtype=bool)
+            accepted[first] = True
+            accepted &= ~self._is_used(candidate)
+
+            self._mark(candidate[accepted])
+            keys[pending[accepted]] = candidate[accepted]
+            self.collisions += int((~accepted).sum())
+            pending = pending[~accepted]
+
+        # the plates of some prefixes are nearly all used, pick from what is left
+        self.fallbacks += len(pending)
+        for idx in pending:
+            key = rng.choice(self._free_keys(positions[idx]))
+            self._mark(np.array([key]))
+            keys[idx] = key
+        return keys
+
+    def to_strings(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Decode plate keys into plate numbers such as 'DW 1234A' or 'KRA 12AB'.
+
+        :param keys: Array of plate keys.
+        :type keys: np.ndarray
+        :return: Array of plate number strings.
+        :rtype: np.ndarray
+        """
+        positions, offsets = np.divmod(keys, KEY_STRIDE)
+        chars = np.zeros((len(keys), PLATE_WIDTH), dtype=np.uint8)
+        lengths = self.prefix_lengths[positions]
+        for length, patterns in PLATE_PATTERNS.items():
+            rows = np.flatnonzero(lengths == length)
+            chars[rows, :length] = self.prefix_bytes[positions[rows], :length]
+            chars[rows, length] = ord(" ")
+            starts = self.pattern_starts[length]
+            pattern_idx = np.searchsorted(starts, offsets[rows], side="right") - 1
+            for idx, pattern in enumerate(patterns):
+                selected = rows[pattern_idx == idx]
+                value = offsets[selected] - starts[idx]
+                for column in range(len(pattern) - 1, -1, -1):
+                    if pattern[column] == "#":
+                        value, digit = np.divmod(value, 10)
+                        chars[selected, length + 1 + column] = digit + ord("0")
+                    else:
+                        value, letter = np.divmod(value, len(PLATE_LETTERS))
+                        chars[selected, length + 1 + column] = PLATE_LETTERS[letter]
+        return chars.view(f"S{PLATE_WIDTH}").ravel().astype(f"U{PLATE_WIDTH}").astype(object)
+
+    def to_keys(self, plates: np.ndarray) -> np.ndarray:
+        """
+        Encode plate numbers as plate keys, the inverse of :meth:`to_strings`.
+
+        :param plates: Array of plate number strings.
+        :type plates: np.ndarray
+        :return: Array of plate keys, -1 for plates with an unknown prefix or pattern.
+        :rtype: np.ndarray
+        """
+        # one column per character, one wider than a plate so that longer strings never match
+        strings = pd.Series(np.asarray(plates, dtype=object), dtype=object).fillna("").to_numpy()
+        strings = strings.astype(f"U{PLATE_WIDTH + 1}")
+        chars = strings.view(np.uint32).reshape(len(strings), PLATE_WIDTH + 1).astype(np.int64)
+        lengths = np.char.str_len(strings)
+        letter_values = np.full(128, -1, dtype=np.int64)
+        letter_values[PLATE_LETTERS] = np.arange(len(PLATE_LETTERS))
+        letters = np.where(chars < 128, letter_values[np.minimum(chars, 127)], -1)
+        digits = np.where((chars >= ord("0")) & (chars <= ord("9")), chars - ord("0"), -1)
+
+        prefix_codes = np.array([int.from_bytes(prefix.encode("ascii"), "big") for prefix in self.prefixes])
+        prefix_order = np.argsort(prefix_codes)
+        keys = np.full(len(strings), -1, dtype=np.int64)
+        for length, patterns in PLATE_PATTERNS.items():
+            codes = np.zeros(len(strings), dtype=np.int64)
+            for column in range(length):
+                codes = codes * 256 + np.minimum(chars[:, column], 255)
+            found = np.minimum(np.searchsorted(prefix_codes, codes, sorter=prefix_order), len(prefix_codes) - 1)
+            positions = prefix_order[found]
+            prefixed = (prefix_codes[positions] == codes) & (chars[:, length] == ord(" "))
+            for idx, pattern in enumerate(patterns):
+                rows = np.flatnonzero(prefixed & (lengths == length + 1 + len(pattern)))
+                value = np.zeros(len(rows), dtype=np.int64)
+                valid = np.ones(len(rows), dtype=bool)
+                for column, char in enumerate(pattern):
+                    part = (digits if char == "#" else letters)[rows, length + 1 + column]
+                    valid &= part >= 0
+                    value = value * (10 if char == "#" else len(PLATE_LETTERS)) + part
+                rows = rows[valid]
+                keys[rows] = positions[rows] * KEY_STRIDE + self.pattern_starts[length][idx] + value[valid]
+        return keys
+
+    def register(self, plates: np.ndarray) -> int:
+        """
+        Mark existing plate numbers as used, so they are never generated (e.g. the plates of an output that
+        new rows are appended to).
+
+        Plates of every partition are marked, but only the plates of this generator's partition count against
+        the capacity of their prefix. Plates that can not be generated (other prefixes or patterns) are ignored.
+
+        :param plates: Array of plate number strings.
+        :type plates: np.ndarray
+        :return: Number of newly registered plates.
+        :rtype: int
+        """
+        keys = np.unique(self.to_keys(plates))
+        keys = keys[keys >= 0]
+        keys = keys[~self._is_used(keys)]
+        self._insert(keys)
+        index, count = self.partition
+        own = keys[(keys % KEY_STRIDE) % count == index]
+        np.add.at(self.used_per_prefix, own // KEY_STRIDE, 1)
+        return len(keys)
+
+    def generate(self, cities: np.ndarray, voivodeships: np.ndarray, rng: np.random.Generator = None) -> np.ndarray:
+        """
+        Generate unique plate numbers for a batch of owners, with prefixes of their city or voivodeship.
+
+        :param cities: Normalized city names of the owners.
+        :type cities: np.ndarray
+        :param voivodeships: Normalized voivodeship names of the owners.
+        :type voivodeships: np.ndarray
+        :param rng: Random number generator, defaults to a fresh ``np.random.default_rng()``.
+        :type rng: np.random.Generator
+        :raises PlateSpaceExhausted: If there are not enough free plates for a prefix.
+        :return: Array of plate number strings.
+        :rtype: np.ndarray
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+        if len(cities) == 0:
+            return np.array([], dtype=object)
+        starts, counts = self.prefix_ranges(cities, voivodeships)
+        positions = self.prefix_ids[starts + (rng.random(len(starts)) * counts).astype(np.int64)]
+        return self.to_strings(self.generate_keys(positions, rng))
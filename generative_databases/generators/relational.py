@@ -0,0 +1,240 @@
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+from generative_databases.generators import writers
+from generative_databases.generators.generator import Generator, record_outputs
+from generative_databases.generators.pipeline import QUEUE_SIZE, Cancelled
+
+logger = logging.getLogger(__name__)
+
+# tables of a relational sample in dependency order, with their primary and foreign keys
+TABLES = {
+    "cities": {"primary_key": "city_id", "foreign_keys": {}},
+    "postal_codes": {"primary_key": "postal_code_id", "foreign_keys": {"city_id": "cities.city_id"}},
+    "persons": {
+        "primary_key": "person_id",
+        "foreign_keys": {"city_id": "cities.city_id", "postal_code_id": "postal_codes.postal_code_id"},
+    },
+    "vehicles": {"primary_key": "vehicle_id", "foreign_keys": {"person_id": "persons.person_id"}},
+}
+
+
+class RelationalGenerator(Generator):
+    """
+    Generates a normalised sample instead of one denormalised table.
+
+    The sample consists of the 'cities' and 'postal_codes' of the localisation data, 'persons' with foreign
+    keys to the city and postal code they live at and 'vehicles' owned by the persons, with unique plate
+    numbers of the owner's city or voivodeship. The number of vehicles of every person is Poisson distributed with the
+    'vehicles_per_person' parameter as mean. Keys are consecutive integers starting at 1, assigned with
+    array operations while the persons and vehicles are generated chunk by chunk. The 'columns' parameter
+    does not apply, persons always have all their columns.
+    """
+
+    def __init__(
+        self,
+        params_dict: dict,
+        data_storage=None,
+        rng: np.random.Generator = None,
+        metrics=None,
+        cancel: threading.Event = None,
+    ):
+        """
+        :param params_dict: Generation parameters, see :class:`Generator`.
+        :type params_dict: dict
+        :param data_storage: Reference data, lazily loaded from the sources in ``params_dict`` if not given.
+        :type data_storage: data_importer.DataBank
+        :param rng: Random number generator used for every draw, created from the 'seed' parameter if not given.
+        :type rng: np.random.Generator
+        :param metrics: Collector of stage timings and counters, see :class:`Generator`.
+        :type metrics: Metrics
+        :param cancel: Event cancelling the generation when set, see :class:`Generator`.
+        :type cancel: threading.Event
+        """
+        super().__init__(dict(params_dict, columns=None), data_storage, rng, metrics, cancel=cancel)
+        self.vehicles_per_person = float(params_dict.get("vehicles_per_person", 0.5))
+
+    def generate_cities(self) -> pd.DataFrame:
+        """
+        Generate the cities table, one row per city of the localisation data.
+
+        :return: DataFrame with the 'city_id' key and the localisation columns.
+        :rtype: pd.DataFrame
+        """
+        localisation = self.data_storage.localisation
+        with self.metrics.stage("relational.cities"):
+            cities = localisation.reset_index(drop=True)
+            cities.insert(0, "city_id", np.arange(1, len(cities) + 1, dtype=np.int64))
+            return cities
+
+    def generate_postal_codes(self) -> pd.DataFrame:
+        """
+        Generate the postal codes table, one row per postal code of every city.
+
+        :return: DataFrame with the 'postal_code_id' key, the 'city_id' of the city and the 'postal_code'.
+        :rtype: pd.DataFrame
+        """
+        postal_offsets = self.data_storage.postal_offsets
+        with self.metrics.stage("relational.postal_codes"):
+            if postal_offsets is None:
+                return pd.DataFrame(
+                    {
+                        "postal_code_id": np.array([], dtype=np.int64),
+                        "city_id": np.array([], dtype=np.int64),
+                        "postal_code": np.array([], dtype=object),
+                    }
+                )
+            counts = np.diff(postal_offsets)
+            return pd.DataFrame(
+                {
+                    "postal_code_id": np.arange(1, postal_offsets[-1] + 1, dtype=np.int64),
+                    "city_id": np.repeat(np.arange(1, len(counts) + 1, dtype=np.int64), counts),
+                    "postal_code": self.data_storage.postal_codes,
+                }
+            )
+
+    def generate_person_table(self, size: int, first_id: int = 1) -> pd.DataFrame:
+        """
+        Generate a chunk of the persons table.
+
+        :param size: Number of persons.
+        :type size: int
+        :param first_id: Key of the first person of the chunk.
+        :type first_id: int
+        :return: DataFrame with the 'person_id' key, the person columns and the 'city_id' and
+            'postal_code_id' (missing for cities without postal codes) foreign keys.
+        :rtype: pd.DataFrame
+        """
+        persons = self.generate_persons(size)
+        with self.metrics.stage("relational.persons"):
+            rows = self.sample_localisation_rows(size)
+            persons.insert(0, "person_id", np.arange(first_id, first_id + size, dtype=np.int64))
+            persons["city_id"] = rows + 1
+            if self.data_storage.postal_offsets is not None:
+                picks = self.sample_postal_codes(rows)
+                persons["postal_code_id"] = pd.arrays.IntegerArray(np.where(picks >= 0, picks + 1, 0), picks < 0)
+            return persons
+
+    def generate_vehicles(self, persons: pd.DataFrame, first_id: int = 1) -> pd.DataFrame:
+        """
+        Generate the vehicles of a chunk of persons.
+
+        :param persons: Chunk of the persons table, see :meth:`generate_person_table`.
+        :type persons: pd.DataFrame
+        :param first_id: Key of the first vehicle.
+        :type first_id: int
+        :return: DataFrame with the 'vehicle_id' key, the 'person_id' of the owner and the 'plate_number'.
+        :rtype: pd.DataFrame
+        """
+        with self.metrics.stage("relational.vehicles"):
+            counts = self.rng.poisson(self.vehicles_per_person, len(persons))
+            owners = np.repeat(np.arange(len(persons)), counts)
+            city_rows = persons["city_id"].to_numpy()[owners] - 1
+        plates = self.generate_plates(
+            self._take_column(self.data_storage.localisation, "city", city_rows),
+            self._take_column(self.data_storage.localisation, "admin_name", city_rows),
+        )
+        return pd.DataFrame(
+            {
+                "vehicle_id": np.arange(first_id, first_id + len(owners), dtype=np.int64),
+                "person_id": persons["person_id"].to_numpy()[owners],
+                "plate_number": plates,
+            }
+        )
+
+    def generate_tables(self, chunk_size: int = None):
+        """
+        Generate the tables of the sample in dependency order, persons and vehicles in chunks.
+
+        The persons generated are reported to the metrics as the progress of the 'generate' stage.
+
+        :param chunk_size: Number of persons per chunk, defaults to the whole sample in one chunk.
+        :type chunk_size: int
+        :raises Cancelled: If the generation is cancelled, see :meth:`Generator.cancel`.
+        :return: Generator yielding (table name, DataFrame) pairs, every chunk of persons followed by the
+            vehicles of these persons.
+        :rtype: Iterator[tuple[str, pd.DataFrame]]
+        """
+        if not chunk_size or chunk_size <= 0:
+            chunk_size = self.sample_size
+        cities = self.generate_cities()
+        self.metrics.count("rows.cities", len(cities))
+        yield "cities", cities
+        postal_codes = self.generate_postal_codes()
+        self.metrics.count("rows.postal_codes", len(postal_codes))
+        yield "postal_codes", postal_codes
+
+        vehicle_id = 1
+        self.metrics.progress("generate", 0, self.sample_size)
+        for start in range(0, self.sample_size, chunk_size):
+            self.check_cancelled()
+            size = min(chunk_size, self.sample_size - start)
+            persons = self.generate_person_table(size, start + 1)
+            vehicles = self.generate_vehicles(persons, vehicle_id)
+            vehicle_id += len(vehicles)
+            self.metrics.count("rows", size)
+            self.metrics.count("rows.persons", size)
+            self.metrics.count("rows.vehicles", len(vehicles))
+            logger.info(
+                f"Generated {size} persons with {len(vehicles)} vehicles ({start + size}/{self.sample_size})"
+            )
+            self.metrics.progress("generate", start + size, self.sample_size)
+            yield "persons", persons
+            yield "vehicles", vehicles
+
+    def write_progress(self, output_type: str, rows: int):
+        """
+        Report the rows written to an output, of all its tables, as the progress of its 'write.<format>' stage.
+
+        :param output_type: Output format.
+        :type output_type: str
+        :param rows: Rows written so far.
+        :type rows: int
+        """
+        self.metrics.progress(f"write.{output_type}", rows)
+
+    def generate_and_save(self, kwargs: dict, chunk_size: int = None, options: dict = None):
+        """
+        Generate the tables and save them to the specified formats, see :func:`writers.write_tables`.
+
+        :param kwargs: Dictionary specifying output formats and file paths.
+        :type kwargs: dict
+        :param chunk_size: Number of persons per chunk, defaults to the 'chunk_size' parameter or the whole sample.
+        :type chunk_size: int
+        :param options: Extra options per output format, defaults to the 'output_options' parameter.
+        :type options: dict
+        :raises Cancelled: If the generation was cancelled, with the reports of the outputs.
+        :raises ValueError: If the parameters or outputs are invalid, e.g. :class:`PeselSpaceExhausted` when the
+            sample needs more PESEL numbers than the birth dates allow.
+        :return: Report of every output.
+        :rtype: dict
+        """
+        if chunk_size is None:
+            chunk_size = self.params_dict.get("chunk_size")
+        if options is None:
+            options = self.params_dict.get("output_options")
+        try:
+            if self.params_dict.get("append"):
+                raise ValueError("Appending is not supported for relational samples")
+            reports = writers.write_tables(
+                self.generate_tables(chunk_size),
+                kwargs,
+                TABLES,
+                reproducible=self.params_dict.get("seed") is not None,
+                options=options,
+                queue_size=self.params_dict.get("queue_size", QUEUE_SIZE),
+                progress=self.write_progress,
+            )
+            record_outputs(self.metrics, reports)
+            return reports
+        except Cancelled as e:
+            record_outputs(self.metrics, e.reports or {})
+            raise
+        except Exception as e:
+            logger.error(f"Error in relational generate_and_save: {e}")
+            raise
+        finally:
+            self.metrics.emit()
@@ -0,0 +1,1602 @@
+import collections
+import csv
+import functools
+import gzip
+import io
+import itertools
+import os
+import re
+import shutil
+import threading
+import time
+import zipfile
+import numpy as np
+import pandas as pd
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    create_engine,
+    inspect,
+    select,
+)
+from generative_databases.generators.instrumentation import format_bytes
+from generative_databases.generators.pipeline import QUEUE_SIZE, Cancelled, Consumer, run_pipeline
+
+logger = logging.getLogger(__name__)
+
+SINKS = {}
+# sink options making an output add rows to the existing data instead of replacing it
+APPEND_OPTIONS = {"csv": {"append": True}, "parquet": {"append": True}, "sql": {"if_exists": "append"}}
+# rows read at once when scanning an existing output, see scan_column
+SCAN_BATCH_SIZE = 1 << 20
+# rows of an xlsx sheet, including the header
+EXCEL_MAX_ROWS = 1 << 20
+# creation and modification time of reproducible xlsx workbooks and their zip entries
+EXCEL_FIXED_TIME = datetime(2000, 1, 1)
+# characters not allowed in XML element names and the allowed first characters, see xml_tag
+XML_INVALID_TAG_CHARS = re.compile(r"[^\w.-]")
+XML_TAG_START = re.compile(r"[^\W\d]")
+# rows of a chunk joined into one string at a time by XmlSink
+XML_BLOCK_ROWS = 1 << 13
+# compression formats of text outputs by file extension, see TextSink
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".zst": "zstd", ".lz4": "lz4"}
+# uncompressed bytes compressed at once by one thread of a BlockCompressor
+COMPRESSION_BLOCK_SIZE = 1 << 22
+
+
+def register_sink(output_type: str):
+    """
+    Class decorator registering a sink class for an output format in :data:`SINKS`.
+
+    :param output_type: Output format name, as used in the outputs passed to :func:`write_chunks`.
+    :type output_type: str
+    """
+
+    def register(sink_class):
+        SINKS[output_type] = sink_class
+        return sink_class
+
+    return register
+
+
+def decode_categoricals(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert categorical columns back to plain object columns, for formats without dictionary encoding.
+
+    :param data: Generated data.
+    :type data: pd.DataFrame
+    :return: Data without categorical columns.
+    :rtype: pd.DataFrame
+    """
+    categorical = [column for column, dtype in data.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return data
+    return data.astype({column: object for column in categorical})
+
+
+def trim_categoricals(data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Drop the categories that do not occur in the data, so dictionary-encoded outputs do not carry the
+    whole reference vocabulary.
+
+    :param data: Generated data.
+    :type data: pd.DataFrame
+    :return: Data with trimmed categorical columns.
+    :rtype: pd.DataFrame
+    """
+    categorical = [column for column, dtype in data.dtypes.items() if isinstance(dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return data
+    return data.assign(**{column: data[column].cat.remove_unused_categories() for column in categorical})
+
+
+def concat_chunks(chunks: list, **kwargs) -> pd.DataFrame:
+    """
+    Concatenate chunks, keeping categorical columns categorical.
+
+    Every chunk's categoricals only have the categories drawn for it, ``pd.concat`` would turn columns with
+    differing categories into object columns. Their categories are unified (sorted, as the vocabularies they
+    are drawn from) first.
+
+    :param chunks: Generated chunks with the same columns.
+    :type chunks: list[pd.DataFrame]
+    :param kwargs: Extra keyword arguments of ``pd.concat``.
+    :return: Concatenated data.
+    :rtype: pd.DataFrame
+    """
+    if not chunks:
+        return pd.DataFrame()
+    categorical = [
+        column
+        for column, dtype in chunks[0].dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+        and any(not dtype.categories.equals(chunk[column].cat.categories) for chunk in chunks[1:])
+    ]
+    if categorical:
+        categories = {
+            column: pd.Index(np.unique(np.concatenate([chunk[column].cat.categories.to_numpy() for chunk in chunks])))
+            for column in categorical
+        }
+        chunks = [
+            chunk.assign(**{column: chunk[column].cat.set_categories(categories[column]) for column in categorical})
+            for chunk in chunks
+        ]
+    return pd.concat(chunks, **kwargs)
+
+
+def to_arrow(data: pd.DataFrame):
+    """
+    Convert a chunk to an Arrow table, categorical columns as dictionary arrays with int32 indices, so
+    tables of different chunks always have the same schema.
+
+    Indices of missing values are set to 0 rather than -1, so dictionary unification never reads an
+    undefined slot and the output stays byte for byte reproducible. Columns without any value in the chunk
+    get string dictionaries too, instead of the null dictionaries Arrow infers for them.
+
+    :param data: Generated data.
+    :type data: pd.DataFrame
+    :return: Arrow table without the index.
+    :rtype: pyarrow.Table
+    """
+    import pyarrow as pa
+
+    data = trim_categoricals(data)
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    for idx, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            values = data[field.name].array
+            missing = values.codes < 0
+            indices = pa.array(np.where(missing, 0, values.codes), type=pa.int32(), mask=missing)
+            value_type = field.type.value_type
+            if pa.types.is_null(value_type):
+                value_type = pa.string()
+            dictionary = pa.array(values.categories.to_numpy(), type=value_type)
+            column = pa.DictionaryArray.from_arrays(indices, dictionary)
+            table = table.set_column(idx, pa.field(field.name, column.type, field.nullable), column)
+    return table
+
+
+def split_extension(path: str) -> tuple:
+    """
+    Split a path into its root and its extension, including the compression extension if any
+    (``people.csv.gz`` -> ``('people', '.csv.gz')``).
+
+    :param path: File path.
+    :type path: str
+    :return: Root and extension of the path.
+    :rtype: tuple[str, str]
+    """
+    root, extension = os.path.splitext(path)
+    if extension.lower() in COMPRESSION_EXTENSIONS:
+        root, inner = os.path.splitext(root)
+        extension = inner + extension
+    return root, extension
+
+
+def block_compressor(compression: str, level: int = None):
+    """
+    Function compressing a block of bytes into a complete gzip member, zstd frame or lz4 frame.
+
+    Compressed blocks written one after the other form a valid file of the format, which every reader of
+    it decompresses as one stream.
+
+    :param compression: Compression format, 'gzip', 'zstd' or 'lz4'.
+    :type compression: str
+    :param level: Compression level, defaults to the usual default of the format.
+    :type level: int
+    :raises ValueError: If the format is unknown or its package is not installed.
+    :return: Function taking and returning bytes.
+    :rtype: Callable[[bytes], bytes]
+    """
+    if compression == "gzip":
+        return functools.partial(gzip.compress, compresslevel=6 if level is None else level, mtime=0)
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError:
+            raise ValueError("zstd compression needs the zstandard package, install it or use gzip")
+        return lambda block: zstandard.ZstdCompressor(level=3 if level is None else level).compress(block)
+    if compression == "lz4":
+        try:
+            import lz4.frame
+        except ImportError:
+            raise ValueError("lz4 compression needs the lz4 package, install it or use gzip")
+        return functools.partial(lz4.frame.compress, compression_level=0 if level is None else level)
+    raise ValueError(f"Unknown compression: {compression}, use {', '.join(COMPRESSION_EXTENSIONS.values())}")
+
+
+class BlockCompressor(io.RawIOBase):
+    """
+    Binary file that compresses what is written to it in blocks on a thread pool.
+
+    Blocks of ``block_size`` bytes are compressed independently (see :func:`block_compressor`) while the next
+    ones are being written, and are written to the file in order. At most two blocks per thread are pending,
+    which bounds the memory used. Block boundaries only depend on the bytes written, so the same data
+    always gives the same file.
+    """
+
+    def __init__(
+        self, path: str, compress, threads: int = None, block_size: int = COMPRESSION_BLOCK_SIZE
+    ):
+        """
+        :param path: Output file path.
+        :type path: str
+        :param compress: Function compressing one block, see :func:`block_compressor`.
+        :type compress: Callable[[bytes], bytes]
+        :param threads: Number of compressing threads, defaults to the number of CPUs.
+        :type threads: int
+        :param block_size: Uncompressed size of a block.
+        :type block_size: int
+        """
+        super().__init__()
+        self.compress = compress
+        self.block_size = block_size
+        self.threads = threads or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="compress")
+        self.pending = collections.deque()
+        self.buffer = bytearray()
+        self.file = open(path, "wb")
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[: self.block_size]))
+            del self.buffer[: self.block_size]
+        return len(data)
+
+    def _submit(self, block: bytes):
+        self.pending.append(self.executor.submit(self.compress, block))
+        while len(self.pending) > 2 * self.threads:
+            self.file.write(self.pending.popleft().result())
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self.buffer:
+                self._submit(bytes(self.buffer))
+                self.buffer = bytearray()
+            while self.pending:
+                self.file.write(self.pending.popleft().result())
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+            self.file.close()
+            super().close()
+
+
+class Sink:
+    """
+    Base class for output sinks that receive generated data chunk by chunk.
+
+    Sinks with ``uses_arrow`` set receive the chunk as an Arrow table in :meth:`_write_table`, converted
+    once per chunk for all of them by :func:`write_chunks`.
+    """
+
+    uses_arrow = False
+
+    def __init__(self, path: str, reproducible: bool = False):
+        """
+        :param path: Output file path (or database URL for SQL sinks).
+        :type path: str
+        :param reproducible: Leave out creation timestamps, so the same data always gives the same bytes.
+        :type reproducible: bool
+        """
+        self.path = path
+        self.reproducible = reproducible
+        self.rows = 0
+        self.first_index = 0
+        self.elapsed = 0.0
+
+    def write(self, chunk: pd.DataFrame, table=None):
+        """
+        Append a chunk of rows to the output.
+
+        :param chunk: Chunk of generated data.
+        :type chunk: pd.DataFrame
+        :param table: The chunk already converted with :func:`to_arrow`, converted here if needed and not given.
+        :type table: pyarrow.Table
+        """
+        start = time.perf_counter()
+        if self.uses_arrow:
+            self._write_table(to_arrow(chunk) if table is None else table)
+        else:
+            chunk = chunk.copy(deep=False)
+            chunk.index = pd.RangeIndex(self.first_index + self.rows, self.first_index + self.rows + len(chunk))
+            self._write(chunk)
+        self.rows += len(chunk)
+        self.elapsed += time.perf_counter() - start
+
+    def _write(self, chunk: pd.DataFrame):
+        raise NotImplementedError
+
+    def _write_table(self, table):
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Finish writing and release any open resources.
+        """
+
+    def bytes_written(self):
+        """
+        :return: Size of the output file, None if the output is not a file.
+        :rtype: int
+        """
+        try:
+            return os.path.getsize(self.path)
+        except (OSError, TypeError):
+            return None
+
+
+def log_throughput(sink: Sink):
+    """
+    Log the rows a sink wrote and its throughput.
+
+    :param sink: Closed sink.
+    :type sink: Sink
+    """
+    logger.info(
+        "Wrote %d rows to %s in %.2f s (%.0f rows/s)",
+        sink.rows,
+        sink.path,
+        sink.elapsed,
+        sink.rows / sink.elapsed if sink.elapsed else 0.0,
+    )
+
+
+class TextSink(Sink):
+    """
+    Base class for text formats, written to files that can be compressed and split into shards.
+
+    The output is compressed when ``compression`` is given, with its extension added to the path if missing,
+    or when the path ends with '.gz', '.zst' or '.lz4', see :class:`BlockCompressor`. With ``shard_rows`` set
+    the rows are split into files of that many rows, numbered after the path (``people.csv.gz`` ->
+    ``people_00000.csv.gz``, ``people_00001.csv.gz``, ...), every one a complete file on its own that
+    can be loaded in parallel with the others.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        reproducible: bool = False,
+        compression: str = None,
+        compression_level: int = None,
+        compression_threads: int = None,
+        shard_rows: int = None,
+    ):
+        """
+        :param path: Output file path.
+        :type path: str
+        :param reproducible: Leave out creation timestamps, text outputs have none.
+        :type reproducible: bool
+        :param compression: Compression format ('gzip', 'zstd' or 'lz4'), inferred from the path if not given.
+        :type compression: str
+        :param compression_level: Compression level, defaults to the usual default of the format.
+        :type compression_level: int
+        :param compression_threads: Number of compressing threads, defaults to the number of CPUs.
+        :type compression_threads: int
+        :param shard_rows: Rows per file, all rows go to one file if not given.
+        :type shard_rows: int
+        """
+        extensions = {name: extension for extension, name in COMPRESSION_EXTENSIONS.items()}
+        if compression is not None:
+            if compression not in extensions:
+                raise ValueError(f"Unknown compression: {compression}, use {', '.join(extensions)}")
+            if not path.lower().endswith(extensions[compression]):
+                path += extensions[compression]
+        else:
+            compression = COMPRESSION_EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        super().__init__(path, reproducible)
+        self.compression = compression
+        self.compress = None if compression is None else block_compressor(compression, compression_level)
+        self.compression_threads = compression_threads
+        self.shard_rows = shard_rows if shard_rows and shard_rows > 0 else None
+        self.paths = []
+        self.file = None
+        self.file_rows = 0
+
+    def shard_path(self, number: int) -> str:
+        """
+        :param number: Number of the shard, starting at 0.
+        :type number: int
+        :return: Output path of the shard.
+        :rtype: str
+        """
+        if self.shard_rows is None:
+            return self.path
+        root, extension = split_extension(self.path)
+        return f"{root}_{number:05d}{extension}"
+
+    def _open(self, path: str):
+        if self.compress is None:
+            return open(path, "w", encoding="utf-8", newline="")
+        return io.TextIOWrapper(
+            BlockCompressor(path, self.compress, self.compression_threads), encoding="utf-8", newline=""
+        )
+
+    def _write(self, chunk: pd.DataFrame):
+        start = 0
+        while start < len(chunk):
+            if self.file is None:
+                self.paths.append(self.shard_path(len(self.paths)))
+                self.file = self._open(self.paths[-1])
+                self.file_rows = 0
+                self._begin()
+            count = len(chunk) - start
+            if self.shard_rows is not None:
+                count = min(count, self.shard_rows - self.file_rows)
+            self._write_text(chunk.iloc[start : start + count], self.file_rows == 0)
+            self.file_rows += count
+            start += count
+            if self.shard_rows is not None and self.file_rows >= self.shard_rows:
+                self._close_file()
+
+    def _begin(self):
+        """
+        Write what precedes the rows of every file.
+        """
+
+    def _write_text(self, chunk: pd.DataFrame, first: bool):
+        """
+        Write rows to the current file.
+
+        :param chunk: Rows to write.
+        :type chunk: pd.DataFrame
+        :param first: Whether these are the first rows of the file.
+        :type first: bool
+        """
+        raise NotImplementedError
+
+    def _end(self):
+        """
+        Write what follows the rows of every file.
+        """
+
+    def _close_file(self):
+        try:
+            self._end()
+        finally:
+            self.file.close()
+            self.file = None
+
+    def close(self):
+        start = time.perf_counter()
+        if self.file is not None:
+            self._close_file()
+        self.elapsed += time.perf_counter() - start
+
+    def bytes_written(self):
+        sizes = [os.path.getsize(path) for path in self.paths if os.path.exists(path)]
+        return sum(sizes) if sizes else None
+
+
+@register_sink("csv")
+class CsvSink(TextSink):
+    """
+    Writes chunks to a CSV file with a running index, every shard with its own header.
+
+    With ``append`` set rows are added to an existing uncompressed file, continuing its index, after checking
+    that the file has the same columns.
+    """
+
+    def __init__(self, path: str, reproducible: bool = False, append: bool = False, **options):
+        super().__init__(path, reproducible, **options)
+        self.append = append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        if self.append:
+            if self.compression is not None or self.shard_rows is not None:
+                raise ValueError("Appending is only supported for uncompressed csv outputs without shards")
+            self.first_index = self.last_index() + 1
+
+    def header(self) -> list:
+        """
+        :return: Column names of the existing file, the first one being the (unnamed) index.
+        :rtype: list[str]
+        """
+        with open(self.path, newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), [])
+
+    def last_index(self) -> int:
+        """
+        Index of the last row of the existing file, read from its end without scanning the whole file.
+
+        :return: Index of the last row, -1 if the file has no rows.
+        :rtype: int
+        """
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - (1 << 16)))
+            lines = f.read().splitlines()
+        if size <= 1 << 16 and len(lines) < 2:
+            return -1
+        last = lines[-1].split(b",", 1)[0]
+        if not last.isdigit():
+            raise ValueError(f"Cannot append to {self.path}: the index of its last row is not a number")
+        return int(last)
+
+    def _open(self, path: str):
+        if self.append:
+            header = self.header()
+            if header[1:] != self.columns:
+                raise ValueError(f"Cannot append to {self.path}: it has columns {', '.join(header[1:])}")
+            return open(path, "a", encoding="utf-8", newline="")
+        return super()._open(path)
+
+    def _write(self, chunk: pd.DataFrame):
+        self.columns = [str(column) for column in chunk.columns]
+        super()._write(chunk)
+
+    def _write_text(self, chunk: pd.DataFrame, first: bool):
+        chunk.to_csv(self.file, header=first and not self.append)
+
+
+@register_sink("json")
+class JsonSink(TextSink):
+    """
+    Writes chunks as JSON lines, one object per row.
+    """
+
+    def _write_text(self, chunk: pd.DataFrame, first: bool):
+        chunk.to_json(self.file, orient="records", lines=True)
+
+
+@register_sink("parquet")
+class ParquetSink(Sink):
+    """
+    Writes every chunk as a separate Parquet row group, categorical columns dictionary-encoded.
+
+    Parquet files can not be extended in place, with ``append`` set the row groups of an existing file are
+    streamed one by one into a new file that the chunks are added to. It replaces the existing file when the
+    sink is closed.
+    """
+
+    uses_arrow = True
+
+    def __init__(self, path: str, reproducible: bool = False, append: bool = False):
+        super().__init__(path, reproducible)
+        self.writer = None
+        self.append = append and os.path.exists(path)
+        self.target = f"{path}.partial" if self.append else path
+
+    def _copy_existing(self, table):
+        import pyarrow.parquet as pq
+
+        existing = pq.ParquetFile(self.path)
+        if existing.schema_arrow.names != table.schema.names:
+            raise ValueError(f"Cannot append to {self.path}: it has columns {', '.join(existing.schema_arrow.names)}")
+        self.writer = pq.ParquetWriter(self.target, existing.schema_arrow)
+        for idx in range(existing.num_row_groups):
+            self.writer.write_table(existing.read_row_group(idx))
+
+    def _write_table(self, table):
+        import pyarrow.parquet as pq
+
+        try:
+            if self.writer is None and self.append:
+                self._copy_existing(table)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.target, table.schema)
+            elif not table.schema.equals(self.writer.schema):
+                table = table.cast(self.writer.schema)
+            self.writer.write_table(table)
+        except BaseException:
+            if self.append:
+                # keep the existing file as it was
+                self._discard()
+            raise
+
+    def _discard(self):
+        """
+        Close the writer of an append and remove its partial file.
+        """
+        writer, self.writer = self.writer, None
+        try:
+            if writer is not None:
+                writer.close()
+        finally:
+            if os.path.exists(self.target):
+                os.remove(self.target)
+
+    def close(self):
+        if self.writer is None:
+            return
+        try:
+            self.writer.close()
+            if self.target != self.path:
+                os.replace(self.target, self.path)
+        except BaseException:
+            if self.append and os.path.exists(self.target):
+                os.remove(self.target)
+            raise
+        finally:
+            self.writer = None
+
+
+@register_sink("hdf5")
+class Hdf5Sink(Sink):
+    """
+    Appends chunks to a table-format HDF5 store under the 'df' key.
+
+    Categorical columns are stored as plain strings, appending PyTables categoricals with the full
+    reference vocabularies is an order of magnitude slower without making the file smaller. Reproducible
+    stores are written without a PyTables index, as the index records its creation time.
+    """
+
+    min_itemsize = 64
+
+    def __init__(self, path: str, reproducible: bool = False):
+        super().__init__(path, reproducible)
+        try:
+            import tables  # noqa: F401
+        except ImportError:
+            raise ValueError("HDF5 output needs the tables package, install it with the hdf5 extra")
+        self.store = pd.HDFStore(path, mode="w")
+
+    def _write(self, chunk: pd.DataFrame):
+        chunk = decode_categoricals(chunk)
+        # PyTables has no nullable integers, missing values become NaN
+        nullable = [
+            column
+            for column, dtype in chunk.dtypes.items()
+            if isinstance(dtype, pd.api.extensions.ExtensionDtype) and pd.api.types.is_integer_dtype(dtype)
+        ]
+        if nullable:
+            chunk = chunk.astype({column: np.float64 for column in nullable})
+        self.store.put(
+            "df",
+            chunk,
+            format="table",
+            append=True,
+            index=not self.reproducible,
+            min_itemsize={"values": self.min_itemsize},
+            track_times=not self.reproducible,
+        )
+
+    def close(self):
+        self.store.close()
+
+
+_engines = {}
+
+
+def get_engine(url: str):
+    """
+    Shared SQLAlchemy engine for a database URL, created on first use so connection pools are reused by
+    every sink writing to the same database.
+
+    :param url: Database URL, a plain file path is treated as an SQLite database file.
+    :type url: str
+    :return: SQLAlchemy engine.
+    :rtype: sqlalchemy.engine.Engine
+    """
+    if "://" not in url:
+        url = f"sqlite:///{url}"
+    engine = _engines.get(url)
+    if engine is None:
+        engine = _engines[url] = create_engine(url)
+    return engine
+
+
+@register_sink("sql")
+class SqlSink(Sink):
+    """
+    Bulk loads chunks into a typed table ('people' by default), one transaction per chunk.
+
+    The schema is created from the first chunk, with a primary key on the PESEL number unless another
+    primary key is given. Categorical columns are normalised into lookup tables with 'id' and 'value'
+    columns, named after the column (e.g. 'last_name'), and the table stores foreign keys to them in
+    '<lookup table>_id' columns. Only the values that occur in the data are written to the lookup tables.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        reproducible: bool = False,
+        if_exists: str = "replace",
+        batch_size: int = 10000,
+        method: str = "executemany",
+        indexes: list = None,
+        table_name: str = "people",
+        primary_key: str = "Pesel Number",
+        foreign_keys: dict = None,
+        metadata: MetaData = None,
+    ):
+        """
+        :param path: Database URL or SQLite file path.
+        :type path: str
+        :param reproducible: Unused, SQL output has no timestamps.
+        :type reproducible: bool
+        :param if_exists: 'replace' to recreate the tables, 'append' to add rows to existing tables.
+        :type if_exists: str
+        :param batch_size: Number of rows sent to the database per statement.
+        :type batch_size: int
+        :param method: 'executemany' to bind the rows of a batch to one statement, 'multi' to send a single
+            multi-row INSERT per batch.
+        :type method: str
+        :param indexes: Output columns to index once all rows are loaded.
+        :type indexes: list[str]
+        :param table_name: Name of the table.
+        :type table_name: str
+        :param primary_key: Primary key column.
+        :type primary_key: str
+        :param foreign_keys: Dictionary mapping columns to the 'table.column' they reference.
+        :type foreign_keys: dict[str, str]
+        :param metadata: Metadata the tables are defined in, shared by sinks of tables referencing each other.
+        :type metadata: MetaData
+        """
+        super().__init__(path, reproducible)
+        if if_exists not in ("replace", "append"):
+            raise ValueError(f"Unknown if_exists mode: {if_exists}")
+        if method not in ("executemany", "multi"):
+            raise ValueError(f"Unknown insert method: {method}")
+        self.engine = get_engine(path)
+        self.if_exists = if_exists
+        self.batch_size = max(1, batch_size)
+        self.method = method
+        self.indexes = indexes or []
+        self.table_name = table_name
+        self.primary_key = primary_key
+        self.foreign_keys = foreign_keys or {}
+        self.metadata = MetaData() if metadata is None else metadata
+        self.table = None
+        self.lookups = {}
+        self.elapsed = 0.0
+
+    @staticmethod
+    def lookup_table(column: str) -> str:
+        """
+        :param column: Name of a categorical column.
+        :type column: str
+        :return: Name of the lookup table of the column.
+        :rtype: str
+        """
+        return str(column).lower().replace(" ", "_")
+
+    @staticmethod
+    def column_type(values: pd.Series):
+        """
+        SQL type of an output column.
+        """
+        dtype = values.dtype
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return Date()
+        if pd.api.types.is_bool_dtype(dtype):
+            return Boolean()
+        if pd.api.types.is_integer_dtype(dtype):
+            return BigInteger()
+        if pd.api.types.is_float_dtype(dtype):
+            return Float()
+        return Text()
+
+    @staticmethod
+    def python_values(values: pd.Series) -> list:
+        """
+        Column values as Python objects accepted by every DBAPI driver, missing values as None.
+        """
+        if pd.api.types.is_datetime64_any_dtype(values.dtype):
+            return values.to_numpy().astype("datetime64[D]").astype(object).tolist()
+        if isinstance(values.dtype, pd.api.extensions.ExtensionDtype) or values.dtype == object:
+            return values.astype(object).where(values.notna(), None).tolist()
+        result = values.to_numpy().tolist()
+        if pd.api.types.is_float_dtype(values.dtype) and values.isna().any():
+            result = [None if value != value else value for value in result]
+        return result
+
+    def _create_tables(self, chunk: pd.DataFrame, connection):
+        columns = []
+        for column, values in chunk.items():
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                table = self.lookup_table(column)
+                lookup = Table(
+                    table,
+                    self.metadata,
+                    Column("id", Integer, primary_key=True, autoincrement=False),
+                    Column("value", Text, nullable=False),
+                )
+                self.lookups[column] = {"table": lookup, "ids": {}, "categories": None, "known": None}
+                columns.append(Column(f"{table}_id", Integer, ForeignKey(f"{table}.id")))
+            else:
+                references = [ForeignKey(self.foreign_keys[column])] if column in self.foreign_keys else []
+                columns.append(
+                    Column(
+                        str(column),
+                        String(11) if column == "Pesel Number" else self.column_type(values),
+                        *references,
+                        primary_key=column == self.primary_key,
+                        autoincrement=False,
+                    )
+                )
+        self.table = Table(self.table_name, self.metadata, *columns)
+        tables = [lookup["table"] for lookup in self.lookups.values()] + [self.table]
+        if self.if_exists == "replace":
+            self.metadata.drop_all(connection, tables=tables)
+        self.metadata.create_all(connection, tables=tables)
+        if self.if_exists == "append":
+            for lookup in self.lookups.values():
+                existing = connection.execute(select(lookup["table"].c.id, lookup["table"].c.value))
+                lookup["ids"].update((value, id_) for id_, value in existing)
+
+    def _insert(self, table: Table, columns: dict, connection):
+        names = list(columns)
+        rows = [dict(zip(names, row)) for row in zip(*columns.values())]
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start : start + self.batch_size]
+            if self.method == "multi":
+                connection.execute(table.insert().values(batch))
+            else:
+                connection.execute(table.insert(), batch)
+
+    def _lookup_ids(self, column: str, values: pd.Categorical, connection) -> np.ndarray:
+        """
+        Lookup table ids of the categories of a chunk column, inserting the values seen for the first time.
+        """
+        lookup = self.lookups[column]
+        if lookup["categories"] is None or not lookup["categories"].equals(values.categories):
+            lookup["categories"] = values.categories
+            lookup["known"] = np.array(
+                [lookup["ids"].get(value, -1) for value in values.categories], dtype=np.int64
+            )
+        known = lookup["known"]
+        used = np.unique(values.codes[values.codes >= 0])
+        new = used[known[used] < 0]
+        if len(new):
+            first_id = max(lookup["ids"].values(), default=0) + 1
+            known[new] = np.arange(first_id, first_id + len(new))
+            new_values = values.categories.to_numpy()[new].tolist()
+            lookup["ids"].update(zip(new_values, known[new].tolist()))
+            self._insert(lookup["table"], {"id": known[new].tolist(), "value": new_values}, connection)
+        return known
+
+    def _write(self, chunk: pd.DataFrame):
+        with self.engine.begin() as connection:
+            if self.table is None:
+                self._create_tables(chunk, connection)
+            columns = {}
+            for column, values in chunk.items():
+                if isinstance(values.dtype, pd.CategoricalDtype):
+                    codes = values.cat.codes.to_numpy()
+                    ids = np.append(self._lookup_ids(column, values.array, connection), 0)[codes]
+                    if (codes < 0).any():
+                        ids = ids.astype(object)
+                        ids[codes < 0] = None
+                    columns[f"{self.lookup_table(column)}_id"] = ids.tolist()
+                else:
+                    columns[str(column)] = self.python_values(values)
+            self._insert(self.table, columns, connection)
+
+    def close(self):
+        if self.table is None:
+            return
+        start = time.perf_counter()
+        with self.engine.begin() as connection:
+            for column in self.indexes:
+                name = f"{self.lookup_table(column)}_id" if column in self.lookups else str(column)
+                if name not in self.table.c:
+                    logger.warning("Cannot index unknown SQL column: %s", column)
+                    continue
+                Index(f"ix_{self.table_name}_{self.lookup_table(name)}", self.table.c[name]).create(
+                    connection, checkfirst=True
+                )
+        self.elapsed += time.perf_counter() - start
+        logger.info(
+            "Loaded %d rows into %s in %.2f s (%.0f rows/s)",
+            self.rows,
+            self.table_name,
+            self.elapsed,
+            self.rows / self.elapsed if self.elapsed else 0.0,
+        )
+
+
+class BufferedSink(Sink):
+    """
+    Base class for formats that can only be written from a complete DataFrame.
+
+    Chunks are collected in memory and written by :meth:`_save` when the sink is closed. With ``categorical``
+    unset, categorical columns are converted to plain strings first.
+    """
+
+    categorical = True
+
+    def __init__(self, path: str, reproducible: bool = False):
+        super().__init__(path, reproducible)
+        self.chunks = []
+
+    def _write(self, chunk: pd.DataFrame):
+        self.chunks.append(chunk)
+
+    def close(self):
+        if not self.chunks:
+            return
+        start = time.perf_counter()
+        result_df = concat_chunks(self.chunks)
+        self.chunks = []
+        result_df = trim_categoricals(result_df) if self.categorical else decode_categoricals(result_df)
+        self._save(result_df)
+        self.elapsed += time.perf_counter() - start
+
+    def _save(self, result_df: pd.DataFrame):
+        raise NotImplementedError
+
+
+def xml_tag(name) -> str:
+    """
+    Turn a column name into a valid XML element name, e.g. 'Pesel Number' -> 'Pesel_Number'.
+
+    :param name: Column name.
+    :return: The name with characters not allowed in element names replaced by '_', prefixed with '_' if it
+        does not start with a letter or '_'.
+    :rtype: str
+    """
+    tag = XML_INVALID_TAG_CHARS.sub("_", str(name))
+    return tag if XML_TAG_START.match(tag) else f"_{tag}"
+
+
+def _xml_text(values: pd.Series) -> pd.Series:
+    """
+    Format non missing values as XML text, like ``DataFrame.to_xml``.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        return values.dt.strftime("%Y-%m-%d %H:%M:%S")
+    text = values.astype(str)
+    if values.dtype == object or isinstance(values.dtype, pd.CategoricalDtype):
+        text = text.str.replace("&", "&amp;").str.replace("<", "&lt;").str.replace(">", "&gt;")
+    return text
+
+
+@register_sink("xml")
+class XmlSink(TextSink):
+    """
+    Streams chunks into an XML document with one element per row, in the layout of ``DataFrame.to_xml``.
+
+    Every chunk is formatted with array operations and written in blocks of rows, the document is never built
+    in memory. Every shard is a complete document. Column names are turned into element names with
+    :func:`xml_tag`, missing values become empty elements.
+    """
+
+    def __init__(
+        self, path: str, reproducible: bool = False, root_name: str = "data", row_name: str = "row", **options
+    ):
+        """
+        :param path: Output file path.
+        :type path: str
+        :param reproducible: Unused, XML outputs have no timestamps.
+        :type reproducible: bool
+        :param root_name: Name of the root element.
+        :type root_name: str
+        :param row_name: Name of the element of every row.
+        :type row_name: str
+        :param options: Compression and sharding options, see :class:`TextSink`.
+        """
+        super().__init__(path, reproducible, **options)
+        self.root_name = xml_tag(root_name)
+        self.row_name = xml_tag(row_name)
+
+    def _begin(self):
+        self.file.write(f'<?xml version="1.0" encoding="utf-8"?>\n<{self.root_name}>\n')
+
+    def _elements(self, values: pd.Series) -> np.ndarray:
+        tag = xml_tag(values.name)
+        empty = f"    <{tag}/>\n"
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # format every category once, code -1 of missing values picks the empty element
+            categories = pd.Series(values.cat.categories)
+            elements = (f"    <{tag}>" + _xml_text(categories) + f"</{tag}>\n").to_numpy(dtype=object)
+            return np.append(elements, empty)[values.cat.codes.to_numpy()]
+        missing = values.isna().to_numpy()
+        elements = (f"    <{tag}>" + _xml_text(values) + f"</{tag}>\n").to_numpy(dtype=object)
+        elements[missing] = empty
+        return elements
+
+    def _write_text(self, chunk: pd.DataFrame, first: bool):
+        parts = np.empty((len(chunk), len(chunk.columns) + 2), dtype=object)
+        parts[:, 0] = f"  <{self.row_name}>\n"
+        for idx, column in enumerate(chunk.columns):
+            parts[:, idx + 1] = self._elements(chunk[column])
+        parts[:, -1] = f"  </{self.row_name}>\n"
+        for start in range(0, len(parts), XML_BLOCK_ROWS):
+            self.file.write("".join(parts[start : start + XML_BLOCK_ROWS].ravel().tolist()))
+
+    def _end(self):
+        self.file.write(f"</{self.root_name}>\n")
+
+    def close(self):
+        super().close()
+        log_throughput(self)
+
+
+class FixedTimeZipFile(zipfile.ZipFile):
+    """
+    Zip archive giving every entry :data:`EXCEL_FIXED_TIME` instead of the time it was written or the modification
+    time of its file, used by :class:`ExcelSink` to save reproducible workbooks.
+    """
+
+    def _info(self, name: str) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(name, date_time=EXCEL_FIXED_TIME.timetuple()[:6])
+        info.compress_type = self.compression
+        info.external_attr = 0o600 << 16
+        return info
+
+    def writestr(self, zinfo_or_arcname, data, compress_type=None, compresslevel=None):
+        if not isinstance(zinfo_or_arcname, zipfile.ZipInfo):
+            zinfo_or_arcname = self._info(zinfo_or_arcname)
+        super().writestr(zinfo_or_arcname, data, compress_type, compresslevel)
+
+    def write(self, filename, arcname=None, compress_type=None, compresslevel=None):
+        # openpyxl writes the rows of write-only sheets to temporary files, they are copied without being read at once
+        force_zip64 = os.path.getsize(filename) * 1.05 > zipfile.ZIP64_LIMIT
+        info = self._info(arcname or filename)
+        with open(filename, "rb") as source, self.open(info, "w", force_zip64=force_zip64) as target:
+            shutil.copyfileobj(source, target, COMPRESSION_BLOCK_SIZE)
+
+
+@register_sink("excel")
+class ExcelSink(Sink):
+    """
+    Streams chunks into xlsx workbooks written with openpyxl in write-only mode, which keeps only the current
+    row in memory instead of the whole workbook.
+
+    A sheet holds at most ``max_rows`` rows including its header, by default the 1,048,576 rows Excel can
+    open. Further rows go to new sheets ('Sheet2', 'Sheet3', ...) and, once a workbook has ``max_sheets``
+    sheets, to new workbooks named after the output path (``people.xlsx`` -> ``people_2.xlsx``, ...).
+    """
+
+    def __init__(
+        self, path: str, reproducible: bool = False, max_rows: int = EXCEL_MAX_ROWS, max_sheets: int = None
+    ):
+        """
+        :param path: Output file path of the first workbook.
+        :type path: str
+        :param reproducible: Give the workbooks and their zip entries :data:`EXCEL_FIXED_TIME` as creation and
+            modification time instead of the time they were saved.
+        :type reproducible: bool
+        :param max_rows: Rows per sheet including the header, at most 1,048,576.
+        :type max_rows: int
+        :param max_sheets: Sheets per workbook, unlimited if not given.
+        :type max_sheets: int
+        """
+        super().__init__(path, reproducible)
+        self.max_rows = min(max(2, int(max_rows)), EXCEL_MAX_ROWS)
+        self.max_sheets = max_sheets
+        self.paths = []
+        self.workbook = None
+        self.sheet = None
+        self.sheet_rows = 0
+
+    def workbook_path(self, number: int) -> str:
+        """
+        :param number: Number of the workbook, starting at 1.
+        :type number: int
+        :return: Output path of the workbook.
+        :rtype: str
+        """
+        if number == 1:
+            return self.path
+        root, extension = os.path.splitext(self.path)
+        return f"{root}_{number}{extension}"
+
+    def _save_workbook(self):
+        if self.workbook is None:
+            return
+        if self.reproducible:
+            from openpyxl.writer.excel import ExcelWriter
+
+            # Workbook.save stamps the current time as modification time, so the writer is called directly
+            self.workbook.properties.created = self.workbook.properties.modified = EXCEL_FIXED_TIME
+            archive = FixedTimeZipFile(self.paths[-1], "w", zipfile.ZIP_DEFLATED, allowZip64=True)
+            ExcelWriter(self.workbook, archive).save()
+        else:
+            self.workbook.save(self.paths[-1])
+        self.workbook = None
+
+    def _add_sheet(self, columns: list):
+        from openpyxl import Workbook
+
+        if self.workbook is not None and self.max_sheets and len(self.workbook.worksheets) >= self.max_sheets:
+            self._save_workbook()
+        if self.workbook is None:
+            self.workbook = Workbook(write_only=True)
+            self.paths.append(self.workbook_path(len(self.paths) + 1))
+        self.sheet = self.workbook.create_sheet(f"Sheet{len(self.workbook.worksheets) + 1}")
+        self.sheet.append(columns)
+        self.sheet_rows = 1
+
+    @staticmethod
+    def _cells(values: pd.Series) -> list:
+        # numpy scalars become Python numbers, dates Timestamps that openpyxl writes as datetimes
+        return np.where(values.isna().to_numpy(), None, values.to_numpy(dtype=object)).tolist()
+
+    def _write(self, chunk: pd.DataFrame):
+        columns = [str(column) for column in chunk.columns]
+        rows = zip(*(self._cells(chunk[column]) for column in chunk.columns))
+        remaining = len(chunk)
+        while remaining:
+            if self.sheet is None or self.sheet_rows >= self.max_rows:
+                self._add_sheet(columns)
+            count = min(remaining, self.max_rows - self.sheet_rows)
+            for row in itertools.islice(rows, count):
+                self.sheet.append(row)
+            self.sheet_rows += count
+            remaining -= count
+
+    def close(self):
+        start = time.perf_counter()
+        self._save_workbook()
+        self.elapsed += time.perf_counter() - start
+        log_throughput(self)
+
+    def bytes_written(self):
+        sizes = [os.path.getsize(path) for path in self.paths if os.path.exists(path)]
+        return sum(sizes) if sizes else None
+
+
+@register_sink("html")
+class HtmlSink(BufferedSink):
+    categorical = False
+
+    def _save(self, result_df: pd.DataFrame):
+        result_df.to_html(self.path, index=False)
+
+
+@register_sink("stata")
+class StataSink(BufferedSink):
+    categorical = False
+
+    def _save(self, result_df: pd.DataFrame):
+        result_df.to_stata(self.path, time_stamp=datetime(2000, 1, 1) if self.reproducible else None)
+
+
+@register_sink("pickle")
+class PickleSink(BufferedSink):
+    def _save(self, result_df: pd.DataFrame):
+        result_df.to_pickle(self.path)
+
+
+@register_sink("feather")
+class FeatherSink(Sink):
+    """
+    Collects the Arrow tables of all chunks and writes them as one Feather file when closed.
+    """
+
+    uses_arrow = True
+
+    def __init__(self, path: str, reproducible: bool = False):
+        super().__init__(path, reproducible)
+        self.tables = []
+
+    def _write_table(self, table):
+        self.tables.append(table)
+
+    def close(self):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        if not self.tables:
+            return
+        start = time.perf_counter()
+        table = pa.concat_tables(self.tables, promote_options="default").unify_dictionaries()
+        self.tables = []
+        feather.write_feather(table, self.path)
+        self.elapsed += time.perf_counter() - start
+
+
+class TableSetSink(Sink):
+    """
+    Writes the tables of a relational sample with one sink of the same format per table.
+
+    File outputs get one file per table, named after the output path and the table (``people.csv`` ->
+    ``people_cities.csv``). SQL outputs write every table to the same database, with the primary and
+    foreign keys of the schema, and existing tables of the schema are dropped in dependency order first
+    when replacing. Tables are created in the order their first chunk arrives, so referenced tables must
+    come first.
+    """
+
+    def __init__(self, output_type: str, path: str, reproducible: bool = False, schema: dict = None, **options):
+        """
+        :param output_type: Output format name, see :data:`SINKS`.
+        :type output_type: str
+        :param path: Output file path or database URL.
+        :type path: str
+        :param reproducible: Leave out creation timestamps from the outputs.
+        :type reproducible: bool
+        :param schema: Dictionary mapping table names to their 'primary_key' and 'foreign_keys' (mapping
+            columns to the 'table.column' they reference).
+        :type schema: dict[str, dict]
+        :param options: Extra keyword arguments of the sink class of every table.
+        """
+        super().__init__(path, reproducible)
+        output_type = output_type.lower()
+        if output_type not in SINKS:
+            raise ValueError(f"Unknown output type: {output_type}")
+        self.sink_class = SINKS[output_type]
+        self.uses_arrow = self.sink_class.uses_arrow
+        self.schema = schema or {}
+        self.options = options
+        self.sinks = {}
+        if issubclass(self.sink_class, SqlSink):
+            self.options["metadata"] = MetaData()
+            if options.get("if_exists", "replace") == "replace":
+                self._drop_tables()
+
+    def _drop_tables(self):
+        engine = get_engine(self.path)
+        existing = [table for table in self.schema if table in inspect(engine).get_table_names()]
+        if existing:
+            metadata = MetaData()
+            metadata.reflect(engine, only=existing)
+            metadata.drop_all(engine)
+
+    def table_path(self, name: str) -> str:
+        """
+        :param name: Table name.
+        :type name: str
+        :return: Output path of the table.
+        :rtype: str
+        """
+        if issubclass(self.sink_class, SqlSink):
+            return self.path
+        root, extension = split_extension(self.path)
+        return f"{root}_{name}{extension}"
+
+    def write_table(self, name: str, chunk: pd.DataFrame, table=None):
+        """
+        Append a chunk of rows to one table of the output.
+
+        :param name: Table name.
+        :type name: str
+        :param chunk: Chunk of the table.
+        :type chunk: pd.DataFrame
+        :param table: The chunk already converted with :func:`to_arrow`.
+        :type table: pyarrow.Table
+        """
+        start = time.perf_counter()
+        sink = self.sinks.get(name)
+        if sink is None:
+            options = dict(self.options)
+            if issubclass(self.sink_class, SqlSink):
+                keys = self.schema.get(name, {})
+                options.update(
+                    table_name=name, primary_key=keys.get("primary_key"), foreign_keys=keys.get("foreign_keys")
+                )
+            sink = self.sinks[name] = self.sink_class(self.table_path(name), self.reproducible, **options)
+        sink.write(chunk, table)
+        self.rows += len(chunk)
+        self.elapsed += time.perf_counter() - start
+
+    def close(self):
+        start = time.perf_counter()
+        for sink in self.sinks.values():
+            sink.close()
+        self.elapsed += time.perf_counter() - start
+
+    def bytes_written(self):
+        if issubclass(self.sink_class, SqlSink):
+            return None
+        sizes = [sink.bytes_written() for sink in self.sinks.values()]
+        return sum(size for size in sizes if size is not None) if sizes else None
+
+    def table_rows(self) -> dict:
+        """
+        :return: Dictionary mapping table names to the number of rows written.
+        :rtype: dict[str, int]
+        """
+        return {name: sink.rows for name, sink in self.sinks.items()}
+
+
+def create_sink(output_type: str, path: str, reproducible: bool = False, **options) -> Sink:
+    """
+    Create a sink for the given output type.
+
+    :param output_type: Output format name (e.g. 'csv', 'parquet', 'sql'), see :data:`SINKS`.
+    :type output_type: str
+    :param path: Output file path or database URL.
+    :type path: str
+    :param reproducible: Leave out creation timestamps from the output.
+    :type reproducible: bool
+    :param options: Extra keyword arguments of the sink class (e.g. ``batch_size`` of :class:`SqlSink`).
+    :raises ValueError: If the output type or one of the options is not supported.
+    :return: Sink instance.
+    :rtype: Sink
+    """
+    output_type = output_type.lower()
+    if output_type not in SINKS:
+        raise ValueError(f"Unknown output type: {output_type}")
+    return SINKS[output_type](path, reproducible, **options)
+
+
+def scan_column(output_type: str, path: str, column: str, table_name: str = "people"):
+    """
+    Read one column of an existing output batch by batch, without loading the other columns. Categorical
+    columns of SQL outputs, stored in lookup tables, can not be read.
+
+    :param output_type: Output format, 'csv', 'parquet' or 'sql'.
+    :type output_type: str
+    :param path: Output file path or database URL.
+    :type path: str
+    :param column: Column name.
+    :type column: str
+    :param table_name: Table the column belongs to, for SQL outputs.
+    :type table_name: str
+    :raises ValueError: If the output format can not be scanned or the output has no such column.
+    :return: Generator yielding arrays of at most :data:`SCAN_BATCH_SIZE` values, nothing if the output
+        does not exist yet.
+    :rtype: Iterator[np.ndarray]
+    """
+    output_type = output_type.lower()
+    if output_type == "csv":
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        if column not in CsvSink(path).header():
+            raise ValueError(f"{path} has no '{column}' column")
+        for chunk in pd.read_csv(path, usecols=[column], dtype={column: str}, chunksize=SCAN_BATCH_SIZE):
+            yield chunk[column].to_numpy()
+    elif output_type == "parquet":
+        if not os.path.exists(path):
+            return
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path)
+        if column not in parquet_file.schema_arrow.names:
+            raise ValueError(f"{path} has no '{column}' column")
+        for batch in parquet_file.iter_batches(batch_size=SCAN_BATCH_SIZE, columns=[column]):
+            yield batch.column(0).to_numpy(zero_copy_only=False)
+    elif output_type == "sql":
+        engine = get_engine(path)
+        if not inspect(engine).has_table(table_name):
+            return
+        table = Table(table_name, MetaData(), autoload_with=engine)
+        if column not in table.c:
+            raise ValueError(f"{path} has no '{column}' column in table {table_name}")
+        with engine.connect() as connection:
+            result = connection.execution_options(stream_results=True).execute(select(table.c[column]))
+            for rows in result.partitions(SCAN_BATCH_SIZE):
+                yield np.array([row[0] for row in rows], dtype=object)
+    else:
+        raise ValueError(f"Existing {output_type} outputs can not be read, append supports {', '.join(APPEND_OPTIONS)}")
+
+
+def append_options(outputs: dict, options: dict = None) -> dict:
+    """
+    Sink options adding the generated rows to the existing outputs, see :data:`APPEND_OPTIONS`.
+
+    :param outputs: Dictionary mapping output formats to file paths.
+    :type outputs: dict
+    :param options: Dictionary mapping output formats to extra sink options.
+    :type options: dict
+    :raises ValueError: If an output format does not support appending, or the output is compressed or sharded.
+    :return: The options with the append options of every output added.
+    :rtype: dict
+    """
+    options = dict(options or {})
+    for output_type, path in outputs.items():
+        if output_type.lower() not in APPEND_OPTIONS:
+            raise ValueError(f"Appending to {output_type} outputs is not supported, use {', '.join(APPEND_OPTIONS)}")
+        output_options = options.get(output_type, {})
+        compressed = os.path.splitext(str(path))[1].lower() in COMPRESSION_EXTENSIONS
+        if compressed or output_options.get("compression") or output_options.get("shard_rows"):
+            raise ValueError(f"Appending to compressed or sharded {output_type} outputs is not supported")
+        options[output_type] = dict(options.get(output_type, {}), **APPEND_OPTIONS[output_type.lower()])
+    return options
+
+
+def text_options(outputs: dict, options: dict = None, **text_sink_options) -> dict:
+    """
+    Add the same options to every text output (csv, json, xml), e.g. the compression chosen on the command line.
+
+    :param outputs: Dictionary mapping output formats to file paths.
+    :type outputs: dict
+    :param options: Dictionary mapping output formats to extra sink options.
+    :type options: dict
+    :param text_sink_options: Options of :class:`TextSink`, those set to None are left out.
+    :return: The options with the given options added for every text output.
+    :rtype: dict
+    """
+    options = dict(options or {})
+    text_sink_options = {name: value for name, value in text_sink_options.items() if value is not None}
+    for output_type in outputs:
+        sink_class = SINKS.get(output_type.lower())
+        if text_sink_options and sink_class is not None and issubclass(sink_class, TextSink):
+            options[output_type] = dict(options.get(output_type, {}), **text_sink_options)
+    return options
+
+
+class _Chunk:
+    """
+    Chunk passed to the sink threads, converted to Arrow by the first Arrow based sink that needs it.
+    """
+
+    def __init__(self, name: str, data: pd.DataFrame):
+        self.name = name
+        self.data = data
+        self._table = None
+        self._lock = threading.Lock()
+
+    def table(self):
+        with self._lock:
+            if self._table is None:
+                self._table = to_arrow(self.data)
+            return self._table
+
+
+def _sink_consumer(output_type: str, sink: Sink, queue_size: int, progress=None) -> Consumer:
+    """
+    Thread writing the chunks queued for one sink and closing it after the last one.
+    """
+
+    def consume(chunk: _Chunk):
+        table = chunk.table() if sink.uses_arrow else None
+        try:
+            if chunk.name is None:
+                sink.write(chunk.data, table)
+            else:
+                sink.write_table(chunk.name, chunk.data, table)
+        except Exception as e:
+            logger.error("Error writing %s output: %s", output_type, e)
+            raise
+        if progress is not None:
+            progress(output_type, sink.rows)
+
+    def finish():
+        try:
+            sink.close()
+        except Exception as e:
+            logger.error("Error closing %s output: %s", output_type, e)
+            raise
+
+    return Consumer(f"sink-{output_type}", consume, finish, queue_size)
+
+
+def _write_all(items, sinks: dict, errors: dict, queue_size: int = QUEUE_SIZE, progress=None) -> dict:
+    """
+    Write (table name, chunk) pairs to every sink, see :func:`write_chunks` and :func:`write_tables`.
+    """
+    consumers = {}
+    for output_type, sink in sinks.items():
+        if progress is not None:
+            progress(output_type, 0)
+        consumers[output_type] = _sink_consumer(output_type, sink, queue_size, progress)
+    reports = {}
+    cancelled = None
+    try:
+        run_pipeline((_Chunk(name, chunk) for name, chunk in items), list(consumers.values()))
+    except (KeyboardInterrupt, Cancelled) as e:
+        cancelled = e
+    finally:
+        for output_type, consumer in consumers.items():
+            sink = sinks[output_type]
+            if consumer.failed:
+                errors[output_type] = consumer.error
+            reports[output_type] = {
+                "rows": sink.rows,
+                "seconds": sink.elapsed,
+                "blocked": consumer.blocked,
+                "bytes": sink.bytes_written(),
+                "error": errors.get(output_type),
+            }
+            if isinstance(sink, TableSetSink):
+                reports[output_type]["tables"] = sink.table_rows()
+            if output_type not in errors:
+                logger.info(
+                    "Saved %d rows as %s to %s in %.2f s (%s), generation waited %.2f s for it",
+                    sink.rows,
+                    output_type,
+                    sink.path,
+                    sink.elapsed,
+                    format_bytes(reports[output_type]["bytes"]),
+                    consumer.blocked,
+                )
+    for output_type, error in errors.items():
+        reports.setdefault(output_type, {"rows": 0, "seconds": 0.0, "blocked": 0.0, "bytes": None, "error": error})
+    if cancelled is not None:
+        logger.warning("Generation cancelled, the outputs were closed with the rows written so far")
+        raise Cancelled(str(cancelled) or "Cancelled", reports) from cancelled
+    return reports
+
+
+def write_chunks(
+    chunks,
+    outputs: dict,
+    reproducible: bool = False,
+    options: dict = None,
+    queue_size: int = QUEUE_SIZE,
+    progress=None,
+) -> dict:
+    """
+    Write a stream of chunks to every requested output.
+
+    Every sink writes on its own thread, fed through a bounded queue, so chunks are generated while the
+    previous ones are written and a fast output does not wait for a slow one. Generation only blocks when
+    the queue of an output is full, which bounds the chunks held in memory. The chunk is converted to Arrow
+    once for all Arrow based sinks (Parquet, Feather). A sink that fails is reported and closed, the other
+    outputs are still written. When generation is interrupted (``KeyboardInterrupt`` or :class:`Cancelled`)
+    the queued chunks are dropped and every sink is closed, leaving valid outputs with the chunks written
+    so far.
+
+    :param chunks: Iterable of DataFrames with the generated data.
+    :type chunks: Iterable[pd.DataFrame]
+    :param outputs: Dictionary mapping output formats to file paths.
+    :type outputs: dict
+    :param reproducible: Leave out creation timestamps from the outputs.
+    :type reproducible: bool
+    :param options: Dictionary mapping output formats to extra sink options, see :func:`create_sink`.
+    :type options: dict
+    :param queue_size: Number of chunks waiting for every output before generation blocks.
+    :type queue_size: int
+    :param progress: Called with the output format and the rows written to it after every chunk, on the
+        thread of the output.
+    :type progress: Callable[[str, int], None]
+    :raises Cancelled: If generation was interrupted, with the reports of the closed outputs.
+    :return: Dictionary mapping output formats to reports with the 'rows' written, the 'seconds' spent in
+        the sink, the seconds generation was 'blocked' on its full queue, the 'bytes' written (None if
+        unknown) and the 'error' if the output failed.
+    :rtype: dict[str, dict]
+    """
+    options = options or {}
+    sinks = {}
+    errors = {}
+    for output_type, file_path in outputs.items():
+        try:
+            sinks[output_type] = create_sink(output_type, file_path, reproducible, **options.get(output_type, {}))
+        except Exception as e:
+            logger.warning("Skipping %s output: %s", output_type, e)
+            errors[output_type] = e
+    return _write_all(((None, chunk) for chunk in chunks), sinks, errors, queue_size, progress)
+
+
+def write_tables(
+    tables,
+    outputs: dict,
+    schema: dict,
+    reproducible: bool = False,
+    options: dict = None,
+    queue_size: int = QUEUE_SIZE,
+    progress=None,
+) -> dict:
+    """
+    Write a stream of chunks of related tables to every requested output, see :class:`TableSetSink`.
+
+    :param tables: Iterable of (table name, DataFrame) pairs, the chunks of referenced tables first.
+    :type tables: Iterable[tuple[str, pd.DataFrame]]
+    :param outputs: Dictionary mapping output formats to file paths.
+    :type outputs: dict
+    :param schema: Primary and foreign keys of every table, see :class:`TableSetSink`.
+    :type schema: dict[str, dict]
+    :param reproducible: Leave out creation timestamps from the outputs.
+    :type reproducible: bool
+    :param options: Dictionary mapping output formats to extra sink options, see :func:`create_sink`.
+    :type options: dict
+    :param queue_size: Number of chunks waiting for every output before generation blocks.
+    :type queue_size: int
+    :param progress: Called with the output format and the rows written to it after every chunk, on the
+        thread of the output.
+    :type progress: Callable[[str, int], None]
+    :return: Reports as returned by :func:`write_chunks`, with the rows written per table in 'tables'.
+    :rtype: dict[str, dict]
+    """
+    options = options or {}
+    sinks = {}
+    errors = {}
+    for output_type, file_path in outputs.items():
+        try:
+            sinks[output_type] = TableSetSink(
+                output_type, file_path, reproducible, schema, **options.get(output_type, {})
+            )
+        except Exception as e:
+            logger.warning("Skipping %s output: %s", output_type, e)
+            errors[output_type] = e
+    return _write_all(tables, sinks, errors, queue_size, progress)
@@ -0,0 +1,239 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from generative_databases.generators import data_importer
+from generative_databases.generators.generator import (
+    DEFAULT_PARAMS,
+    NAME_DATA_COLUMNS,
+    Generator,
+    required_datasets,
+    validate_columns,
+)
+from generative_databases.generators.instrumentation import Metrics
+from generative_databases.generators.parallel import ParallelGenerator
+from generative_databases.generators.pipeline import Cancelled
+from generative_databases.generators.relational import RelationalGenerator
+
+logger = logging.getLogger(__name__)
+
+JOB_KEYS = set(DEFAULT_PARAMS) | {
+    "name",
+    "sample_size",
+    "outputs",
+    "output_options",
+    "metrics_path",
+    "cache",
+}
+SOURCE_KEYS = ("city_data", "names_data", "last_names_data")
+
+
+def load_job_file(path: str) -> list:
+    """
+    Read the jobs of a TOML or YAML job file.
+
+    The file has an optional ``defaults`` table with parameters shared by every job and a ``jobs`` list,
+    every job having at least a ``sample_size`` and ``outputs`` (a table mapping output formats to paths)::
+
+        [defaults]
+        seed = 1
+        year_range = [1950, 2000]
+
+        [[jobs]]
+        name = "small"
+        sample_size = 1000
+        outputs = {csv = "small.csv", parquet = "small.parquet"}
+
+    YAML files need PyYAML to be installed.
+
+    :param path: Path of a '.toml', '.yaml' or '.yml' file.
+    :type path: str
+    :raises ValueError: If the file type is not supported or a job is invalid.
+    :return: List of job parameter dictionaries, with the defaults applied.
+    :rtype: list[dict]
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".toml":
+        import tomllib
+
+        with open(path, "rb") as f:
+            content = tomllib.load(f)
+    elif extension in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML job files need PyYAML, install it or use a TOML job file")
+        with open(path, encoding="utf-8") as f:
+            content = yaml.safe_load(f) or {}
+    else:
+        raise ValueError(f"Unsupported job file type: {path}")
+
+    defaults = content.get("defaults", {})
+    jobs = content.get("jobs", [])
+    if not jobs:
+        raise ValueError(f"No jobs in {path}")
+    return [job_params(dict(defaults, **job), f"job {idx + 1}") for idx, job in enumerate(jobs)]
+
+
+def job_params(job: dict, name: str = "job") -> dict:
+    """
+    Complete and validate the parameters of one job.
+
+    :param job: Job parameters, generation parameters missing from it are taken from ``DEFAULT_PARAMS``.
+    :type job: dict
+    :param name: Job name used when the job has no 'name' entry.
+    :type name: str
+    :raises ValueError: If the job has unknown keys or columns, no sample size or no outputs.
+    :return: Generation parameters of the job.
+    :rtype: dict
+    """
+    unknown = set(job) - JOB_KEYS
+    if unknown:
+        raise ValueError(f"Unknown parameters in {job.get('name', name)}: {', '.join(sorted(unknown))}")
+    params_dict = dict(DEFAULT_PARAMS, name=name)
+    params_dict.update(job)
+    if not isinstance(params_dict.get("sample_size"), int) or params_dict["sample_size"] <= 0:
+        raise ValueError(f"{params_dict['name']} needs a positive sample_size")
+    if not params_dict.get("outputs"):
+        raise ValueError(f"{params_dict['name']} needs at least one output")
+    if len(params_dict["year_range"]) != 2:
+        raise ValueError(f"{params_dict['name']} year_range must be [first_year, last_year]")
+    params_dict["year_range"] = [int(year) for year in params_dict["year_range"]]
+    try:
+        validate_columns(params_dict)
+    except (OSError, ValueError) as e:
+        raise ValueError(f"{params_dict['name']}: {e}")
+    return params_dict
+
+
+def _output_results(reports: dict) -> dict:
+    """
+    Output reports of a job result, with the errors as messages.
+    """
+    return {
+        output_type: dict(report, error=None if report["error"] is None else str(report["error"]))
+        for output_type, report in reports.items()
+    }
+
+
+def run_job(
+    params_dict: dict, data_storage: data_importer.DataBank, cancel: threading.Event = None, listener=None
+) -> dict:
+    """
+    Generate and save the data of one job.
+
+    :param params_dict: Job parameters, see :func:`job_params`.
+    :type params_dict: dict
+    :param data_storage: Loaded reference data shared by the jobs.
+    :type data_storage: data_importer.DataBank
+    :param cancel: Event cancelling the job when set, the outputs keep the rows written until then.
+    :type cancel: threading.Event
+    :param listener: Called with the progress events of the job, see :meth:`Metrics.progress`, with the job
+        name added as 'job'.
+    :type listener: Callable[[dict], None]
+    :return: Dictionary with the job 'name', 'rows' requested, 'seconds' taken, per output 'outputs' reports,
+        whether it was 'cancelled' and the 'error' message if the job failed or was cancelled.
+    :rtype: dict
+    """
+    start = time.perf_counter()
+    name = params_dict["name"]
+    result = {"name": name, "rows": params_dict["sample_size"], "outputs": {}, "cancelled": False, "error": None}
+    listeners = [] if listener is None else [lambda event: listener(dict(event, job=name))]
+    metrics = Metrics(path=params_dict.get("metrics_path"), listeners=listeners)
+    try:
+        if cancel is not None and cancel.is_set():
+            raise Cancelled("Job cancelled before it started")
+        if params_dict.get("relational"):
+            generator = RelationalGenerator(params_dict, data_storage=data_storage, metrics=metrics, cancel=cancel)
+        elif params_dict.get("workers", 1) > 1:
+            generator = ParallelGenerator(
+                params_dict, workers=params_dict["workers"], data_storage=data_storage, metrics=metrics, cancel=cancel
+            )
+        else:
+            generator = Generator(params_dict, data_storage=data_storage, metrics=metrics, cancel=cancel)
+        reports = generator.generate_and_save(params_dict["outputs"], options=params_dict.get("output_options"))
+        result["outputs"] = _output_results(reports)
+        failed = [f"{output_type} ({report['error']})" for output_type, report in reports.items() if report["error"]]
+        if failed:
+            result["error"] = f"failed outputs: {', '.join(failed)}"
+    except Cancelled as e:
+        logger.warning(f"Job {name} cancelled")
+        result["outputs"] = _output_results(e.reports or {})
+        result["cancelled"] = True
+        result["error"] = "cancelled"
+    except Exception as e:
+        logger.error(f"Error in job {name}: {e}")
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def run_jobs(jobs: list, parallel: int = 1, listener=None, cancel: threading.Event = None) -> list:
+    """
+    Run several jobs in one process.
+
+    Jobs with the same data sources share one DataBank, loaded once before the first job starts. With
+    ``parallel`` above 1 the jobs run concurrently on a thread pool, otherwise one after another on the
+    calling thread.
+
+    On Ctrl-C (or once ``cancel`` is set) the running jobs stop with the rows written so far and the jobs not
+    started yet are skipped, all of them reported as cancelled.
+
+    :param jobs: Job parameters, see :func:`job_params`.
+    :type jobs: list[dict]
+    :param parallel: Number of jobs running at the same time.
+    :type parallel: int
+    :param listener: Called with the progress events of every job, see :func:`run_job`. With ``parallel``
+        above 1 it is called from several threads.
+    :type listener: Callable[[dict], None]
+    :param cancel: Event cancelling the jobs when set.
+    :type cancel: threading.Event
+    :return: Result of every job in the order of ``jobs``, see :func:`run_job`.
+    :rtype: list[dict]
+    """
+    if cancel is None:
+        cancel = threading.Event()
+    banks = {}
+    job_banks = []
+    for params_dict in jobs:
+        key = tuple(params_dict.get(source, " ") for source in SOURCE_KEYS) + (params_dict.get("cache", True),)
+        if key not in banks:
+            banks[key] = data_importer.DataBank(params_dict, columns=NAME_DATA_COLUMNS)
+        job_banks.append(banks[key])
+    # load everything up front, so concurrent jobs never race on the lazy loading
+    for params_dict, data_storage in zip(jobs, job_banks):
+        for dataset in required_datasets(params_dict):
+            getattr(data_storage, dataset)
+
+    if parallel <= 1:
+        results = []
+        for params_dict, data_storage in zip(jobs, job_banks):
+            try:
+                result = run_job(params_dict, data_storage, cancel, listener)
+            except KeyboardInterrupt:
+                # interrupted outside the write pipeline, e.g. while reading the outputs appended to
+                cancel.set()
+                result = run_job(params_dict, data_storage, cancel, listener)
+            if result["cancelled"]:
+                cancel.set()
+            results.append(result)
+        return results
+
+    with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix="job") as executor:
+        futures = [
+            executor.submit(run_job, params_dict, data_storage, cancel, listener)
+            for params_dict, data_storage in zip(jobs, job_banks)
+        ]
+        results = []
+        for future in futures:
+            while True:
+                try:
+                    results.append(future.result())
+                    break
+                except KeyboardInterrupt:
+                    # Ctrl-C reaches the main thread only, the jobs see the event
+                    logger.warning("Cancelling the running jobs")
+                    cancel.set()
+        return results
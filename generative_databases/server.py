@@ -0,0 +1,400 @@
+import asyncio
+import io
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from generative_databases.generators import data_importer, writers
+from generative_databases.generators.generator import DEFAULT_PARAMS, NAME_DATA_COLUMNS, Generator, validate_columns
+from generative_databases.generators.pesel import FIRST_YEAR, LAST_YEAR
+
+logger = logging.getLogger(__name__)
+
+SOURCE_KEYS = ("city_data", "names_data", "last_names_data")
+REQUEST_KEYS = (
+    set(DEFAULT_PARAMS) - set(SOURCE_KEYS) - {"workers", "relational", "vehicles_per_person", "append", "queue_size"}
+) | {"sample_size"}
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "arrow": "application/vnd.apache.arrow.stream"}
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+DEFAULT_CHUNK_SIZE = 10_000
+MAX_BODY_SIZE = 1 << 20
+
+
+class RequestError(Exception):
+    """
+    Invalid request, answered with an HTTP error status.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class GenerationServer:
+    """
+    Long-running HTTP server generating data on request from reference data kept in memory.
+
+    The DataBank, its vocabularies and the name sampler are loaded once when the server starts and shared
+    by every request. ``POST /generate`` takes a JSON object with generation parameters (as in a job, but
+    without data sources, workers or outputs) and streams the rows back in chunks, as NDJSON or as an
+    Arrow IPC stream (``?format=arrow`` or an ``Accept: application/vnd.apache.arrow.stream`` header).
+    A chunk is only generated once the previous one was taken by the client, so slow clients never make
+    the server buffer their data. The response status is only sent once the first chunk was generated, so
+    parameters the generator rejects are answered with 400. ``GET /health`` reports the load of the server.
+
+    At most ``max_concurrent`` requests generate at the same time, up to ``max_queued`` more wait for
+    their turn and any further request is answered with 503.
+    """
+
+    def __init__(
+        self,
+        params_dict: dict = None,
+        max_concurrent: int = 4,
+        max_queued: int = 16,
+        max_rows: int = 10_000_000,
+        data_storage: data_importer.DataBank = None,
+    ):
+        """
+        :param params_dict: Data sources ('city_data', 'names_data', 'last_names_data') and the optional
+            'cache' flag, built-in data by default.
+        :type params_dict: dict
+        :param max_concurrent: Number of requests generating at the same time.
+        :type max_concurrent: int
+        :param max_queued: Number of requests waiting for a free slot before new ones are rejected.
+        :type max_queued: int
+        :param max_rows: Largest sample size of one request.
+        :type max_rows: int
+        :param data_storage: Loaded reference data, created from ``params_dict`` if not given.
+        :type data_storage: data_importer.DataBank
+        """
+        self.params_dict = dict({source: DEFAULT_PARAMS[source] for source in SOURCE_KEYS}, **(params_dict or {}))
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queued = max(0, max_queued)
+        self.max_rows = max_rows
+        if data_storage is None:
+            data_storage = data_importer.DataBank(self.params_dict, columns=NAME_DATA_COLUMNS)
+        self.data_storage = data_storage
+        self.name_sampler = None
+        self.active = 0
+        self.waiting = 0
+        self.served = 0
+        self._slots = None
+        self._executor = None
+
+    def warm(self):
+        """
+        Load every dataset, vocabulary and the name sampler, so requests never race on lazy loading.
+        """
+        start = time.perf_counter()
+        generator = Generator(dict(DEFAULT_PARAMS, sample_size=1, seed=0), data_storage=self.data_storage)
+        for _ in generator.generate_chunks():
+            pass
+        self.data_storage.load("car_plates")
+        self.name_sampler = generator.name_sampler
+        logger.info("Reference data loaded in %.2f s", time.perf_counter() - start)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765, path: str = None) -> asyncio.AbstractServer:
+        """
+        Load the reference data and start listening.
+
+        :param host: Address to listen on.
+        :type host: str
+        :param port: TCP port, 0 picks a free one (see the ``sockets`` of the returned server).
+        :type port: int
+        :param path: Unix socket path, listens there instead of on ``host`` and ``port`` if given.
+        :type path: str
+        :return: The listening asyncio server.
+        :rtype: asyncio.AbstractServer
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="serve")
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        await asyncio.get_running_loop().run_in_executor(self._executor, self.warm)
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path=path)
+            logger.info("Serving on %s", path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+            logger.info("Serving on %s", ", ".join(str(sock.getsockname()) for sock in server.sockets))
+        return server
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 8765, path: str = None):
+        """
+        Start the server and serve until cancelled, see :meth:`start`.
+        """
+        server = await self.start(host, port, path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def request_params(self, body: bytes) -> dict:
+        """
+        Validate the JSON body of a generation request.
+
+        :param body: Request body.
+        :type body: bytes
+        :raises RequestError: If the body is not a valid request, e.g. the years or columns requested cannot be
+            generated.
+        :return: Generation parameters, missing ones taken from ``DEFAULT_PARAMS``.
+        :rtype: dict
+        """
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError as e:
+            raise RequestError(400, f"Invalid JSON: {e}")
+        if not isinstance(request, dict):
+            raise RequestError(400, "Expected a JSON object")
+        unknown = set(request) - REQUEST_KEYS
+        if unknown:
+            raise RequestError(400, f"Unknown parameters: {', '.join(sorted(unknown))}")
+        params_dict = dict(DEFAULT_PARAMS, **self.params_dict)
+        params_dict.update(request)
+        params_dict["workers"] = 1
+        sample_size = params_dict.get("sample_size")
+        if not isinstance(sample_size, int) or sample_size <= 0:
+            raise RequestError(400, "sample_size must be a positive integer")
+        if sample_size > self.max_rows:
+            raise RequestError(413, f"sample_size is limited to {self.max_rows} rows")
+        year_range = params_dict["year_range"]
+        if (
+            not isinstance(year_range, list)
+            or len(year_range) != 2
+            or not all(isinstance(year, int) for year in year_range)
+        ):
+            raise RequestError(400, "year_range must be [first_year, last_year]")
+        if year_range[0] > year_range[1]:
+            raise RequestError(400, "year_range must not end before it starts")
+        if year_range[0] < FIRST_YEAR or year_range[1] > LAST_YEAR:
+            raise RequestError(400, f"year_range must lie within {FIRST_YEAR}-{LAST_YEAR}, the years of PESEL numbers")
+        if params_dict["columns"] is not None and not isinstance(params_dict["columns"], list):
+            raise RequestError(400, "columns must be a list of column names")
+        try:
+            validate_columns(params_dict, self.data_storage)
+        except ValueError as e:
+            raise RequestError(400, str(e))
+        if not params_dict["chunk_size"] or params_dict["chunk_size"] <= 0:
+            params_dict["chunk_size"] = DEFAULT_CHUNK_SIZE
+        if params_dict["seed"] is None:
+            # draw the seed here, so it can be sent back and the same data requested again
+            params_dict["seed"] = np.random.SeedSequence().entropy
+        return params_dict
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Serve one HTTP/1.1 request, the connection is closed after the response.
+        """
+        try:
+            try:
+                method, target, headers, body = await self.read_request(reader)
+                url = urlsplit(target)
+                if url.path == "/health":
+                    if method != "GET":
+                        raise RequestError(405, "Use GET")
+                    await self.send_json(writer, 200, self.health())
+                elif url.path == "/generate":
+                    if method != "POST":
+                        raise RequestError(405, "Use POST")
+                    output_format = self.output_format(parse_qs(url.query), headers)
+                    await self.generate(writer, self.request_params(body), output_format)
+                else:
+                    raise RequestError(404, f"No such endpoint: {url.path}")
+            except RequestError as e:
+                await self.send_json(writer, e.status, {"error": str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            logger.info("Client disconnected")
+        except Exception as e:
+            logger.error(f"Error serving request: {e}")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def read_request(self, reader: asyncio.StreamReader) -> tuple:
+        """
+        Read the request line, headers and body of a request.
+
+        :return: Method, target, headers (lower case names) and body.
+        :rtype: tuple
+        """
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) != 3:
+            raise RequestError(400, "Malformed request line")
+        method, target, _ = request_line
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode("latin-1").strip()
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise RequestError(400, "Invalid Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise RequestError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+    def output_format(self, query: dict, headers: dict) -> str:
+        """
+        Output format of a request, from the 'format' query parameter or the Accept header.
+        """
+        if "format" in query:
+            output_format = query["format"][0].lower()
+            if output_format not in CONTENT_TYPES:
+                raise RequestError(400, f"Unsupported format: {output_format}")
+            return output_format
+        return "arrow" if CONTENT_TYPES["arrow"] in headers.get("accept", "") else "ndjson"
+
+    def health(self) -> dict:
+        return {
+            "status": "ok",
+            "active": self.active,
+            "waiting": self.waiting,
+            "served": self.served,
+            "max_concurrent": self.max_concurrent,
+        }
+
+    async def send_json(self, writer: asyncio.StreamWriter, status: int, content: dict):
+        body = json.dumps(content).encode()
+        writer.write(self.response_head(status, "application/json", {"Content-Length": str(len(body))}) + body)
+        await writer.drain()
+
+    @staticmethod
+    def response_head(status: int, content_type: str, headers: dict) -> bytes:
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT[status]}", f"Content-Type: {content_type}", "Connection: close"]
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def generate(self, writer: asyncio.StreamWriter, params_dict: dict, output_format: str):
+        """
+        Wait for a free slot and stream the generated rows as a chunked response.
+        """
+        if self.active + self.waiting >= self.max_concurrent + self.max_queued:
+            raise RequestError(503, "Server busy, try again later")
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            await self.stream(writer, params_dict, output_format)
+            self.served += 1
+        finally:
+            self.active -= 1
+            self._slots.release()
+
+    async def stream(self, writer: asyncio.StreamWriter, params_dict: dict, output_format: str):
+        """
+        Generate chunks on the thread pool and write each one before generating the next.
+
+        :raises RequestError: If the first chunk cannot be generated, with 400 if the generator rejected the
+            parameters (e.g. :class:`PeselSpaceExhausted`).
+        """
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        encoder = ArrowEncoder() if output_format == "arrow" else encode_ndjson
+        try:
+            generator = Generator(params_dict, data_storage=self.data_storage, name_sampler=self.name_sampler)
+            chunks = generator.generate_chunks(params_dict["chunk_size"])
+            data = await loop.run_in_executor(self._executor, next_encoded, chunks, encoder)
+        except ValueError as e:
+            raise RequestError(400, str(e))
+        except Exception as e:
+            logger.error(f"Error generating the first chunk: {e}")
+            raise RequestError(500, "Generation failed")
+        writer.write(
+            self.response_head(
+                200,
+                CONTENT_TYPES[output_format],
+                {"Transfer-Encoding": "chunked", "X-Seed": str(params_dict["seed"])},
+            )
+        )
+        while data is not None:
+            if data:
+                writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            # wait for the client to take the chunk, a slow client slows down generation
+            await writer.drain()
+            data = await loop.run_in_executor(self._executor, next_encoded, chunks, encoder)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+        logger.info(
+            "Streamed %d rows as %s in %.2f s", params_dict["sample_size"], output_format, time.perf_counter() - start
+        )
+
+
+def next_encoded(chunks, encoder):
+    """
+    Generate and encode the next chunk, b"" for trailing encoder output and None when done.
+    """
+    chunk = next(chunks, None)
+    if chunk is None:
+        return encoder(None)
+    return encoder(chunk)
+
+
+def encode_ndjson(chunk):
+    """
+    Encode a chunk as newline-delimited JSON records, None once the chunks are exhausted.
+    """
+    if chunk is None:
+        return None
+    return chunk.to_json(orient="records", lines=True, date_format="iso").encode()
+
+
+class ArrowEncoder:
+    """
+    Encodes chunks as one Arrow IPC stream, categorical columns as dictionaries replaced with every chunk.
+    """
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.writer = None
+        self.schema = None
+        self.closed = False
+
+    def __call__(self, chunk):
+        import pyarrow as pa
+
+        if chunk is None:
+            if self.closed:
+                return None
+            self.closed = True
+            if self.writer is None:
+                return b""
+            self.writer.close()
+            return self.take()
+        table = writers.to_arrow(chunk)
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = pa.ipc.new_stream(self.buffer, self.schema)
+        elif table.schema != self.schema:
+            table = table.cast(self.schema)
+        self.writer.write_table(table)
+        return self.take()
+
+    def take(self) -> bytes:
+        """
+        Bytes written since the last call.
+        """
+        data = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return data
@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope="session")
+def reference_data_cache(tmp_path_factory):
+    """
+    Keep the reference data cache of the tests out of the user's cache directory.
+    """
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("GENERATIVE_DATABASES_CACHE", str(tmp_path_factory.mktemp("cache")))
+        yield
@@ -0,0 +1,92 @@
+import os
+
+import pandas as pd
+import pytest
+
+from generative_databases.generators import writers
+from generative_databases.generators.generator import DEFAULT_PARAMS, Generator
+from generative_databases.generators.parallel import ParallelGenerator
+from generative_databases.generators.pipeline import Cancelled
+
+COLUMNS = ["Name", "Last Name", "Birth Date", "Pesel Number", "city", "admin_name", "Plate Number"]
+
+
+def params(**kwargs) -> dict:
+    return dict(DEFAULT_PARAMS, columns=COLUMNS, **kwargs)
+
+
+def generate(params_dict: dict, outputs: dict, workers: int = 1) -> dict:
+    outputs = {output_type: str(path) for output_type, path in outputs.items()}
+    if workers > 1:
+        return ParallelGenerator(params_dict, workers=workers).generate_and_save(outputs)
+    return Generator(params_dict).generate_and_save(outputs)
+
+
+def read_csv(path) -> pd.DataFrame:
+    return pd.read_csv(path, dtype=str, index_col=0)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+@pytest.mark.parametrize("output_type, extension", [("csv", "csv"), ("parquet", "parquet"), ("sql", "db")])
+def test_append_never_repeats_unique_columns(tmp_path, workers, output_type, extension):
+    path = tmp_path / f"people.{extension}"
+    # a short year range and the same seed again make the appended rows draw the existing numbers
+    params_dict = params(sample_size=2000, seed=1, year_range=[2000, 2000])
+    generate(params_dict, {output_type: path})
+    generate(dict(params_dict, append=True), {output_type: path}, workers)
+    generate(dict(params_dict, append=True, seed=2), {output_type: path}, workers)
+    if output_type == "csv":
+        people = read_csv(path)
+        assert people.index.tolist() == list(range(6000))
+    elif output_type == "parquet":
+        people = pd.read_parquet(path)
+    else:
+        people = pd.read_sql_table("people", f"sqlite:///{path}")
+    assert len(people) == 6000
+    assert people["Pesel Number"].is_unique
+    assert people["Plate Number"].is_unique
+
+
+def test_append_skips_malformed_values(tmp_path):
+    path = tmp_path / "people.csv"
+    params_dict = params(sample_size=500, seed=1, year_range=[2000, 2000])
+    generate(params_dict, {"csv": path})
+    people = read_csv(path)
+    people.iloc[0, COLUMNS.index("Pesel Number")] = None
+    people.iloc[1, COLUMNS.index("Pesel Number")] = "12x"
+    people.iloc[2, COLUMNS.index("Plate Number")] = None
+    people.to_csv(path)
+    generate(dict(params_dict, append=True), {"csv": path})
+    people = read_csv(path)
+    assert len(people) == 1000
+    assert not people["Pesel Number"].dropna().duplicated().any()
+    assert not people["Plate Number"].dropna().duplicated().any()
+
+
+def test_failed_parquet_append_keeps_the_existing_file(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "values.parquet"
+    writers.write_chunks([pd.DataFrame({"value": range(10)})], {"parquet": str(path)})
+    content = path.read_bytes()
+
+    chunks = [pd.DataFrame({"value": range(10, 20)}), pd.DataFrame({"value": ["not a number"]})]
+    reports = writers.write_chunks(chunks, {"parquet": str(path)}, options={"parquet": {"append": True}})
+    assert reports["parquet"]["error"] is not None
+    assert path.read_bytes() == content
+    assert os.listdir(tmp_path) == ["values.parquet"]
+
+
+def test_cancelled_parquet_append_keeps_the_rows_written(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "values.parquet"
+    writers.write_chunks([pd.DataFrame({"value": range(10)})], {"parquet": str(path)})
+
+    def chunks():
+        yield pd.DataFrame({"value": range(10, 20)})
+        raise Cancelled()
+
+    with pytest.raises(Cancelled):
+        writers.write_chunks(chunks(), {"parquet": str(path)}, options={"parquet": {"append": True}})
+    # the cancelled chunk is only written if the output thread took it before the cancellation
+    assert pd.read_parquet(path)["value"].tolist() in (list(range(10)), list(range(20)))
+    assert os.listdir(tmp_path) == ["values.parquet"]
@@ -0,0 +1,64 @@
+import xml.etree.ElementTree as ElementTree
+
+import pandas as pd
+import pytest
+
+from generative_databases.generators.generator import DEFAULT_PARAMS, Generator
+from generative_databases.generators.instrumentation import Metrics
+from generative_databases.generators.parallel import ParallelGenerator
+from generative_databases.generators.pipeline import Cancelled
+
+
+def cancelling_metrics(rows: int):
+    """
+    Metrics cancelling the generation once ``rows`` rows were generated.
+    """
+    state = {}
+
+    def listener(event):
+        if event["stage"] == "generate" and event["done"] >= rows:
+            state["generator"].cancel()
+
+    return state, Metrics(listeners=[listener])
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_cancel_leaves_valid_partial_outputs(tmp_path, workers):
+    params_dict = dict(DEFAULT_PARAMS, sample_size=100000, seed=1, chunk_size=2000)
+    state, metrics = cancelling_metrics(6000)
+    if workers > 1:
+        state["generator"] = ParallelGenerator(params_dict, workers=workers, metrics=metrics)
+    else:
+        state["generator"] = Generator(params_dict, metrics=metrics)
+    outputs = {
+        "csv": tmp_path / "people.csv",
+        "json": tmp_path / "people.json.gz",
+        "xml": tmp_path / "people.xml",
+        "parquet": tmp_path / "people.parquet",
+    }
+    with pytest.raises(Cancelled) as cancelled:
+        state["generator"].generate_and_save({output_type: str(path) for output_type, path in outputs.items()})
+
+    # every output is closed with the chunks it took before the cancellation
+    reports = cancelled.value.reports
+    assert set(reports) == set(outputs)
+    assert all(report["error"] is None for report in reports.values())
+    assert all(0 < report["rows"] < 100000 for report in reports.values())
+    assert len(pd.read_csv(outputs["csv"], index_col=0)) == reports["csv"]["rows"]
+    assert len(pd.read_json(outputs["json"], lines=True)) == reports["json"]["rows"]
+    assert len(ElementTree.parse(outputs["xml"]).getroot()) == reports["xml"]["rows"]
+    assert len(pd.read_parquet(outputs["parquet"])) == reports["parquet"]["rows"]
+    assert metrics.summary()["counters"]["rows"] < 100000
+
+
+def test_progress_events(tmp_path):
+    events = []
+    params_dict = dict(DEFAULT_PARAMS, sample_size=3000, seed=1, chunk_size=1000)
+    generator = Generator(params_dict, metrics=Metrics(listeners=[events.append]))
+    generator.generate_and_save({"csv": str(tmp_path / "people.csv")})
+    done = {
+        stage: [event["done"] for event in events if event["stage"] == stage] for stage in ("generate", "write.csv")
+    }
+    assert done["generate"] == [0, 1000, 2000, 3000]
+    assert done["write.csv"][-1] == 3000
+    assert all(event["total"] == 3000 for event in events)
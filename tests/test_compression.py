@@ -0,0 +1,83 @@
+import gzip
+import os
+
+import pandas as pd
+import pytest
+
+from generative_databases.generators import writers
+
+ROWS = 1000
+
+
+def chunks(size=300):
+    for start in range(0, ROWS, size):
+        stop = min(start + size, ROWS)
+        yield pd.DataFrame({"pesel": [f"{number:011d}" for number in range(start, stop)],
+                            "city": [f"miasto {number % 13}" for number in range(start, stop)]})
+
+
+def read(output_type, path):
+    if output_type == "csv":
+        return pd.read_csv(path, index_col=0, dtype={"pesel": str})
+    if output_type == "json":
+        return pd.read_json(path, lines=True, dtype={"pesel": str})
+    return pd.read_xml(path, parser="etree", dtype={"pesel": str})
+
+
+def check(data, start=0, stop=ROWS):
+    assert list(data["pesel"]) == [f"{number:011d}" for number in range(start, stop)]
+    assert list(data["city"]) == [f"miasto {number % 13}" for number in range(start, stop)]
+
+
+@pytest.mark.parametrize("output_type", ["csv", "json", "xml"])
+@pytest.mark.parametrize("compression, package", [("gzip", None), ("zstd", "zstandard"), ("lz4", "lz4.frame")])
+def test_round_trip(tmp_path, output_type, compression, package):
+    if package is not None:
+        pytest.importorskip(package)
+    path = str(tmp_path / f"people.{output_type}")
+    options = {output_type: {"compression": compression, "compression_threads": 2}}
+    reports = writers.write_chunks(chunks(), {output_type: path}, options=options)
+    assert reports[output_type]["error"] is None
+    (name,) = os.listdir(tmp_path)
+    assert name == f"people.{output_type}{dict(gzip='.gz', zstd='.zst', lz4='.lz4')[compression]}"
+    assert reports[output_type]["bytes"] == os.path.getsize(tmp_path / name)
+    check(read(output_type, str(tmp_path / name)))
+
+
+def test_compression_from_the_path(tmp_path):
+    path = str(tmp_path / "people.csv.gz")
+    writers.write_chunks(chunks(), {"csv": path})
+    check(read("csv", path))
+
+
+def test_blocks_form_one_stream(tmp_path):
+    path = str(tmp_path / "data.gz")
+    data = os.urandom(1000).hex().encode() * 10
+    for threads in (1, 3):
+        with writers.BlockCompressor(path, writers.block_compressor("gzip"), threads, block_size=777) as f:
+            for start in range(0, len(data), 1000):
+                f.write(data[start : start + 1000])
+        with open(path, "rb") as f:
+            content = f.read()
+        assert gzip.decompress(content) == data
+        if threads == 1:
+            first = content
+    assert content == first
+
+
+@pytest.mark.parametrize("output_type", ["csv", "json", "xml"])
+def test_shards(tmp_path, output_type):
+    path = str(tmp_path / f"people.{output_type}.gz")
+    options = {output_type: {"shard_rows": 400}}
+    reports = writers.write_chunks(chunks(), {output_type: path}, options=options)
+    assert reports[output_type]["rows"] == ROWS
+    names = sorted(os.listdir(tmp_path))
+    assert names == [f"people_{number:05d}.{output_type}.gz" for number in range(3)]
+    for number, name in enumerate(names):
+        # every shard is a complete file of its own
+        check(read(output_type, str(tmp_path / name)), number * 400, min((number + 1) * 400, ROWS))
+
+
+def test_unknown_compression(tmp_path):
+    with pytest.raises(ValueError, match="Unknown compression"):
+        writers.create_sink("csv", str(tmp_path / "people.csv"), compression="bzip2")
@@ -0,0 +1,78 @@
+import os
+import tempfile
+
+import pytest
+
+from generative_databases.generators import data_importer
+
+
+def write_last_names(path, names):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Nazwisko,Liczba\n" + "".join(f"{name},{idx + 1}\n" for idx, name in enumerate(names)))
+
+
+def load_last_names(path, cache):
+    bank = data_importer.DataBank({"last_names_data": str(path)}, cache=cache)
+    return list(bank.last_name["Nazwisko"])
+
+
+def entries(cache):
+    return sorted(name for name in os.listdir(cache.directory) if name.startswith("last_name-"))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return data_importer.DataCache(str(tmp_path / "cache"))
+
+
+def test_entry_is_reused(tmp_path, cache, monkeypatch):
+    path = tmp_path / "last_names.csv"
+    write_last_names(path, ["Nowak", "Kowalski"])
+    assert load_last_names(path, cache) == ["nowak", "kowalski"]
+    assert len(entries(cache)) == 1
+
+    monkeypatch.setattr(data_importer.DataBank, "load_csv_data", lambda self, path: pytest.fail("source re-read"))
+    assert load_last_names(path, cache) == ["nowak", "kowalski"]
+
+
+def test_entry_is_rebuilt_on_change(tmp_path, cache):
+    path = tmp_path / "last_names.csv"
+    write_last_names(path, ["Nowak", "Kowalski"])
+    load_last_names(path, cache)
+
+    # same size, new content and modification time
+    write_last_names(path, ["Nowak", "Kowalska"])
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert load_last_names(path, cache) == ["nowak", "kowalska"]
+    # different size
+    write_last_names(path, ["Nowak", "Kowalska", "Wiśniewski"])
+    assert load_last_names(path, cache) == ["nowak", "kowalska", "wisniewski"]
+    assert len(entries(cache)) == 3
+
+
+def test_touched_source_keeps_its_entry(tmp_path, cache):
+    path = tmp_path / "last_names.csv"
+    write_last_names(path, ["Nowak"])
+    load_last_names(path, cache)
+    os.utime(path, ns=(os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert load_last_names(path, cache) == ["nowak"]
+    assert len(entries(cache)) == 1
+
+
+def test_cache_write_failure_falls_back_to_the_source(tmp_path, cache, monkeypatch):
+    def mkdtemp(*args, **kwargs):
+        raise PermissionError("read-only cache")
+
+    path = tmp_path / "last_names.csv"
+    write_last_names(path, ["Nowak"])
+    monkeypatch.setattr(tempfile, "mkdtemp", mkdtemp)
+    assert load_last_names(path, cache) == ["nowak"]
+    assert entries(cache) == []
+
+
+def test_clear(tmp_path, cache):
+    path = tmp_path / "last_names.csv"
+    write_last_names(path, ["Nowak"])
+    load_last_names(path, cache)
+    assert cache.clear() == 1
+    assert entries(cache) == []
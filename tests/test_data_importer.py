@@ -0,0 +1,101 @@
+import logging
+
+import pandas as pd
+
+from generative_databases.generators import data_importer
+
+
+def cities(*rows):
+    return pd.DataFrame(rows, columns=['city', 'admin_name', 'lat', 'lng'])
+
+
+def postal_codes(*rows):
+    return pd.DataFrame(
+        [(state, county, code[:2], code.replace('-', '')) for state, county, code in rows],
+        columns=['state', 'counties', 'district', 'postal_code'],
+    )
+
+
+def codes_of(matches, city_idx):
+    return sorted(matches.loc[matches['city_idx'] == city_idx, 'postal_code'])
+
+
+def test_county_match_drops_stray_districts():
+    codes = [('Lower Silesia', 'Wrocław', f'5{i % 5}-{i:03d}') for i in range(40)]
+    codes.append(('Lower Silesia', 'Wrocław', '25-215'))
+    matches = data_importer.match_postal_codes(cities(('wroclaw', 'dolnoslaskie', 51.1, 17.0)),
+                                               postal_codes(*codes))
+    assert len(matches) == 40
+    assert not (matches['postal_code'].str[:2] == '25').any()
+
+
+def test_county_match_is_limited_to_the_voivodeship():
+    matches = data_importer.match_postal_codes(
+        cities(('opole', 'opolskie', 50.7, 17.9), ('opole', 'lubelskie', 51.1, 22.0)),
+        postal_codes(('Opole Voivodeship', 'Opole', '45-001'), ('Lublin', 'Powiat opolski', '24-300')),
+    )
+    assert codes_of(matches, 0) == ['45-001']
+    assert codes_of(matches, 1) == ['24-300']
+
+
+def test_adjective_match():
+    matches = data_importer.match_postal_codes(
+        cities(('kalisz', 'wielkopolskie', 51.8, 18.1), ('tarnow', 'malopolskie', 50.0, 21.0)),
+        postal_codes(('Greater Poland', 'Powiat kaliski', '62-800'), ('Greater Poland', 'Powiat kaliski', '62-817'),
+                     ('Lesser Poland', 'Powiat tarnowski', '33-100'), ('Lesser Poland', 'Powiat tarski', '33-999')),
+    )
+    assert codes_of(matches, 0) == ['62-800', '62-817']
+    assert codes_of(matches, 1) == ['33-100']
+
+
+def test_exact_match_wins_over_adjective():
+    matches = data_importer.match_postal_codes(
+        cities(('krakow', 'malopolskie', 50.1, 19.9),),
+        postal_codes(('Lesser Poland', 'Kraków', '30-001'), ('Lesser Poland', 'Powiat krakowski', '32-001')),
+    )
+    assert codes_of(matches, 0) == ['30-001']
+
+
+def test_fallback_takes_the_main_district_of_the_nearest_city(caplog):
+    rows = cities(('warszawa', 'mazowieckie', 52.2, 21.0), ('radom', 'mazowieckie', 51.4, 21.2),
+                  ('zabki', 'mazowieckie', 52.3, 21.1), ('sopot', 'pomorskie', 54.4, 18.6))
+    codes = postal_codes(('Mazovia', 'Warszawa', '02-001'), ('Mazovia', 'Warszawa', '02-002'),
+                         ('Mazovia', 'Warszawa', '00-001'), ('Mazovia', 'Radom', '26-600'),
+                         ('Mazovia', 'Powiat wołomiński', '05-200'))
+    with caplog.at_level(logging.WARNING, logger=data_importer.__name__):
+        matches = data_importer.match_postal_codes(rows, codes)
+    assert codes_of(matches, 2) == ['02-001', '02-002']
+    assert codes_of(matches, 3) == []
+    assert 'sopot' in caplog.text
+    assert list(matches['city_idx']) == sorted(matches['city_idx'])
+
+
+def test_built_in_localisation_data():
+    cities_path, postal_codes_path = data_importer.BUILT_IN_SOURCES['localisation']
+    data = data_importer.normalize_frame(pd.read_csv(cities_path))
+    matches = data_importer.match_postal_codes(data, pd.read_csv(postal_codes_path, encoding='utf-8-sig', dtype=str))
+    assert matches['city_idx'].nunique() == len(data)
+    wroclaw = matches.loc[matches['city_idx'] == data.index[data['city'] == 'wroclaw'][0], 'postal_code']
+    assert wroclaw.str[:2].isin(['50', '51', '52', '53', '54']).all()
+
+
+def test_normalize_series():
+    values = pd.Series(['Kraków', 'WARSZAWA', None, 'Łódź', 'Kraków', float('nan'), 'Zażółć Gęślą'],
+                       name='city', index=range(10, 17))
+    normalized = data_importer.normalize_series(values)
+    assert list(normalized) == ['krakow', 'warszawa', None, 'lodz', 'krakow', None, 'zazolc gesla']
+    assert normalized.name == 'city' and list(normalized.index) == list(values.index)
+    assert list(normalized[normalized.notna()]) == [data_importer.normalize_text(v) for v in values.dropna()]
+
+
+def test_normalize_series_empty():
+    assert len(data_importer.normalize_series(pd.Series([], dtype=object))) == 0
+    assert list(data_importer.normalize_series(pd.Series([None, None]))) == [None, None]
+
+
+def test_normalize_frame_only_changes_text_columns():
+    data = pd.DataFrame({'city': ['Gdańsk', 'Sopot'], 'population': [470000, 35000]})
+    normalized = data_importer.normalize_frame(data)
+    assert list(normalized['city']) == ['gdansk', 'sopot']
+    assert list(normalized['population']) == [470000, 35000]
+    assert list(data['city']) == ['Gdańsk', 'Sopot']
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from generative_databases.generators.dates import random_dates, split_dates
+from generative_databases.generators.generator import DEFAULT_PARAMS, Generator
+
+
+def test_dates_stay_in_the_year_range():
+    dates = random_dates(1999, 2000, 20000, np.random.default_rng(1))
+    assert dates.dtype == np.dtype("datetime64[D]")
+    assert dates.min() >= np.datetime64("1999-01-01") and dates.max() <= np.datetime64("2000-12-31")
+    assert np.datetime64("2000-02-29") in dates
+
+
+def test_year_weights():
+    dates = random_dates(2000, 2002, 30000, np.random.default_rng(2), year_weights=np.array([1.0, 0.0, 3.0]))
+    years, month, day = split_dates(dates)
+    shares = pd.Series(years).value_counts(normalize=True)
+    assert set(shares.index) == {2000, 2002}
+    assert abs(shares[2002] - 0.75) < 0.02
+    assert set(month) == set(range(1, 13)) and day.max() == 31
+
+
+def test_invalid_year_range():
+    with pytest.raises(ValueError):
+        random_dates(2001, 2000, 10)
+
+
+def test_split_dates():
+    years, month, day = split_dates(np.array(["1969-12-31", "2000-02-29", "2150-03-04"], dtype="datetime64[D]"))
+    assert list(years) == [1969, 2000, 2150]
+    assert list(month) == [12, 2, 3]
+    assert list(day) == [31, 29, 4]
+
+
+def test_birth_dist_follows_the_names_data():
+    generator = Generator(dict(DEFAULT_PARAMS, sample_size=50000, columns=["Birth Date"], year_range=[1995, 2019],
+                               birth_dist="names", seed=3))
+    years, _, _ = split_dates(generator.generate_birth_dates(50000))
+    expected = generator.name_sampler.births_per_year(np.arange(1995, 2020))
+    expected = pd.Series(expected / expected.sum(), index=np.arange(1995, 2020))
+    shares = pd.Series(years).value_counts(normalize=True).reindex(expected.index, fill_value=0)
+    assert (abs(shares - expected) < 0.01).all()
+    # years before the names data are weighted like its first year
+    assert expected[1995] == expected[2000]
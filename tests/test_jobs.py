@@ -0,0 +1,93 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from generative_databases import jobs
+
+JOB_FILE = """
+[defaults]
+seed = 1
+year_range = [1990, 2000]
+columns = ["Name", "Last Name", "Birth Date"]
+
+[[jobs]]
+name = "small"
+sample_size = 100
+outputs = {{csv = "{path}/small.csv"}}
+
+[[jobs]]
+sample_size = 50
+seed = 2
+outputs = {{json = "{path}/second.json"}}
+"""
+
+
+def write_job_file(tmp_path, content):
+    path = tmp_path / "jobs.toml"
+    path.write_text(content.format(path=tmp_path.as_posix()), encoding="utf-8")
+    return str(path)
+
+
+def test_load_job_file(tmp_path):
+    small, second = jobs.load_job_file(write_job_file(tmp_path, JOB_FILE))
+    assert small["name"] == "small" and second["name"] == "job 2"
+    assert small["seed"] == 1 and second["seed"] == 2
+    assert small["year_range"] == second["year_range"] == [1990, 2000]
+    assert second["sample_size"] == 50 and second["sec_name_prob"] == jobs.DEFAULT_PARAMS["sec_name_prob"]
+
+
+@pytest.mark.parametrize(
+    "job, message",
+    [
+        ({"outputs": {"csv": "x.csv"}}, "positive sample_size"),
+        ({"sample_size": 0, "outputs": {"csv": "x.csv"}}, "positive sample_size"),
+        ({"sample_size": 10}, "at least one output"),
+        ({"sample_size": 10, "outputs": {"csv": "x.csv"}, "colour": "red"}, "Unknown parameters in job: colour"),
+        ({"sample_size": 10, "outputs": {"csv": "x.csv"}, "year_range": [1990]}, "year_range"),
+        ({"sample_size": 10, "outputs": {"csv": "x.csv"}, "columns": ["Name", "Shoe Size"]}, "Shoe Size"),
+    ],
+)
+def test_invalid_jobs(job, message):
+    with pytest.raises(ValueError, match=message):
+        jobs.job_params(job)
+
+
+def test_invalid_job_files(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported job file type"):
+        jobs.load_job_file(str(tmp_path / "jobs.json"))
+    with pytest.raises(ValueError, match="No jobs"):
+        jobs.load_job_file(write_job_file(tmp_path, "[defaults]\nseed = 1\n"))
+    with pytest.raises(ValueError, match="job 2 needs at least one output"):
+        jobs.load_job_file(write_job_file(tmp_path, JOB_FILE.replace('outputs = {{json = "{path}/second.json"}}', "")))
+
+
+@pytest.mark.parametrize("parallel", [1, 2])
+def test_run_jobs(tmp_path, parallel):
+    job_list = jobs.load_job_file(write_job_file(tmp_path, JOB_FILE))
+    events = []
+    results = jobs.run_jobs(job_list, parallel=parallel, listener=events.append)
+    assert [result["name"] for result in results] == ["small", "job 2"]
+    assert all(result["error"] is None and not result["cancelled"] for result in results)
+    assert results[0]["outputs"]["csv"]["rows"] == 100
+    assert len(pd.read_csv(tmp_path / "small.csv", index_col=0)) == 100
+    assert len(pd.read_json(tmp_path / "second.json", lines=True)) == 50
+    assert {event["job"] for event in events} == {"small", "job 2"}
+
+
+def test_failed_job_does_not_stop_the_others(tmp_path):
+    failing = jobs.job_params({"name": "failing", "sample_size": 10, "outputs": {"csv": str(tmp_path / "x.csv")},
+                               "year_range": [2000, 1990]})
+    working = jobs.job_params({"name": "working", "sample_size": 10, "outputs": {"csv": str(tmp_path / "y.csv")},
+                               "columns": ["Last Name"]})
+    failed, worked = jobs.run_jobs([failing, working])
+    assert failed["error"] and not failed["cancelled"]
+    assert worked["error"] is None and worked["outputs"]["csv"]["rows"] == 10
+
+
+def test_cancelled_jobs(tmp_path):
+    cancel = threading.Event()
+    cancel.set()
+    job = jobs.job_params({"sample_size": 10, "outputs": {"csv": str(tmp_path / "x.csv")}, "columns": ["Last Name"]})
+    (result,) = jobs.run_jobs([job], cancel=cancel)
+    assert result["cancelled"] and result["error"] == "cancelled"
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from generative_databases.generators.name_sampler import NameSampler
+
+FIRST_NAMES = pd.DataFrame(
+    [
+        (2000, "Anna", 900, "K"),
+        (2000, "Ewa", 100, "K"),
+        (2000, "Jan", 1000, "M"),
+        (2001, "Zofia", 500, "K"),
+        (2001, "Piotr", 300, "M"),
+        (2001, "Adam", 700, "M"),
+        (2001, "Alex", 5, "X"),
+    ],
+    columns=["Year", "Name", "Number", "Gender"],
+)
+
+
+def test_weighted_sampling_follows_the_year_and_gender():
+    sampler = NameSampler(FIRST_NAMES)
+    rng = np.random.default_rng(1)
+    names = sampler.sample(np.full(20000, 2000), np.full(20000, "K"), rng=rng)
+    assert set(names) == {"Anna", "Ewa"}
+    assert abs(np.mean(names == "Anna") - 0.9) < 0.02
+    names = sampler.sample(np.full(20000, 2001), np.full(20000, "m"), rng=rng)
+    assert set(names) == {"Piotr", "Adam"}
+    assert abs(np.mean(names == "Adam") - 0.7) < 0.02
+
+
+def test_years_are_clamped_to_the_dataset():
+    sampler = NameSampler(FIRST_NAMES)
+    rng = np.random.default_rng(2)
+    assert set(sampler.sample(np.full(1000, 1950), np.full(1000, "M"), rng=rng)) == {"Jan"}
+    assert set(sampler.sample(np.full(1000, 2050), np.full(1000, "K"), rng=rng)) == {"Zofia"}
+    assert list(sampler.births_per_year(np.array([1990, 2000, 2001, 2020]))) == [2000, 2000, 1500, 1500]
+
+
+def test_unweighted_sampling_is_uniform_over_the_gender():
+    sampler = NameSampler(FIRST_NAMES)
+    names = sampler.sample(np.full(30000, 2000), np.full(30000, "M"), weighted=False, rng=np.random.default_rng(3))
+    counts = pd.Series(names).value_counts(normalize=True)
+    assert set(counts.index) == {"Jan", "Piotr", "Adam"}
+    assert (abs(counts - 1 / 3) < 0.02).all()
+
+
+def test_unknown_genders_get_no_name():
+    sampler = NameSampler(FIRST_NAMES)
+    codes = sampler.sample_codes([2000, 2000, 2001], ["K", "X", None], rng=np.random.default_rng(4))
+    assert codes[0] >= 0
+    assert list(codes[1:]) == [-1, -1]
+
+
+def test_sampling_is_reproducible():
+    sampler = NameSampler(FIRST_NAMES)
+    years = np.random.default_rng(5).integers(1995, 2005, 1000)
+    genders = np.random.default_rng(6).choice(["M", "K"], 1000)
+    first = sampler.sample(years, genders, rng=np.random.default_rng(7))
+    assert list(first) == list(sampler.sample(years, genders, rng=np.random.default_rng(7)))
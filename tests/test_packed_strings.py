@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from generative_databases.generators import packed_strings
+from generative_databases.generators.packed_strings import PackedStrings
+
+VALUES = ["nowak", "", "Wiśniewski", "kowalski", "Żółć", "a"]
+
+
+def test_round_trip():
+    strings = PackedStrings.from_values(VALUES)
+    assert len(strings) == len(VALUES)
+    assert [strings[idx] for idx in range(len(strings))] == VALUES
+    assert list(strings.to_numpy()) == VALUES
+    assert not strings.ascii
+    assert strings.nbytes == len("".join(VALUES).encode("utf-8")) + 8 * (len(VALUES) + 1)
+
+
+@pytest.mark.parametrize("values", [VALUES, ["nowak", "kowalski", ""]])
+def test_take(values, monkeypatch):
+    monkeypatch.setattr(packed_strings, "TAKE_BLOCK", 7)
+    strings = PackedStrings.from_values(values)
+    positions = np.random.default_rng(1).integers(-1, len(values), 100)
+    expected = [None if position < 0 else values[position] for position in positions]
+    assert list(strings.take(positions)) == expected
+    assert list(strings.take(np.array([], dtype=np.int64))) == []
+    assert list(strings.take([-1, -1])) == [None, None]
+
+
+def test_save_and_load(tmp_path):
+    PackedStrings.from_values(VALUES).save(str(tmp_path / "names"))
+    loaded = PackedStrings.load(str(tmp_path / "names"))
+    assert isinstance(loaded.data, np.memmap)
+    assert list(loaded.take([4, 0, 2])) == ["Żółć", "nowak", "Wiśniewski"]
+    assert list(PackedStrings.load(str(tmp_path / "names"), mmap_mode=None).to_numpy()) == VALUES
+
+
+def test_categorical():
+    strings = PackedStrings.from_values(sorted(["nowak", "kowalski", "zielinski", "wozniak"]))
+    categorical = strings.categorical([3, 1, -1, 3])
+    assert list(categorical.categories) == ["nowak", "zielinski"]
+    assert list(categorical.astype(object)) == ["zielinski", "nowak", np.nan, "zielinski"]
+    assert len(PackedStrings.from_values([]).categorical(np.array([], dtype=np.int64))) == 0
+    assert list(categorical.codes) == [1, 0, -1, 1]
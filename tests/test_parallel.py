@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from generative_databases.generators.generator import DEFAULT_PARAMS
+from generative_databases.generators.parallel import ParallelGenerator
+
+COLUMNS = ["Name", "Last Name", "Birth Date", "Pesel Number", "city", "admin_name", "Plate Number"]
+
+
+def params(**kwargs) -> dict:
+    return dict(DEFAULT_PARAMS, columns=COLUMNS, **kwargs)
+
+
+@pytest.mark.parametrize("workers", [2, 3])
+def test_seeded_runs_are_reproducible(tmp_path, workers):
+    runs = []
+    for run in range(2):
+        outputs = {"csv": tmp_path / f"{run}.csv", "parquet": tmp_path / f"{run}.parquet"}
+        ParallelGenerator(params(sample_size=3000, seed=7, chunk_size=700), workers=workers).generate_and_save(
+            {output_type: str(path) for output_type, path in outputs.items()}
+        )
+        runs.append({output_type: path.read_bytes() for output_type, path in outputs.items()})
+    assert runs[0] == runs[1]
+    people = pd.read_csv(tmp_path / "0.csv", dtype=str, index_col=0)
+    assert len(people) == 3000
+    assert people["Pesel Number"].is_unique
+    assert people["Plate Number"].is_unique
+
+
+def test_chunks_are_bounded():
+    generator = ParallelGenerator(params(sample_size=5000, seed=1, chunk_size=700), workers=2)
+    sizes = [len(chunk) for chunk in generator.generate_parts()]
+    assert sum(sizes) == 5000
+    assert max(sizes) == 700
+    assert generator.metrics.summary()["counters"]["rows"] == 5000
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from generative_databases.generators.pesel import PeselGenerator, PeselSpaceExhausted
+
+WEIGHTS = [1, 3, 7, 9, 1, 3, 7, 9, 1, 3]
+
+
+def checksum(pesel: str) -> int:
+    return (10 - sum(int(digit) * weight for digit, weight in zip(pesel, WEIGHTS)) % 10) % 10
+
+
+def random_dates(rng, size, first="1950-01-01", last="2015-12-31"):
+    first, last = np.datetime64(first, "D"), np.datetime64(last, "D")
+    return first + rng.integers(0, (last - first).astype(int) + 1, size)
+
+
+def test_checksum_and_gender_digit():
+    rng = np.random.default_rng(1)
+    dates = random_dates(rng, 5000)
+    genders = rng.choice(["M", "K"], 5000)
+    pesels = PeselGenerator().generate(dates, genders, rng)
+    assert all(len(pesel) == 11 and pesel.isdigit() for pesel in pesels)
+    assert all(int(pesel[10]) == checksum(pesel) for pesel in pesels)
+    assert all(int(pesel[9]) % 2 == (gender == "M") for pesel, gender in zip(pesels, genders))
+
+
+@pytest.mark.parametrize(
+    "date, prefix",
+    [
+        ("1850-03-04", "508304"),
+        ("1950-03-04", "500304"),
+        ("1999-12-31", "991231"),
+        ("2000-01-01", "002101"),
+        ("2050-03-04", "502304"),
+        ("2150-03-04", "504304"),
+        ("2250-03-04", "506304"),
+    ],
+)
+def test_century_encoding(date, prefix):
+    pesels = PeselGenerator().generate(np.array([date], dtype="datetime64[D]"), np.array(["K"]))
+    assert pesels[0][:6] == prefix
+    assert PeselGenerator.decode_dates(np.array([int(pesels[0])]))[0] == np.datetime64(date)
+
+
+def test_unsupported_year():
+    with pytest.raises(ValueError):
+        PeselGenerator().generate(np.array(["1799-12-31"], dtype="datetime64[D]"), np.array(["M"]))
+
+
+def test_unique_across_chunks():
+    rng = np.random.default_rng(2)
+    generator = PeselGenerator()
+    # few dates, so most serials of every date get used and collisions must be resolved
+    chunks = [
+        generator.generate(random_dates(rng, 4000, "2000-01-01", "2000-01-02"), rng.choice(["M", "K"], 4000), rng)
+        for _ in range(4)
+    ]
+    pesels = np.concatenate(chunks)
+    assert len(np.unique(pesels)) == len(pesels) == 16000
+    assert generator.collisions > 0
+
+
+def test_space_exhausted():
+    rng = np.random.default_rng(3)
+    generator = PeselGenerator()
+    date = np.array(["2000-01-01"] * 5000, dtype="datetime64[D]")
+    pesels = generator.generate(date, np.array(["M"] * 5000), rng)
+    assert len(np.unique(pesels)) == 5000
+    with pytest.raises(PeselSpaceExhausted):
+        generator.generate(date[:1], np.array(["M"]), rng)
+    # the other gender has its own serials
+    assert len(generator.generate(date[:1], np.array(["K"]), rng)) == 1
+
+
+def test_partitions_never_collide():
+    rng = np.random.default_rng(4)
+    date = np.array(["2000-01-01"] * 2500, dtype="datetime64[D]")
+    parts = [PeselGenerator(partition=(index, 2)) for index in range(2)]
+    pesels = np.concatenate([part.generate(date, np.array(["K"] * 2500), rng) for part in parts])
+    assert len(np.unique(pesels)) == 5000
+    with pytest.raises(PeselSpaceExhausted):
+        parts[0].generate(date[:1], np.array(["K"]), rng)
+
+
+def test_register_skips_malformed_values():
+    rng = np.random.default_rng(5)
+    existing = PeselGenerator().generate(np.array(["2000-01-01"] * 4000, dtype="datetime64[D]"), np.array(["M"] * 4000))
+    generator = PeselGenerator()
+    values = np.concatenate([existing, [None, "12x", "", " 1.5"]]).astype(object)
+    assert generator.register(values) == 4000
+    pesels = generator.generate(np.array(["2000-01-01"] * 1000, dtype="datetime64[D]"), np.array(["M"] * 1000), rng)
+    assert not np.isin(pesels, existing).any()
+    with pytest.raises(PeselSpaceExhausted):
+        generator.generate(np.array(["2000-01-01"], dtype="datetime64[D]"), np.array(["M"]), rng)
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from generative_databases.generators import writers
+from generative_databases.generators.pipeline import Cancelled, Consumer, run_pipeline
+
+
+def test_consumers_get_every_item_in_order():
+    consumed = {"a": [], "b": []}
+    finished = []
+    consumers = [
+        Consumer(name, consumed[name].append, lambda name=name: finished.append(name), queue_size=1)
+        for name in consumed
+    ]
+    run_pipeline(range(100), consumers)
+    assert consumed == {"a": list(range(100)), "b": list(range(100))}
+    assert sorted(finished) == ["a", "b"]
+    assert not any(consumer.failed for consumer in consumers)
+
+
+def test_failed_consumer_does_not_stop_the_others():
+    def fail(item):
+        if item == 3:
+            raise OSError("disk full")
+        failing_items.append(item)
+
+    failing_items, items, finished = [], [], []
+    failing = Consumer("failing", fail, lambda: finished.append("failing"))
+    working = Consumer("working", items.append, lambda: finished.append("working"))
+    run_pipeline(range(50), [failing, working])
+    assert isinstance(failing.error, OSError)
+    assert failing_items == [0, 1, 2]
+    assert items == list(range(50))
+    assert sorted(finished) == ["failing", "working"]
+
+
+def test_producer_stops_once_every_consumer_failed():
+    produced = []
+
+    def produce():
+        for item in range(1000):
+            produced.append(item)
+            yield item
+
+    consumer = Consumer("failing", lambda item: 1 / 0, queue_size=1)
+    run_pipeline(produce(), [consumer])
+    assert isinstance(consumer.error, ZeroDivisionError)
+    assert len(produced) < 1000
+
+
+def test_producer_error_discards_queued_items():
+    started = threading.Event()
+    consumed, finished = [], []
+
+    def consume(item):
+        started.set()
+        # still consuming the first item when the producer fails
+        while not consumer.cancelled:
+            time.sleep(0.001)
+        consumed.append(item)
+
+    def produce():
+        yield 0
+        started.wait()
+        yield from range(1, 3)
+        raise Cancelled()
+
+    consumer = Consumer("slow", consume, lambda: finished.append(True), queue_size=5)
+    with pytest.raises(Cancelled):
+        run_pipeline(produce(), [consumer])
+    assert consumed == [0]
+    assert finished == [True] and consumer.finished.is_set()
+
+
+class FailingSink(writers.Sink):
+    def _write(self, chunk: pd.DataFrame):
+        if self.rows >= 200:
+            raise OSError("disk full")
+
+
+def test_failed_output_does_not_stop_the_others(tmp_path, monkeypatch):
+    monkeypatch.setitem(writers.SINKS, "failing", FailingSink)
+    chunks = (pd.DataFrame({"value": range(start, start + 100)}) for start in range(0, 1000, 100))
+    path = str(tmp_path / "values.csv")
+    reports = writers.write_chunks(chunks, {"failing": str(tmp_path / "failing"), "csv": path}, queue_size=1)
+    assert isinstance(reports["failing"]["error"], OSError)
+    assert reports["failing"]["rows"] == 200
+    assert reports["csv"]["error"] is None and reports["csv"]["rows"] == 1000
+    assert list(pd.read_csv(path, index_col=0)["value"]) == list(range(1000))
@@ -0,0 +1,59 @@
+import re
+
+import numpy as np
+import pytest
+
+from generative_databases.generators import data_importer
+from generative_databases.generators.plates import PlateGenerator
+
+PLATE = re.compile(r"[A-Z]{2,3} [0-9A-Z]{4,5}")
+
+
+@pytest.fixture(scope="module")
+def data_storage():
+    return data_importer.DataBank({"cache": False})
+
+
+def owners(data_storage, size, seed=0):
+    localisation = data_storage.localisation
+    rows = np.random.default_rng(seed).integers(0, len(localisation), size)
+    return localisation["city"].to_numpy()[rows], localisation["admin_name"].to_numpy()[rows]
+
+
+def test_plates_are_unique_across_calls(data_storage):
+    generator = PlateGenerator(data_storage.car_plates)
+    rng = np.random.default_rng(1)
+    plates = np.concatenate([generator.generate(*owners(data_storage, 50000, seed), rng) for seed in range(4)])
+    assert len(np.unique(plates)) == len(plates) == 200000
+    assert all(PLATE.fullmatch(plate) for plate in plates[:1000])
+
+
+def test_city_prefixes(data_storage):
+    plates = PlateGenerator(data_storage.car_plates).generate(
+        np.array(["wroclaw"] * 100), np.array(["dolnoslaskie"] * 100), np.random.default_rng(2)
+    )
+    assert {plate.split()[0] for plate in plates} <= {"DW", "DX", "VW", "VX"}
+
+
+def test_registered_plates_are_never_generated(data_storage):
+    cities, voivodeships = owners(data_storage, 20000)
+    existing = PlateGenerator(data_storage.car_plates).generate(cities, voivodeships, np.random.default_rng(3))
+    generator = PlateGenerator(data_storage.car_plates)
+    assert generator.register(np.concatenate([existing, ["", "NOT A PLATE"]])) == len(existing)
+    # the same seed draws the same plates again, so every one of them collides
+    plates = generator.generate(cities, voivodeships, np.random.default_rng(3))
+    assert not np.isin(plates, existing).any()
+    assert len(np.unique(plates)) == len(plates)
+
+
+def test_partitions_never_collide(data_storage):
+    cities, voivodeships = owners(data_storage, 20000)
+    plates = np.concatenate(
+        [
+            PlateGenerator(data_storage.car_plates, partition=(index, 3)).generate(
+                cities, voivodeships, np.random.default_rng(4)
+            )
+            for index in range(3)
+        ]
+    )
+    assert len(np.unique(plates)) == len(plates)
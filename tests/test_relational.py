@@ -0,0 +1,71 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from generative_databases.generators.generator import DEFAULT_PARAMS
+from generative_databases.generators.relational import TABLES, RelationalGenerator
+
+
+def params(**kwargs) -> dict:
+    return dict(DEFAULT_PARAMS, relational=True, **kwargs)
+
+
+@pytest.fixture(scope="module")
+def sample(tmp_path_factory):
+    path = tmp_path_factory.mktemp("relational")
+    outputs = {"csv": str(path / "sample.csv"), "sql": str(path / "sample.db")}
+    generator = RelationalGenerator(params(sample_size=3000, chunk_size=700, seed=4, vehicles_per_person=1.5))
+    reports = generator.generate_and_save(outputs)
+    tables = {table: pd.read_csv(path / f"sample_{table}.csv", index_col=0) for table in TABLES}
+    return reports, tables, outputs["sql"]
+
+
+def test_keys_are_consecutive(sample):
+    reports, tables, _ = sample
+    for table, definition in TABLES.items():
+        keys = tables[table][definition["primary_key"]]
+        assert list(keys) == list(range(1, len(keys) + 1))
+        assert reports["csv"]["tables"][table] == reports["sql"]["tables"][table] == len(keys)
+    assert len(tables["persons"]) == 3000
+    assert 3000 < len(tables["vehicles"]) < 6000
+
+
+def test_foreign_keys_reference_existing_rows(sample):
+    _, tables, _ = sample
+    for table, definition in TABLES.items():
+        for column, reference in definition["foreign_keys"].items():
+            referenced_table, referenced_column = reference.split(".")
+            values = tables[table][column].dropna()
+            assert values.isin(tables[referenced_table][referenced_column]).all(), (table, column)
+
+
+def test_persons_live_in_the_city_of_their_postal_code(sample):
+    _, tables, _ = sample
+    persons = tables["persons"].dropna(subset=["postal_code_id"])
+    postal_codes = tables["postal_codes"].set_index("postal_code_id")
+    assert len(persons) > 0
+    assert (postal_codes.loc[persons["postal_code_id"].astype(int), "city_id"].to_numpy()
+            == persons["city_id"].to_numpy()).all()
+    assert tables["vehicles"]["plate_number"].is_unique
+
+
+def test_sql_schema(sample):
+    _, tables, path = sample
+    with sqlite3.connect(path) as connection:
+        assert connection.execute("PRAGMA foreign_key_check").fetchall() == []
+        for table in TABLES:
+            assert connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == len(tables[table])
+        references = {
+            (table, row[3], f"{row[2]}.{row[4]}")
+            for table in TABLES
+            for row in connection.execute(f"PRAGMA foreign_key_list({table})")
+        }
+    for table, definition in TABLES.items():
+        for column, reference in definition["foreign_keys"].items():
+            assert (table, column, reference) in references
+
+
+def test_append_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Appending"):
+        RelationalGenerator(params(sample_size=10, append=True)).generate_and_save({"csv": str(tmp_path / "x.csv")})
@@ -0,0 +1,31 @@
+import pandas as pd
+
+from generative_databases.generators.generator import DEFAULT_PARAMS, Generator
+
+COLUMNS = ["Name", "Last Name", "Gender", "Birth Date", "Pesel Number", "city", "admin_name", "Plate Number"]
+
+
+def generate(params_dict: dict, outputs: dict):
+    Generator(dict(DEFAULT_PARAMS, columns=COLUMNS, **params_dict)).generate_and_save(
+        {output_type: str(path) for output_type, path in outputs.items()}
+    )
+
+
+def test_seeded_runs_are_byte_identical(tmp_path):
+    runs = []
+    for run in range(2):
+        outputs = {
+            "csv": tmp_path / f"{run}.csv",
+            "parquet": tmp_path / f"{run}.parquet",
+            "sql": tmp_path / f"{run}.db",
+        }
+        generate({"sample_size": 3000, "seed": 7, "chunk_size": 700}, outputs)
+        runs.append({output_type: path.read_bytes() for output_type, path in outputs.items()})
+    assert runs[0] == runs[1]
+    assert len(pd.read_csv(tmp_path / "0.csv", index_col=0)) == 3000
+
+
+def test_seeds_differ(tmp_path):
+    generate({"sample_size": 100, "seed": 1}, {"csv": tmp_path / "1.csv"})
+    generate({"sample_size": 100, "seed": 2}, {"csv": tmp_path / "2.csv"})
+    assert (tmp_path / "1.csv").read_bytes() != (tmp_path / "2.csv").read_bytes()
@@ -0,0 +1,176 @@
+import asyncio
+import contextlib
+import http.client
+import io
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from generative_databases import server as server_module
+from generative_databases.generators import data_importer
+from generative_databases.generators.generator import NAME_DATA_COLUMNS
+from generative_databases.server import GenerationServer
+
+COLUMNS = ["Name", "Last Name", "Pesel Number", "city"]
+
+
+@pytest.fixture(scope="module")
+def data_storage():
+    return data_importer.DataBank({"cache": False}, columns=NAME_DATA_COLUMNS)
+
+
+@contextlib.contextmanager
+def running_server(data_storage, **kwargs):
+    """
+    Run a GenerationServer on a free localhost port on its own event loop thread.
+    """
+    server = GenerationServer(data_storage=data_storage, **kwargs)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    listener = asyncio.run_coroutine_threadsafe(server.start(port=0), loop).result(timeout=120)
+
+    async def stop():
+        listener.close()
+        await listener.wait_closed()
+        # requests still being served are cancelled, closing their connections
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    try:
+        yield server, listener.sockets[0].getsockname()[1]
+    finally:
+        asyncio.run_coroutine_threadsafe(stop(), loop).result(timeout=30)
+        server._executor.shutdown(wait=False, cancel_futures=True)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=30)
+        loop.close()
+
+
+@pytest.fixture(scope="module")
+def port(data_storage):
+    with running_server(data_storage) as (_, port):
+        yield port
+
+
+def post(port: int, request: dict, query: str = "") -> http.client.HTTPResponse:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    connection.request("POST", f"/generate{query}", body=json.dumps(request))
+    return connection.getresponse()
+
+
+def get_health(port: int) -> dict:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    connection.request("GET", "/health")
+    return json.loads(connection.getresponse().read())
+
+
+def stalled_request(port: int, request: dict) -> socket.socket:
+    """
+    Send a generation request from a socket with a small receive buffer that is never read.
+    """
+    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    client.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 16)
+    client.connect(("127.0.0.1", port))
+    body = json.dumps(request).encode()
+    client.sendall(b"POST /generate HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+    return client
+
+
+def test_ndjson(port):
+    request = {"sample_size": 2500, "chunk_size": 1000, "seed": 1, "columns": COLUMNS}
+    response = post(port, request)
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "application/x-ndjson"
+    assert response.getheader("X-Seed") == "1"
+    body = response.read()
+    rows = [json.loads(line) for line in body.splitlines()]
+    assert len(rows) == 2500
+    assert all(list(row) == COLUMNS for row in rows)
+    assert len({row["Pesel Number"] for row in rows}) == 2500
+    assert post(port, request).read() == body
+
+
+def test_ndjson_returns_drawn_seed(port):
+    response = post(port, {"sample_size": 10, "columns": COLUMNS})
+    seed = int(response.getheader("X-Seed"))
+    body = response.read()
+    assert post(port, {"sample_size": 10, "columns": COLUMNS, "seed": seed}).read() == body
+
+
+def test_arrow(port):
+    ipc = pytest.importorskip("pyarrow.ipc")
+    response = post(port, {"sample_size": 2500, "chunk_size": 1000, "seed": 1, "columns": COLUMNS}, "?format=arrow")
+    assert response.status == 200
+    assert response.getheader("Content-Type") == "application/vnd.apache.arrow.stream"
+    table = ipc.open_stream(io.BytesIO(response.read())).read_all()
+    assert table.num_rows == 2500
+    assert table.column_names == COLUMNS
+
+
+@pytest.mark.parametrize(
+    "request_body, message",
+    [
+        ({"sample_size": 0}, "sample_size"),
+        ({"sample_size": 10, "unknown": 1}, "Unknown parameters"),
+        ({"sample_size": 10, "year_range": [2000, 1990]}, "year_range"),
+        ({"sample_size": 10, "year_range": [1700, 1990]}, "year_range"),
+        ({"sample_size": 10, "year_range": [2000, 2300]}, "year_range"),
+        ({"sample_size": 10, "year_range": [2000]}, "year_range"),
+        ({"sample_size": 10, "columns": ["Name", "Shoe Size"]}, "Shoe Size"),
+        ({"sample_size": 10, "columns": []}, "columns"),
+        ({"sample_size": 10, "columns": "Name"}, "columns"),
+    ],
+)
+def test_invalid_request(port, request_body, message):
+    response = post(port, request_body)
+    assert response.status == 400
+    assert message in json.loads(response.read())["error"]
+
+
+def test_unsupported_format(port):
+    assert post(port, {"sample_size": 10}, "?format=csv").status == 400
+
+
+def test_busy(data_storage):
+    with running_server(data_storage, max_concurrent=1, max_queued=0) as (_, port):
+        client = stalled_request(port, {"sample_size": 1_000_000, "chunk_size": 1000, "columns": COLUMNS})
+        try:
+            deadline = time.monotonic() + 60
+            while get_health(port)["active"] == 0:
+                assert time.monotonic() < deadline
+                time.sleep(0.05)
+            response = post(port, {"sample_size": 10})
+            assert response.status == 503
+            assert "busy" in json.loads(response.read())["error"]
+        finally:
+            client.close()
+
+
+def test_backpressure(data_storage, monkeypatch):
+    calls = []
+    next_encoded = server_module.next_encoded
+    monkeypatch.setattr(server_module, "next_encoded", lambda *args: calls.append(1) or next_encoded(*args))
+    chunks = 400
+    with running_server(data_storage) as (_, port):
+        client = stalled_request(port, {"sample_size": chunks * 1000, "chunk_size": 1000, "columns": COLUMNS})
+        try:
+            # the chunks fill the socket buffers, then generation waits for the client
+            generated = -1
+            while generated != len(calls):
+                generated = len(calls)
+                time.sleep(1)
+            assert 0 < generated < chunks / 2
+            received = 0
+            client.settimeout(60)
+            while data := client.recv(1 << 20):
+                received += len(data)
+            assert received > 0
+            assert len(calls) == chunks + 1
+        finally:
+            client.close()
@@ -0,0 +1,84 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+from sqlalchemy import exc, inspect
+
+from generative_databases.generators import writers
+
+
+def people(pesels, last_names, birth_dates=None):
+    return pd.DataFrame({
+        "Pesel Number": pesels,
+        "Last Name": pd.Categorical(last_names),
+        "Birth Date": pd.to_datetime(birth_dates or ["2000-01-01"] * len(pesels)),
+    })
+
+
+def write(path, chunks, **kwargs):
+    sink = writers.SqlSink(path, **kwargs)
+    for chunk in chunks:
+        sink.write(chunk)
+    sink.close()
+    return sink
+
+
+def read(path, query):
+    with sqlite3.connect(path) as connection:
+        return connection.execute(query).fetchall()
+
+
+PEOPLE_QUERY = (
+    'SELECT p."Pesel Number", l.value, p."Birth Date" FROM people p '
+    'LEFT JOIN last_name l ON l.id = p.last_name_id ORDER BY p."Pesel Number"'
+)
+
+
+def test_lookup_tables(tmp_path):
+    path = str(tmp_path / "people.db")
+    write(path, [
+        people(["1", "2", "3"], ["nowak", "kowalski", "nowak"], ["1990-05-06", "2001-02-03", "1950-01-01"]),
+        people(["4", "5"], ["wisniewski", None]),
+    ], batch_size=2)
+    assert read(path, PEOPLE_QUERY) == [
+        ("1", "nowak", "1990-05-06"),
+        ("2", "kowalski", "2001-02-03"),
+        ("3", "nowak", "1950-01-01"),
+        ("4", "wisniewski", "2000-01-01"),
+        ("5", None, "2000-01-01"),
+    ]
+    assert sorted(value for value, in read(path, "SELECT value FROM last_name")) == ["kowalski", "nowak", "wisniewski"]
+
+
+def test_schema(tmp_path):
+    path = str(tmp_path / "people.db")
+    sink = write(path, [people(["1"], ["nowak"])], indexes=["Last Name", "Birth Date", "Unknown"])
+    inspector = inspect(sink.engine)
+    assert inspector.get_pk_constraint("people")["constrained_columns"] == ["Pesel Number"]
+    assert inspector.get_foreign_keys("people")[0]["referred_table"] == "last_name"
+    assert {index["name"] for index in inspector.get_indexes("people")} == {
+        "ix_people_last_name_id", "ix_people_birth_date"
+    }
+    with pytest.raises(exc.IntegrityError):
+        write(path, [people(["1", "1"], ["nowak", "nowak"])])
+
+
+@pytest.mark.parametrize("method", ["executemany", "multi"])
+def test_append_reuses_lookup_ids(tmp_path, method):
+    path = str(tmp_path / "people.db")
+    write(path, [people(["1", "2"], ["nowak", "kowalski"])], method=method)
+    write(path, [people(["3", "4"], ["kowalski", "zielinski"])], if_exists="append", method=method)
+    assert [row[:2] for row in read(path, PEOPLE_QUERY)] == [
+        ("1", "nowak"), ("2", "kowalski"), ("3", "kowalski"), ("4", "zielinski")
+    ]
+    assert len(read(path, "SELECT * FROM last_name")) == 3
+
+    write(path, [people(["5"], ["nowak"])])
+    assert [row[:2] for row in read(path, PEOPLE_QUERY)] == [("5", "nowak")]
+
+
+def test_invalid_options(tmp_path):
+    with pytest.raises(ValueError):
+        writers.SqlSink(str(tmp_path / "people.db"), if_exists="fail")
+    with pytest.raises(ValueError):
+        writers.SqlSink(str(tmp_path / "people.db"), method="copy")
@@ -0,0 +1,74 @@
+import sys
+
+import pandas as pd
+import pytest
+
+from generative_databases.generators import writers
+
+READERS = {
+    "csv": lambda path: pd.read_csv(path, index_col=0, dtype={"pesel": str}),
+    "json": lambda path: pd.read_json(path, lines=True, dtype={"pesel": str}),
+    "parquet": pd.read_parquet,
+    "feather": pd.read_feather,
+    "pickle": pd.read_pickle,
+    "hdf5": lambda path: pd.read_hdf(path, "df"),
+    "stata": pd.read_stata,
+    "excel": lambda path: pd.read_excel(path, dtype={"pesel": str}),
+    "sql": lambda path: pd.read_sql_table("people", f"sqlite:///{path}"),
+}
+OPTIONAL = {"parquet": "pyarrow", "feather": "pyarrow", "hdf5": "tables", "excel": "openpyxl"}
+
+
+def chunks(count=3, size=100):
+    for idx in range(count):
+        start = idx * size
+        yield pd.DataFrame(
+            {
+                "pesel": [f"{number:011d}" for number in range(start, start + size)],
+                "last_name": pd.Categorical([f"name {number % 7}" for number in range(start, start + size)]),
+                "height": [170 + number % 30 for number in range(start, start + size)],
+            },
+            index=pd.RangeIndex(start, start + size),
+        )
+
+
+@pytest.mark.parametrize("output_type", sorted(READERS))
+def test_every_format_gets_every_row(tmp_path, output_type):
+    if output_type in OPTIONAL:
+        pytest.importorskip(OPTIONAL[output_type])
+    path = str(tmp_path / f"people.{output_type}")
+    reports = writers.write_chunks(chunks(), {output_type: path})
+    assert reports[output_type]["error"] is None
+    assert reports[output_type]["rows"] == 300
+    data = READERS[output_type](path)
+    if output_type == "sql":
+        assert list(data["pesel"]) == [f"{number:011d}" for number in range(300)]
+    else:
+        assert list(data["pesel"].astype(str)) == [f"{number:011d}" for number in range(300)]
+        assert list(data["last_name"].astype(str)) == [f"name {number % 7}" for number in range(300)]
+        assert list(data["height"]) == [170 + number % 30 for number in range(300)]
+
+
+def test_outputs_are_written_together(tmp_path):
+    outputs = {"csv": str(tmp_path / "people.csv"), "json": str(tmp_path / "people.json"),
+               "sql": str(tmp_path / "people.db")}
+    progress = []
+    reports = writers.write_chunks(chunks(), outputs, queue_size=1,
+                                   progress=lambda output_type, rows: progress.append((output_type, rows)))
+    assert {output_type: report["rows"] for output_type, report in reports.items()} == dict.fromkeys(outputs, 300)
+    for output_type in outputs:
+        assert [rows for name, rows in progress if name == output_type] == [0, 100, 200, 300]
+
+
+def test_unknown_format_is_reported(tmp_path):
+    reports = writers.write_chunks(chunks(), {"csv": str(tmp_path / "people.csv"), "yaml": str(tmp_path / "x")})
+    assert reports["csv"]["rows"] == 300 and reports["csv"]["error"] is None
+    assert reports["yaml"]["rows"] == 0 and isinstance(reports["yaml"]["error"], ValueError)
+    with pytest.raises(ValueError):
+        writers.create_sink("yaml", str(tmp_path / "x"))
+
+
+def test_missing_hdf5_package_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "tables", None)
+    with pytest.raises(ValueError, match="hdf5 extra"):
+        writers.create_sink("hdf5", str(tmp_path / "people.h5"))
@@ -0,0 +1,80 @@
+import io
+
+import pandas as pd
+import pytest
+
+from generative_databases.generators import writers
+from generative_databases.generators.generator import DEFAULT_PARAMS, Generator
+
+pa = pytest.importorskip("pyarrow")
+
+
+def test_empty_categorical_chunks_stay_string_dictionaries(tmp_path):
+    # tiny chunks with a rare second name have chunks without any second name
+    params_dict = dict(DEFAULT_PARAMS, sample_size=2000, chunk_size=5, sec_name_prob=2, seed=1)
+    outputs = {"parquet": str(tmp_path / "people.parquet"), "feather": str(tmp_path / "people.feather")}
+    reports = Generator(params_dict).generate_and_save(outputs)
+    assert all(report["error"] is None and report["rows"] == 2000 for report in reports.values())
+    for output_type in outputs:
+        people = getattr(pd, f"read_{output_type}")(outputs[output_type])
+        assert len(people) == 2000
+        assert people["Second Name"].notna().any()
+
+    chunk = pd.DataFrame({"Second Name": pd.Categorical([None, None], categories=[])})
+    assert writers.to_arrow(chunk).schema.field("Second Name").type == pa.dictionary(pa.int32(), pa.string())
+
+
+def test_arrow_stream_with_empty_categorical_chunks():
+    ipc = pytest.importorskip("pyarrow.ipc")
+    from generative_databases.server import ArrowEncoder
+
+    params_dict = dict(DEFAULT_PARAMS, sample_size=500, chunk_size=5, sec_name_prob=2, seed=1)
+    encoder = ArrowEncoder()
+    data = b"".join(encoder(chunk) for chunk in Generator(params_dict).generate_chunks(5)) + encoder(None)
+    assert ipc.open_stream(io.BytesIO(data)).read_all().num_rows == 500
+
+
+def test_excel_rollover(tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    path = tmp_path / "people.xlsx"
+    chunk = pd.DataFrame({"Name": [f"name {idx}" for idx in range(2500)], "Number": range(2500)})
+    options = {"excel": {"max_rows": 1000, "max_sheets": 2}}
+    reports = writers.write_chunks([chunk[:1200], chunk[1200:]], {"excel": str(path)}, options=options)
+    assert reports["excel"]["rows"] == 2500
+    first = openpyxl.load_workbook(path, read_only=True)
+    second = openpyxl.load_workbook(tmp_path / "people_2.xlsx", read_only=True)
+    assert first.sheetnames == ["Sheet1", "Sheet2"]
+    assert second.sheetnames == ["Sheet1"]
+    sheets = [pd.read_excel(path, sheet_name=None)[name] for name in first.sheetnames]
+    sheets.append(pd.read_excel(tmp_path / "people_2.xlsx"))
+    # every sheet repeats the header, so it holds max_rows - 1 rows
+    assert [len(sheet) for sheet in sheets] == [999, 999, 502]
+    assert pd.concat(sheets, ignore_index=True)["Number"].tolist() == list(range(2500))
+
+
+def test_reproducible_excel(tmp_path):
+    import zipfile
+
+    openpyxl = pytest.importorskip("openpyxl")
+    chunk = pd.DataFrame({"Name": ["a", "b", None], "Number": [1, 2, 3]})
+    paths = [tmp_path / f"{run}.xlsx" for run in range(2)]
+    for path in paths:
+        writers.write_chunks([chunk], {"excel": str(path)}, reproducible=True)
+    assert paths[0].read_bytes() == paths[1].read_bytes()
+    with zipfile.ZipFile(paths[0]) as archive:
+        assert {info.date_time for info in archive.infolist()} == {writers.EXCEL_FIXED_TIME.timetuple()[:6]}
+    properties = openpyxl.load_workbook(paths[0]).properties
+    assert properties.created == properties.modified == writers.EXCEL_FIXED_TIME
+
+
+def test_fixed_time_zip_file_forces_zip64(tmp_path, monkeypatch):
+    import zipfile
+
+    source = tmp_path / "sheet.xml"
+    source.write_bytes(b"<x/>" * 100)
+    monkeypatch.setattr(zipfile, "ZIP64_LIMIT", 100)
+    with writers.FixedTimeZipFile(tmp_path / "book.zip", "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.write(source, "sheet.xml")
+    with zipfile.ZipFile(tmp_path / "book.zip") as archive:
+        assert archive.read("sheet.xml") == source.read_bytes()
+        assert archive.getinfo("sheet.xml").extra